@@ -1,20 +1,36 @@
 import time
 import json
-import cv2
-import numpy as np
-from flask import Blueprint, request, jsonify
-
-from ..schemas.models import AnalysisParameters, AnalysisResult, EdgeStats, Timings, Overlays, DebugOverlays, DebugStats
-from ..utils.image_utils import read_image_from_bytes, encode_image_to_base64, create_overlay_image, draw_graph_on_image
-from ..processing.preprocess import preprocess_image
-from ..processing.skeleton import skeletonize_image, estimate_border_width
-from ..processing.graph import build_graph_from_skeleton, prune_graph
-from ..processing.motifs import generate_motifs
-from ..processing.intersections import detect_and_cluster_intersections
-from ..processing.metrics import compute_final_metrics
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import Blueprint, request, jsonify, Response
+
+from .. import config
+from ..schemas.models import AnalysisParameters
+from ..utils.image_utils import read_image_from_bytes
+from ..utils.monitoring import observe_stage
+from ..utils.pools import get_process_pool, discard_process_pool
+from ..utils.profiling import maybe_profile, ProfilerBusy
+from ..utils.result_store import result_store
+from ..utils.stage_cache import image_digest
+from ..processing.pipeline import run_analysis
+from ..processing.metrics import summarize_grain_sizes
+from .params import parse_analysis_parameters, parse_pixel_size, parse_include, parse_profile
 
 analysis_bp = Blueprint('analysis', __name__)
 
+
+def keep_result(result, digest: str):
+    """
+    Stores a result so that reports can be requested by image_id alone.
+    The analysis itself succeeded, so failing to store it (a full disk, a
+    locked index) only becomes a warning of the result.
+    """
+    try:
+        result_store.put(result, digest)
+    except Exception as e:
+        result.warnings.append(f"The result could not be stored, so no report can be made from it: {str(e)}")
+
+
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze_image():
     start_total_time = time.time()
@@ -32,165 +48,166 @@ def analyze_image():
 
     # Load and merge parameters
     try:
-        default_params = AnalysisParameters()
-        user_params_dict = json.loads(request.form.get('params', '{}'))
-
-        # Create a new model instance with updated parameters
-        # This works for both Pydantic v1 and v2
-        updated_params_dict = default_params.dict()
-        updated_params_dict.update(user_params_dict)
-        params = AnalysisParameters(**updated_params_dict)
-
-    except (json.JSONDecodeError, TypeError) as e:
-        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
-
-    pixel_size_um = float(request.form.get('pixel_size_um', 1.0))
-    if pixel_size_um <= 0:
-        return jsonify({"error": "pixel_size_um must be positive"}), 400
+        params = parse_analysis_parameters(request.form)
+        pixel_size_um = parse_pixel_size(request.form)
+        # Lean by default: only metrics, unless more sections are asked for
+        include = parse_include(request.values)
+        profile = parse_profile(request.values)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # --- Full Processing Pipeline ---
+    profiler = None
     try:
-        timings = {}
-
-        # 1. Preprocessing
-        start_time = time.time()
-        binary_image = preprocess_image(
-            original_image,
-            params.gaussian_sigma,
-            params.adaptive_block_size,
-            params.adaptive_offset,
-            params.morph_open_kernel,
-            params.area_opening_min_size_px,
-            params.detect_twins
-        )
-        timings["preprocess_s"] = time.time() - start_time
-
-        # Encode for debugging
-        debug_binary_base64 = encode_image_to_base64(binary_image)
-
-        # 2. Skeletonization & Border Width
-        start_time = time.time()
-        skeleton = skeletonize_image(binary_image)
-        timings["skeleton_s"] = time.time() - start_time
-
-        # Encode for debugging
-        # The skeleton is boolean, so we convert to uint8 for encoding
-        debug_skeleton_base64 = encode_image_to_base64((skeleton * 255).astype(np.uint8))
-
-        start_time = time.time()
-        border_width = estimate_border_width(binary_image, skeleton)
-        timings["border_width_s"] = time.time() - start_time
-
-        # 3. Graph Construction and Pruning
-        start_time = time.time()
-        graph, _ = build_graph_from_skeleton(skeleton)
-
-        # Capture stats before pruning
-        nodes_before = graph.number_of_nodes()
-        edges_before = graph.number_of_edges()
-
-        pruned_graph = prune_graph(graph.copy(), params.skeleton_prune_ratio) # Important: prune a copy
-
-        # Capture stats after pruning
-        nodes_after = pruned_graph.number_of_nodes()
-        edges_after = pruned_graph.number_of_edges()
-
-        timings["graph_s"] = time.time() - start_time
-
-        # 4. Motif Generation
-        motifs = generate_motifs(original_image.shape[:2], params.motifs, params.random_seed)
-
-        # 5. Intersection Detection
-        start_time = time.time()
-        epsilon = border_width * params.epsilon_factor
-        intersections = detect_and_cluster_intersections(
-            motifs, pruned_graph, epsilon, params.norm_profile
-        )
-        timings["intersections_s"] = time.time() - start_time
-
-        # 6. Final Metrics Calculation
-        metrics, warnings = compute_final_metrics(motifs, intersections, pixel_size_um)
-
+        digest = image_digest(image_bytes)
+        with maybe_profile("/api/analyze", profile) as profiler:
+            final_result = run_analysis(
+                original_image,
+                digest,
+                params,
+                pixel_size_um,
+                start_total_time=start_total_time,
+                on_stage=profiler.stage_done if profiler is not None else None,
+                include=include
+            )
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         # Catch any unexpected errors during the complex processing pipeline
         # and return a helpful error message.
-        return jsonify({
-            "error": f"An unexpected error occurred during image processing: {str(e)}"
-        }), 500
-
-    # --- Assemble Response ---
-
-    # Draw the pruned graph for debugging
-    pruned_graph_image = draw_graph_on_image(pruned_graph, original_image.shape)
-    debug_pruned_graph_base64 = encode_image_to_base64(pruned_graph_image)
-
-    # Create overlays for debugging and final output
-    motifs_only_overlay = create_overlay_image(np.zeros_like(original_image), motifs=motifs)
-    motifs_only_base64 = encode_image_to_base64(motifs_only_overlay)
-
-    # Create debug overlays object
-    debug_overlays = DebugOverlays(
-        binary_image_base64=debug_binary_base64,
-        skeleton_image_base64=debug_skeleton_base64,
-        pruned_graph_image_base64=debug_pruned_graph_base64,
-        motifs_image_base64=motifs_only_base64,
-    )
-
-    # Edge Stats & Geometry
-    edge_lengths = [d['length'] for _, _, d in pruned_graph.edges(data=True)]
-    edge_geometries = [
-        {'coords': d['coords'].tolist()} for _, _, d in pruned_graph.edges(data=True) if 'coords' in d
-    ]
-
-    # Create debug stats object now that all stats are calculated
-    debug_stats = DebugStats(
-        nodes_before_pruning=nodes_before,
-        edges_before_pruning=edges_before,
-        nodes_after_pruning=nodes_after,
-        edges_after_pruning=edges_after,
-        edge_geometries_count=len(edge_geometries)
-    )
-
-    edge_stats = EdgeStats(
-        n_nodes=pruned_graph.number_of_nodes(),
-        n_edges=pruned_graph.number_of_edges(),
-        mean_edge_length_px=np.mean(edge_lengths) if edge_lengths else 0,
-        edges=edge_geometries
-    )
-
-    # Create Overlays
-    annotated_overlay = create_overlay_image(original_image, skeleton, motifs, intersections)
-    skeleton_only_overlay = create_overlay_image(np.zeros_like(original_image), skeleton=skeleton)
-
-    overlays = Overlays(
-        annotated_png_base64=encode_image_to_base64(annotated_overlay),
-        skeleton_png_base64=encode_image_to_base64(skeleton_only_overlay),
-        motifs_png_base64=motifs_only_base64
-    )
-
-    timings["total_s"] = time.time() - start_total_time
-
-    # Prepare motifs for JSON serialization
-    serializable_motifs = []
-    for motif in motifs:
-        serializable_motifs.append({
-            "id": motif["id"],
-            "type": motif["type"],
-            "length_px": motif["length_px"],
-            "geometry": {"coordinates": list(motif["geometry"].coords)}
-        })
-
-    final_result = AnalysisResult(
-        metrics=metrics,
-        intersections=intersections,
-        edges_stats=edge_stats,
-        motifs=serializable_motifs,
-        overlays=overlays,
-        warnings=warnings,
-        timings=Timings(**timings),
-        params_used=params,
-        debug_overlays=debug_overlays,
-        debug_stats=debug_stats
+        error = {"error": f"An unexpected error occurred during image processing: {str(e)}"}
+        if profiler is not None:
+            error["profile_id"] = profiler.request_id
+        return jsonify(error), 500
+
+    if profiler is not None:
+        final_result.profile_id = profiler.request_id
+
+    keep_result(final_result, digest)
+    start_time = time.time()
+    response = jsonify(final_result.model_dump(exclude_none=True))
+    observe_stage("serialize", time.time() - start_time)
+    return response
+
+
+def _analyze_batch_item(image_bytes: bytes, params_dict: dict, pixel_size_um: float) -> dict:
+    """
+    Analyzes one batch image inside a pool process.
+    Only the compact part of the result is computed and sent back.
+    """
+    original_image = read_image_from_bytes(image_bytes)
+    digest = image_digest(image_bytes)
+    result = run_analysis(
+        original_image,
+        digest,
+        AnalysisParameters(**params_dict),
+        pixel_size_um,
+        include=("metrics",)
     )
+    keep_result(result, digest)
+    return {
+        "image_id": result.image_id,
+        "metrics": result.metrics.model_dump(),
+        "warnings": result.warnings,
+        "timings": result.timings.model_dump(exclude_none=True),
+    }
+
+
+@analysis_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyzes several images with shared parameters across a process pool.
+
+    Streams NDJSON: one "result" or "error" line per image in completion
+    order, then a "summary" line aggregating G over the successful images.
+    The whole batch is bounded by BATCH_TIMEOUT_S; images still pending
+    when it expires are reported as errors.
+    """
+    start_time = time.time()
+
+    image_files = request.files.getlist('image')
+    if not image_files:
+        return jsonify({"error": "No image file provided"}), 400
 
-    return jsonify(final_result.model_dump())
+    try:
+        params = parse_analysis_parameters(request.form)
+        pixel_size_um = parse_pixel_size(request.form)
+        confidence = float(request.form.get('confidence', 0.95))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 0 < confidence < 1:
+        return jsonify({"error": "confidence must be between 0 and 1"}), 400
+
+    # Read all uploads now; the request stream is gone once the response starts.
+    images = [(f.filename, f.read()) for f in image_files]
+    params_dict = params.model_dump()
+
+    def generate():
+        pool = get_process_pool("batch", config.BATCH_WORKERS)
+        futures = {
+            pool.submit(_analyze_batch_item, image_bytes, params_dict, pixel_size_um): (index, filename)
+            for index, (filename, image_bytes) in enumerate(images)
+        }
+        g_values = []
+        n_failed = 0
+        timed_out = False
+        yielded = set()
+        remaining_s = max(0.0, config.BATCH_TIMEOUT_S - (time.time() - start_time))
+
+        def result_line(future):
+            nonlocal n_failed
+            yielded.add(future)
+            index, filename = futures[future]
+            line = {"type": "result", "index": index, "filename": filename}
+            try:
+                line.update(future.result())
+            except BrokenProcessPool as e:
+                discard_process_pool("batch", pool)
+                line.update(type="error", error=f"The analysis worker terminated unexpectedly: {str(e)}")
+            except Exception as e:
+                line.update(type="error", error=f"An unexpected error occurred during image processing: {str(e)}")
+
+            if line["type"] == "error":
+                n_failed += 1
+            elif line["metrics"]["N_int"] > 0:
+                # G is undefined (reported as 0) without intersections.
+                g_values.append(line["metrics"]["G"])
+            return json.dumps(line) + "\n"
+
+        try:
+            try:
+                for future in as_completed(futures, timeout=remaining_s):
+                    yield result_line(future)
+            except FuturesTimeoutError:
+                # as_completed also gives up on futures that finished while
+                # the client was reading: report those as usual.
+                for future, (index, filename) in futures.items():
+                    if future in yielded:
+                        continue
+                    if future.done():
+                        yield result_line(future)
+                        continue
+                    timed_out = True
+                    n_failed += 1
+                    yield json.dumps({
+                        "type": "error",
+                        "index": index,
+                        "filename": filename,
+                        "error": f"Batch timeout of {config.BATCH_TIMEOUT_S:g} s exceeded"
+                    }) + "\n"
+
+            summary = summarize_grain_sizes(g_values, confidence)
+            yield json.dumps({
+                "type": "summary",
+                "n_images": len(images),
+                "n_failed": n_failed,
+                "timed_out": timed_out,
+                "elapsed_s": time.time() - start_time,
+                **summary.model_dump(),
+            }) + "\n"
+        finally:
+            # Drop queued work on timeout or client disconnect.
+            for future in futures:
+                future.cancel()
+
+    return Response(generate(), mimetype="application/x-ndjson")
@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify, send_file
+
+from ..utils.artifact_store import artifact_store, ARTIFACT_MIME_TYPES
+
+artifacts_bp = Blueprint('artifacts', __name__)
+
+# Artifact names are content digests, so their content never changes.
+_IMMUTABLE_MAX_AGE_S = 365 * 24 * 3600
+
+
+@artifacts_bp.route('/artifacts/<name>', methods=['GET'])
+def get_artifact(name: str):
+    """
+    Serves a rendered image from the artifact store with a strong ETag (its
+    digest) and immutable caching. nginx serves these files directly from the
+    uploads volume; this route covers deployments without it.
+    """
+    path = artifact_store.path(name)
+    if path is None:
+        return jsonify({"error": f"Unknown artifact: {name}"}), 404
+
+    digest, ext = name.split('.', 1)
+    response = send_file(
+        path,
+        mimetype=ARTIFACT_MIME_TYPES[ext],
+        etag=digest,
+        max_age=_IMMUTABLE_MAX_AGE_S,
+        conditional=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,106 @@
+import uuid
+from flask import Blueprint, request, jsonify
+
+from .. import config
+from ..schemas.models import AnalysisParameters
+from ..utils.image_utils import read_image_from_bytes
+from ..utils.job_store import job_store
+from ..utils.pools import get_process_pool, discard_process_pool
+from ..utils.stage_cache import image_digest
+from ..processing.pipeline import run_analysis, PIPELINE_STAGES
+from .analysis import keep_result
+from .params import parse_analysis_parameters, parse_pixel_size, parse_include
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _run_job(job_id: str, image_bytes: bytes, params_dict: dict, pixel_size_um: float, include: frozenset):
+    """Runs one analysis inside a pool process, recording progress in the job store."""
+    job_store.mark_running(job_id)
+    try:
+        original_image = read_image_from_bytes(image_bytes)
+        digest = image_digest(image_bytes)
+        result = run_analysis(
+            original_image,
+            digest,
+            AnalysisParameters(**params_dict),
+            pixel_size_um,
+            on_stage=lambda stage: job_store.record_stage(job_id, stage),
+            include=include
+        )
+        keep_result(result, digest)
+        job_store.complete(job_id, result.model_dump_json(exclude_none=True))
+    except Exception as e:
+        job_store.fail(job_id, f"An unexpected error occurred during image processing: {str(e)}")
+
+
+def _on_job_finished(job_id: str, pool, future):
+    """Records jobs whose pool process died before it could report a failure itself."""
+    if future.cancelled():
+        job_store.fail(job_id, "The job was cancelled before it could run")
+        return
+    exc = future.exception()
+    if exc is not None:
+        job_store.fail(job_id, f"The analysis worker terminated unexpectedly: {str(exc)}")
+        discard_process_pool("jobs", pool)
+
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queues an analysis and returns its job id immediately.
+    Accepts the same form fields as /api/analyze.
+    """
+    if 'image' not in request.files:
+        return jsonify({"error": "No image file provided"}), 400
+
+    image_bytes = request.files['image'].read()
+
+    try:
+        params = parse_analysis_parameters(request.form)
+        pixel_size_um = parse_pixel_size(request.form)
+        include = parse_include(request.values)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job_id = uuid.uuid4().hex
+    job_store.create(job_id)
+
+    pool = get_process_pool("jobs", config.JOB_WORKERS)
+    future = pool.submit(_run_job, job_id, image_bytes, params.model_dump(), pixel_size_um, include)
+    future.add_done_callback(lambda f: _on_job_finished(job_id, pool, f))
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Returns the status and per-stage progress of a job, and its
+    AnalysisResult once it is done.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job id: {job_id}"}), 404
+
+    completed = job_store.completed_stages(job)
+    pending = [stage for stage in PIPELINE_STAGES if stage not in completed]
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "progress": {
+            "stages": {stage: ("done" if stage in completed else "pending") for stage in PIPELINE_STAGES},
+            "completed": len(completed),
+            "total": len(PIPELINE_STAGES),
+            "current_stage": pending[0] if job["status"] == "running" and pending else None,
+        },
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+    if job["status"] == "done":
+        response["result"] = job_store.load_result(job)
+    elif job["status"] == "failed":
+        response["error"] = job["error"]
+
+    return jsonify(response)
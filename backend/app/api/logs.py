@@ -1,4 +1,6 @@
 import os
+from typing import Optional, Tuple
+
 from flask import Blueprint, jsonify, request
 
 logs_bp = Blueprint('logs', __name__)
@@ -11,27 +13,106 @@ LOG_FILES = {
     "nginx_error": os.path.join(LOG_DIR, "nginx_error.log"),
 }
 
+# Logs are read backwards from their end in blocks of this size.
+_BLOCK_SIZE = 64 * 1024
+_MAX_LINES = 5000
+# At most this much is returned by one follow request; the rest comes next time.
+_MAX_FOLLOW_BYTES = 1024 * 1024
+
+
+def _file_id(f) -> str:
+    """The identity of an open file, which changes when its path is replaced (e.g. rotated)."""
+    stat = os.fstat(f.fileno())
+    return f"{stat.st_dev}-{stat.st_ino}"
+
+
+def tail_file(path: str, max_lines: int) -> Tuple[str, int, str]:
+    """
+    Returns the last `max_lines` lines of a file, and the offset of its end
+    and its file id to follow it from. Only the blocks holding those lines
+    are read, so the cost does not depend on the size of the file.
+    """
+    with open(path, 'rb') as f:
+        file_id = _file_id(f)
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        blocks = []
+        newlines = 0
+        # One newline more than lines, as the last line normally ends with one
+        while position > 0 and newlines <= max_lines:
+            size = min(_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+    data = b"".join(reversed(blocks))
+
+    start = len(data) - 1 if data.endswith(b"\n") else len(data)
+    for _ in range(max_lines):
+        start = data.rfind(b"\n", 0, start)
+        if start < 0:
+            break
+    return data[start + 1:].decode("utf-8", errors="replace"), end, file_id
+
+
+def read_after(
+    path: str,
+    offset: int,
+    file_id: Optional[str] = None,
+    max_bytes: int = _MAX_FOLLOW_BYTES,
+) -> Tuple[str, int, bool, str]:
+    """
+    Returns the complete lines written to a file after `offset`, the offset
+    to continue from, whether the file was truncated or replaced since, in
+    which case it is read again from the start, and the file id to pass
+    next time. Replacements are only detected when `file_id`, the id the
+    offset was read from, is given; otherwise only truncations are.
+    """
+    with open(path, 'rb') as f:
+        current_id = _file_id(f)
+        end = f.seek(0, os.SEEK_END)
+        reset = offset > end or (file_id is not None and file_id != current_id)
+        if reset:
+            offset = 0
+        f.seek(offset)
+        data = f.read(min(end - offset, max_bytes))
+
+    # A line still being written is returned once it is complete, unless it
+    # alone exceeds max_bytes.
+    cut = data.rfind(b"\n")
+    if cut >= 0:
+        data = data[:cut + 1]
+    elif len(data) < max_bytes:
+        data = b""
+    return data.decode("utf-8", errors="replace"), offset + len(data), reset, current_id
+
+
 def read_log_file(path: str, max_lines: int = 200) -> str:
     """Reads the last `max_lines` of a file, returning an empty string if not found."""
     try:
-        with open(path, 'r') as f:
-            lines = f.readlines()
-            return "".join(lines[-max_lines:])
+        return tail_file(path, max_lines)[0]
     except FileNotFoundError:
         return f"Log file not found at {path}"
     except Exception as e:
         return f"Error reading log file at {path}: {str(e)}"
 
+
+def _parse_max_lines() -> int:
+    try:
+        max_lines = int(request.args.get('max_lines', 200))
+    except (ValueError, TypeError):
+        max_lines = 200
+    return min(max(max_lines, 0), _MAX_LINES)
+
+
 @logs_bp.route('/logs', methods=['GET'])
 def get_logs():
     """
     Fetches the latest logs from all configured log files.
     Accepts a `max_lines` query parameter.
     """
-    try:
-        max_lines = int(request.args.get('max_lines', 200))
-    except (ValueError, TypeError):
-        max_lines = 200
+    max_lines = _parse_max_lines()
 
     all_logs = {
         key: read_log_file(path, max_lines)
@@ -39,3 +120,36 @@ def get_logs():
     }
 
     return jsonify(all_logs)
+
+
+@logs_bp.route('/logs/<name>', methods=['GET'])
+def get_log(name: str):
+    """
+    Fetches one log file. Without `after_offset`, returns its last
+    `max_lines` lines; with it, only the lines written after that offset,
+    to follow the log. Both return the `offset` and `file_id` to pass next
+    time; with `file_id`, a log replaced since is read from its start.
+    """
+    path = LOG_FILES.get(name)
+    if path is None:
+        return jsonify({"error": f"Unknown log: {name}"}), 404
+
+    after_offset = request.args.get('after_offset')
+    try:
+        if after_offset is None:
+            content, offset, file_id = tail_file(path, _parse_max_lines())
+            reset = False
+        else:
+            try:
+                after_offset = int(after_offset)
+            except ValueError:
+                after_offset = -1
+            if after_offset < 0:
+                return jsonify({"error": "after_offset must be a non-negative integer"}), 400
+            content, offset, reset, file_id = read_after(path, after_offset, request.args.get('file_id'))
+    except FileNotFoundError:
+        return jsonify({"error": f"Log file not found at {path}"}), 404
+    except OSError as e:
+        return jsonify({"error": f"Error reading log file at {path}: {str(e)}"}), 500
+
+    return jsonify({"name": name, "content": content, "offset": offset, "file_id": file_id, "reset": reset})
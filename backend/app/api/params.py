@@ -0,0 +1,71 @@
+import json
+
+from .. import config
+from ..schemas.models import AnalysisParameters
+from ..processing.pipeline import RESULT_SECTIONS
+
+
+def parse_analysis_parameters(form) -> AnalysisParameters:
+    """
+    Merges the JSON `params` form field over the default AnalysisParameters.
+    Raises ValueError with a client-facing message if they are invalid.
+    """
+    try:
+        default_params = AnalysisParameters()
+        user_params_dict = json.loads(form.get('params', '{}'))
+
+        # Create a new model instance with updated parameters
+        # This works for both Pydantic v1 and v2
+        updated_params_dict = default_params.dict()
+        updated_params_dict.update(user_params_dict)
+        return AnalysisParameters(**updated_params_dict)
+
+    except (json.JSONDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid parameters: {str(e)}")
+
+
+def parse_pixel_size(form) -> float:
+    """Reads the `pixel_size_um` form field, which must be a positive number."""
+    try:
+        pixel_size_um = float(form.get('pixel_size_um', 1.0))
+    except (TypeError, ValueError):
+        raise ValueError("pixel_size_um must be a number")
+    if pixel_size_um <= 0:
+        raise ValueError("pixel_size_um must be positive")
+    return pixel_size_um
+
+
+def parse_include(values, default=("metrics",)) -> frozenset:
+    """
+    Reads the comma-separated `include` field naming the result sections to
+    return (see RESULT_SECTIONS); "all" selects every section. Without it,
+    `default` is used. Raises ValueError on unknown section names.
+    """
+    raw = values.get('include')
+    if raw is None or not raw.strip():
+        return frozenset(default)
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    if names == {"all"}:
+        return frozenset(RESULT_SECTIONS)
+    unknown = sorted(names - set(RESULT_SECTIONS))
+    if unknown:
+        raise ValueError(
+            f"Unknown include section(s): {', '.join(unknown)}. "
+            f"Expected a comma-separated list of: {', '.join(RESULT_SECTIONS)}, or all"
+        )
+    return frozenset(names)
+
+
+def parse_profile(values) -> bool:
+    """
+    Reads the `profile` option ("1" or "true"), which profiles the request.
+    Raises ValueError if profiling is requested but not enabled.
+    """
+    raw = values.get('profile')
+    if raw is None or raw.strip().lower() in ("", "0", "false"):
+        return False
+    if raw.strip().lower() not in ("1", "true"):
+        raise ValueError("profile must be 1 or 0")
+    if not config.PROFILING_ENABLED:
+        raise ValueError("Profiling is disabled on this server (PROFILING_ENABLED)")
+    return True
@@ -1,63 +1,129 @@
-import json
+import base64
+from typing import Optional
+
 from flask import Blueprint, request, jsonify
 
-from ..utils.image_utils import read_image_from_bytes, encode_image_to_base64
-from ..processing.preprocess import preprocess_image
-from ..schemas.models import AnalysisParameters
+from .. import config
+from ..utils.image_utils import read_image_from_bytes, encode_layer
+from ..utils.preview_sessions import preview_sessions
+from ..processing.preview import preview_preprocess
+from ..utils.profiling import maybe_profile, ProfilerBusy
+from .params import parse_analysis_parameters, parse_profile
 
 preview_bp = Blueprint('preview', __name__)
 
-@preview_bp.route('/preprocess', methods=['POST'])
-def preprocess_preview():
-    """
-    Provides a preview of the image preprocessing step.
-    Accepts an image and preprocessing parameters, and returns the
-    resulting binary image without running the full analysis.
-    """
-    if 'image' not in request.files:
-        return jsonify({"error": "No image file provided"}), 400
 
-    image_file = request.files['image']
-    image_bytes = image_file.read()
+def _parse_max_dim(values) -> Optional[int]:
+    """Reads the optional `max_dim` field, which must be a positive integer."""
+    raw = values.get('max_dim')
+    if raw is None or raw == '':
+        return None
+    try:
+        max_dim = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("max_dim must be an integer")
+    if max_dim <= 0:
+        raise ValueError("max_dim must be positive")
+    return max_dim
+
 
+def _preview_response(session_id: str):
+    """Runs the preview of a session with the request's parameters."""
     try:
-        original_image = read_image_from_bytes(image_bytes)
+        params = parse_analysis_parameters(request.form)
+        max_dim = _parse_max_dim(request.values)
+        profile = parse_profile(request.values)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
-    # Load and merge parameters
+    if not preview_sessions.exists(session_id):
+        return jsonify({"error": f"Unknown or expired preview session: {session_id}"}), 404
+
+    profiler = None
     try:
-        default_params = AnalysisParameters()
-        user_params_dict = json.loads(request.form.get('params', '{}'))
+        with maybe_profile("/api/preview/preprocess", profile) as profiler:
+            binary_image, cache_status, timings = preview_preprocess(
+                session_id,
+                lambda: read_image_from_bytes(preview_sessions.load(session_id)),
+                params,
+                max_dim
+            )
+
+        # The preview is a mask, sent as a 1-bit PNG data URI
+        png_bytes, _ = encode_layer(binary_image, "mask", compression=config.IMAGE_COMPRESSION)
+        base64_image = "data:image/png;base64," + base64.b64encode(png_bytes).decode("utf-8")
 
-        # Create a new model instance with updated parameters
-        # This works for both Pydantic v1 and v2
-        updated_params_dict = default_params.dict()
-        updated_params_dict.update(user_params_dict)
-        params = AnalysisParameters(**updated_params_dict)
+        response = {
+            "session_id": session_id,
+            "preview_image_base64": base64_image,
+            "width": binary_image.shape[1],
+            "height": binary_image.shape[0],
+            "cache": cache_status,
+            "timings": timings,
+        }
+        if profiler is not None:
+            response["profile_id"] = profiler.request_id
+        return jsonify(response)
+
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        error = {"error": f"An error occurred during preprocessing: {str(e)}"}
+        if profiler is not None:
+            error["profile_id"] = profiler.request_id
+        return jsonify(error), 500
 
-    except (json.JSONDecodeError, TypeError) as e:
-        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
 
+def _read_uploaded_image():
+    """Returns the uploaded image bytes and dimensions, or an error response."""
+    if 'image' not in request.files:
+        return None, (jsonify({"error": "No image file provided"}), 400)
+
+    image_bytes = request.files['image'].read()
     try:
-        # Perform only the preprocessing step
-        binary_image = preprocess_image(
-            original_image,
-            params.gaussian_sigma,
-            params.adaptive_block_size,
-            params.adaptive_offset,
-            params.morph_open_kernel,
-            params.area_opening_min_size_px
-        )
-
-        # Encode the result as base64
-        base64_image = encode_image_to_base64(binary_image)
-
-        return jsonify({
-            "preview_image_base64": base64_image
-        })
+        original_image = read_image_from_bytes(image_bytes)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    return (image_bytes, original_image.shape), None
 
-    except Exception as e:
-        return jsonify({
-            "error": f"An error occurred during preprocessing: {str(e)}"
-        }), 500
+
+@preview_bp.route('/sessions', methods=['POST'])
+def create_preview_session():
+    """
+    Uploads an image for interactive previews and returns a session id.
+    Previews of the session then only send parameters, and reuse the
+    intermediates cached by earlier previews.
+    """
+    upload, error = _read_uploaded_image()
+    if error:
+        return error
+    image_bytes, shape = upload
+
+    session_id = preview_sessions.create(image_bytes)
+    return jsonify({"session_id": session_id, "width": shape[1], "height": shape[0]}), 201
+
+
+@preview_bp.route('/sessions/<session_id>/preprocess', methods=['POST'])
+def session_preprocess_preview(session_id: str):
+    """
+    Provides a preview of the image preprocessing step for a session.
+    Accepts the preprocessing parameters and an optional `max_dim` that
+    downscales the preview, and returns the resulting binary image.
+    """
+    return _preview_response(session_id)
+
+
+@preview_bp.route('/preprocess', methods=['POST'])
+def preprocess_preview():
+    """
+    Provides a preview of the image preprocessing step.
+    Accepts an image and preprocessing parameters, and returns the
+    resulting binary image without running the full analysis. The image is
+    kept as a preview session, whose id is returned for later previews.
+    """
+    upload, error = _read_uploaded_image()
+    if error:
+        return error
+    image_bytes, _ = upload
+
+    return _preview_response(preview_sessions.create(image_bytes))
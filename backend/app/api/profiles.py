@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify, send_file
+
+from ..utils.profiling import profile_store, PROFILE_FILES
+
+profiles_bp = Blueprint('profiles', __name__)
+
+
+@profiles_bp.route('/profiles/<request_id>', methods=['GET'])
+@profiles_bp.route('/profiles/<request_id>/<kind>', methods=['GET'])
+def get_profile(request_id: str, kind: str = "summary"):
+    """
+    Returns the profile of a request made with the `profile` option: its
+    summary (top functions, peak memory per stage), its collapsed stacks
+    (`stacks`, for flamegraph tools) or its raw cProfile stats (`pstats`).
+    """
+    path = profile_store.path(request_id, kind)
+    if path is None:
+        return jsonify({"error": f"Unknown profile: {request_id}/{kind}"}), 404
+    name, mimetype = PROFILE_FILES[kind]
+    return send_file(path, mimetype=mimetype, download_name=f"{request_id}-{name}")
@@ -1,15 +1,133 @@
-from flask import Blueprint, request, jsonify, render_template, Response
-from weasyprint import HTML
-import json
+import time
 
+from flask import Blueprint, request, jsonify, send_file
+
+from .. import config
 from ..schemas.models import AnalysisResult
+from ..utils.pools import get_process_pool, discard_process_pool
+from ..utils.report_renderer import render_report_pdf, template_version, check_overlay_urls
+from ..utils.report_store import report_store
+from ..utils.result_store import result_store
+from ..utils.stage_cache import image_digest
 
 reports_bp = Blueprint('reports', __name__)
 
+# How often a request waiting for a report checks whether it is ready.
+_POLL_INTERVAL_S = 0.2
+
+
+def _render_report(key: str, result_json: str):
+    """Renders one report inside a pool process into the report store."""
+    try:
+        report_store.put(key, render_report_pdf(result_json))
+    except Exception as e:
+        report_store.fail(key, f"An error occurred while rendering the report: {str(e)}")
+    finally:
+        report_store.release(key)
+
+
+def _on_render_finished(key: str, pool, future):
+    """Records renders whose pool process died before it could report a failure itself."""
+    if future.cancelled():
+        report_store.fail(key, "The render was cancelled before it could run")
+        report_store.release(key)
+        return
+    exc = future.exception()
+    if exc is not None:
+        report_store.fail(key, f"The report worker terminated unexpectedly: {str(exc)}")
+        report_store.release(key)
+        discard_process_pool("reports", pool)
+
+
+def _queue_render(key: str, result_json: str):
+    """Renders the report in the background, unless a render of it is already in progress."""
+    if report_store.claim(key):
+        pool = get_process_pool("reports", config.REPORT_WORKERS)
+        future = pool.submit(_render_report, key, result_json)
+        future.add_done_callback(lambda f: _on_render_finished(key, pool, f))
+
+
+def _report_status(key: str, result_json: str) -> str:
+    """Returns "ready" or "rendering", queueing the render if needed."""
+    if report_store.path(key) is not None:
+        return "ready"
+    _queue_render(key, result_json)
+    return "rendering"
+
+
+def _send_report(key: str, image_id: str):
+    return send_file(
+        report_store.path(key),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=f"report_{image_id[:8]}.pdf",
+        etag=key,
+        conditional=True,
+    )
+
+
+@reports_bp.route('/reports/<image_id>', methods=['GET'])
+def get_report(image_id: str):
+    """
+    Returns the PDF report of a stored analysis result.
+
+    Reports are rendered in a background pool and cached by result digest
+    and template version. While the report is rendering, this answers 202
+    with a Retry-After header; poll until it answers 200 with the PDF.
+    """
+    stored = result_store.get(image_id)
+    if stored is None:
+        return jsonify({"error": f"Unknown analysis id: {image_id}"}), 404
+    result_json, digest = stored
+    key = report_store.key(digest, template_version())
+
+    if report_store.path(key) is None:
+        # Report the failure of the last render once; the next request retries.
+        error = report_store.pop_error(key)
+        if error is not None:
+            return jsonify({"error": error}), 500
+        _queue_render(key, result_json)
+        return jsonify({"image_id": image_id, "status": "rendering"}), 202, {"Retry-After": "1"}
+
+    return _send_report(key, image_id)
+
+
+@reports_bp.route('/reports', methods=['POST'])
+def request_reports():
+    """
+    Queues the reports of several stored results, e.g. a whole lot, which
+    render concurrently. Failed renders are retried.
+
+    Body: JSON {"image_ids": [...]}. Returns the status of each report
+    ("ready", "rendering" or "not_found") and the URL to fetch it from.
+    """
+    data = request.get_json(silent=True) or {}
+    image_ids = data.get("image_ids")
+    if not isinstance(image_ids, list) or not image_ids or not all(isinstance(i, str) for i in image_ids):
+        return jsonify({"error": "image_ids must be a non-empty list of analysis ids"}), 400
+
+    version = template_version()
+    reports = {}
+    for image_id in image_ids:
+        stored = result_store.get(image_id)
+        if stored is None:
+            reports[image_id] = {"status": "not_found"}
+            continue
+        result_json, digest = stored
+        reports[image_id] = {
+            "status": _report_status(report_store.key(digest, version), result_json),
+            "url": f"/api/reports/{image_id}",
+        }
+
+    rendering = any(report["status"] == "rendering" for report in reports.values())
+    return jsonify({"reports": reports}), 202 if rendering else 200
+
+
 @reports_bp.route('/report', methods=['POST'])
 def generate_report():
     """
-    Generates a PDF report from an analysis result JSON.
+    Generates a PDF report from an analysis result JSON posted by the client.
+    Prefer GET /api/reports/<image_id>, which does not need the result sent back.
     """
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
@@ -21,17 +139,26 @@ def generate_report():
         analysis_result = AnalysisResult.model_validate(data)
     except Exception as e:
         return jsonify({"error": "Invalid analysis result data provided", "details": str(e)}), 400
+    if analysis_result.overlays is not None:
+        try:
+            check_overlay_urls(analysis_result.overlays.model_dump())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    # Render the HTML template with the analysis data
-    # The template will use the base64 strings directly in <img> tags
-    html_out = render_template("report_template.html", result=analysis_result.model_dump())
+    result_json = analysis_result.model_dump_json(exclude_none=True)
+    key = report_store.key(image_digest(result_json.encode("utf-8")), template_version())
 
-    # Generate PDF in memory
-    pdf_bytes = HTML(string=html_out).write_pdf()
+    # Render through the same pool and cache, waiting for the PDF
+    deadline = time.time() + config.REPORT_TIMEOUT_S
+    _report_status(key, result_json)
+    while report_store.path(key) is None:
+        if not report_store.is_pending(key):
+            if report_store.path(key) is not None:
+                break
+            error = report_store.pop_error(key) or "The report could not be rendered"
+            return jsonify({"error": error}), 500
+        if time.time() > deadline:
+            return jsonify({"error": "Timed out while rendering the report"}), 504
+        time.sleep(_POLL_INTERVAL_S)
 
-    # Return the PDF as a downloadable file
-    return Response(
-        pdf_bytes,
-        mimetype="application/pdf",
-        headers={"Content-Disposition": f"attachment;filename=report_{analysis_result.image_id[:8]}.pdf"}
-    )
+    return _send_report(key, analysis_result.image_id)
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Blueprint, Response, jsonify, request
+
+from ..utils.result_store import result_store
+
+results_bp = Blueprint('results', __name__)
+
+# Page size of result listings: default and maximum.
+_DEFAULT_LIMIT = 50
+_MAX_LIMIT = 500
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[float]:
+    """Reads a time given as Unix seconds or an ISO 8601 date (UTC unless stated)."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be Unix seconds or an ISO 8601 date")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_limit(value: Optional[str]) -> int:
+    if value is None:
+        return _DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= _MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {_MAX_LIMIT}")
+    return limit
+
+
+@results_bp.route('/results', methods=['GET'])
+def list_results():
+    """
+    Lists stored analysis results, newest first: their metrics, parameters
+    and timings, without the large sections. Filters: `image_digest` (the
+    sha256 of the image file), `since` and `until`. Paginated with `limit`
+    and the `cursor` returned as `next_cursor` by the previous page.
+    """
+    try:
+        results, next_cursor = result_store.query(
+            image_digest=request.args.get('image_digest'),
+            since=_parse_time(request.args.get('since'), "since"),
+            until=_parse_time(request.args.get('until'), "until"),
+            limit=_parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor'),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results, "next_cursor": next_cursor})
+
+
+@results_bp.route('/results/<image_id>', methods=['GET'])
+def get_result(image_id: str):
+    """Returns a stored AnalysisResult as it was returned by the analysis."""
+    stored = result_store.get(image_id)
+    if stored is None:
+        return jsonify({"error": f"Unknown analysis id: {image_id}"}), 404
+    return Response(stored[0], mimetype="application/json")
@@ -0,0 +1,89 @@
+import json
+import time
+
+from flask import Blueprint, request, jsonify
+
+from .. import config
+from ..utils.image_utils import read_image_from_bytes
+from ..utils.stage_cache import image_digest
+from ..processing.sweep import expand_grid, run_sweep, METRIC_COLUMNS
+from .params import parse_analysis_parameters, parse_pixel_size
+
+sweep_bp = Blueprint('sweep', __name__)
+
+
+def parse_grid(form) -> dict:
+    """
+    Reads the `grid` form field: a JSON object mapping parameter names to
+    the list of values to sweep.
+    """
+    try:
+        grid = json.loads(form.get('grid', ''))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid grid: {str(e)}")
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("grid must be a non-empty JSON object of parameter value lists")
+    return grid
+
+
+@sweep_bp.route('/sweep', methods=['POST'])
+def sweep_parameters():
+    """
+    Analyzes one image over a grid of parameter values.
+
+    Each upstream stage runs once per distinct setting of the parameters it
+    depends on, and the downstream stages of the grid points run in
+    parallel. Returns a table with one row per grid point: the swept
+    parameter values, then the metrics and warnings. No overlays are rendered.
+    """
+    start_total_time = time.time()
+
+    if 'image' not in request.files:
+        return jsonify({"error": "No image file provided"}), 400
+
+    image_bytes = request.files['image'].read()
+    try:
+        original_image = read_image_from_bytes(image_bytes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        base_params = parse_analysis_parameters(request.form)
+        pixel_size_um = parse_pixel_size(request.form)
+        grid = parse_grid(request.form)
+        points = expand_grid(base_params, grid)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(points) > config.SWEEP_MAX_POINTS:
+        return jsonify({
+            "error": f"The grid has {len(points)} points, more than the {config.SWEEP_MAX_POINTS} allowed"
+        }), 400
+
+    try:
+        sweep = run_sweep(original_image, image_digest(image_bytes), points, pixel_size_um, config.SWEEP_WORKERS)
+    except Exception as e:
+        return jsonify({
+            "error": f"An unexpected error occurred during image processing: {str(e)}"
+        }), 500
+
+    # Rows of a failed point have null metrics; the message is under `errors`.
+    names = list(grid)
+    rows = []
+    errors = {}
+    for index, (params, result) in enumerate(zip(points, sweep["results"])):
+        row = [getattr(params, name) for name in names]
+        if "error" in result:
+            errors[str(index)] = result["error"]
+            row += [None] * len(METRIC_COLUMNS) + [[]]
+        else:
+            metrics = result["metrics"]
+            row += [getattr(metrics, column) for column in METRIC_COLUMNS] + [result["warnings"]]
+        rows.append(row)
+
+    return jsonify({
+        "columns": names + list(METRIC_COLUMNS) + ["warnings"],
+        "rows": rows,
+        "errors": errors,
+        "stage_runs": sweep["stage_runs"],
+        "timings": {**sweep["timings"], "total_s": time.time() - start_total_time},
+    })
@@ -0,0 +1,107 @@
+import os
+
+# Runtime settings, read once from the environment (see docker-compose.yml).
+
+# The backend directory, which is /app inside the container.
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Mounted volume shared by all gunicorn workers.
+UPLOADS_DIR = os.environ.get("UPLOADS_DIR", os.path.join(BASE_DIR, "uploads"))
+
+# Gunicorn workers (gunicorn reads its worker count from WEB_CONCURRENCY);
+# pools and thread counts default to each worker's share of the CPUs.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+CPU_SHARE = max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+
+# Stage result cache: per-worker in-memory LRU, plus an optional on-disk tier
+# under the uploads volume so that every worker can reuse a hit.
+STAGE_CACHE_MAX_BYTES = int(os.environ.get("STAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+STAGE_CACHE_DISK = os.environ.get("STAGE_CACHE_DISK", "0") == "1"
+STAGE_CACHE_DIR = os.environ.get("STAGE_CACHE_DIR", os.path.join(UPLOADS_DIR, "stage_cache"))
+STAGE_CACHE_DISK_MAX_BYTES = int(os.environ.get("STAGE_CACHE_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Asynchronous analysis jobs: pool size per gunicorn worker, and where job
+# state and results are kept so that any worker can answer a status request.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", os.path.join(UPLOADS_DIR, "jobs.sqlite3"))
+JOB_RESULTS_DIR = os.environ.get("JOB_RESULTS_DIR", os.path.join(UPLOADS_DIR, "jobs"))
+JOB_RETENTION_S = float(os.environ.get("JOB_RETENTION_S", 24 * 3600))
+
+# Batch analysis: processes per gunicorn worker (by default its CPU share,
+# so that concurrent batches on all workers do not oversubscribe the CPUs or
+# hold more full-size images than there are cores), and the wall-clock budget
+# of a whole batch request.
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", CPU_SHARE))
+BATCH_TIMEOUT_S = float(os.environ.get("BATCH_TIMEOUT_S", 300))
+
+# Rendered overlays and debug images: content-addressed files on the uploads
+# volume, referenced from results by URL under ARTIFACTS_URL_PREFIX (served by
+# nginx straight from disk). Files unused for ARTIFACT_RETENTION_S are deleted,
+# and the oldest go first once the store exceeds ARTIFACTS_MAX_BYTES. Artifacts
+# of stored results are kept as long as the results (RESULT_RETENTION_S), and
+# do not count towards that bound.
+ARTIFACTS_DIR = os.environ.get("ARTIFACTS_DIR", os.path.join(UPLOADS_DIR, "artifacts"))
+ARTIFACTS_URL_PREFIX = os.environ.get("ARTIFACTS_URL_PREFIX", "/api/artifacts")
+ARTIFACTS_MAX_BYTES = int(os.environ.get("ARTIFACTS_MAX_BYTES", 1024 * 1024 * 1024))
+ARTIFACT_RETENTION_S = float(os.environ.get("ARTIFACT_RETENTION_S", 7 * 24 * 3600))
+
+# Encoding of the rendered images. Masks (binary image, skeleton) are always
+# 1-bit PNGs and line drawings lossless PNGs; layers built on the micrograph
+# use OVERLAY_FORMAT ("png", "webp" or "jpg") at OVERLAY_QUALITY. IMAGE_COMPRESSION
+# ("fast", "balanced" or "small") trades encoding time for size.
+OVERLAY_FORMAT = os.environ.get("OVERLAY_FORMAT", "png")
+OVERLAY_QUALITY = int(os.environ.get("OVERLAY_QUALITY", 85))
+IMAGE_COMPRESSION = os.environ.get("IMAGE_COMPRESSION", "balanced")
+
+# Threads drawing and encoding the rendered images of one analysis. Defaults
+# to this gunicorn worker's share of the CPUs.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", CPU_SHARE))
+
+# Preprocessing preview sessions: the uploaded image is kept on the uploads
+# volume under its digest, and dropped when unused for PREVIEW_SESSION_TTL_S.
+PREVIEW_SESSIONS_DIR = os.environ.get("PREVIEW_SESSIONS_DIR", os.path.join(UPLOADS_DIR, "preview_sessions"))
+PREVIEW_SESSION_TTL_S = float(os.environ.get("PREVIEW_SESSION_TTL_S", 3600))
+# Preview intermediates (grayscale, blur, threshold surface) are cached in
+# memory only, apart from the stage cache: up to PREVIEW_CACHE_MAX_BYTES for
+# each of the PREVIEW_CACHE_SESSIONS most recently used sessions of a worker.
+PREVIEW_CACHE_MAX_BYTES = int(os.environ.get("PREVIEW_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+PREVIEW_CACHE_SESSIONS = int(os.environ.get("PREVIEW_CACHE_SESSIONS", 2))
+
+# The smallest `tile_size` accepted; smaller tiles are mostly halo.
+TILE_MIN_SIZE = int(os.environ.get("TILE_MIN_SIZE", 256))
+
+# The most Monte Carlo motif sets (`monte_carlo_seeds`) one analysis may ask for.
+MONTE_CARLO_MAX_SEEDS = int(os.environ.get("MONTE_CARLO_MAX_SEEDS", 1000))
+
+# Parameter sweeps: the largest grid accepted, and the threads running the
+# downstream stages of the grid points (by default the worker's CPU share).
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 1000))
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", RENDER_WORKERS))
+
+# Analysis results, stored by image_id: indexed in SQLite at
+# RESULT_STORE_PATH, with the full result JSON under RESULTS_DIR. Index rows
+# are inserted in batches, every RESULT_STORE_FLUSH_S seconds or
+# RESULT_STORE_BATCH_SIZE results.
+RESULT_STORE_PATH = os.environ.get("RESULT_STORE_PATH", os.path.join(UPLOADS_DIR, "results.sqlite3"))
+RESULTS_DIR = os.environ.get("RESULTS_DIR", os.path.join(UPLOADS_DIR, "results"))
+RESULT_RETENTION_S = float(os.environ.get("RESULT_RETENTION_S", 30 * 24 * 3600))
+RESULT_STORE_FLUSH_S = float(os.environ.get("RESULT_STORE_FLUSH_S", 0.2))
+RESULT_STORE_BATCH_SIZE = int(os.environ.get("RESULT_STORE_BATCH_SIZE", 100))
+
+# The PDF reports rendered from stored results, on REPORT_WORKERS processes
+# per gunicorn worker. PDFs are cached by result digest and template version;
+# the least recently used go first once they exceed REPORTS_MAX_BYTES.
+TEMPLATES_DIR = os.environ.get("TEMPLATES_DIR", os.path.join(BASE_DIR, "templates"))
+REPORTS_DIR = os.environ.get("REPORTS_DIR", os.path.join(UPLOADS_DIR, "reports"))
+REPORTS_MAX_BYTES = int(os.environ.get("REPORTS_MAX_BYTES", 512 * 1024 * 1024))
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 2))
+REPORT_TIMEOUT_S = float(os.environ.get("REPORT_TIMEOUT_S", 120))
+
+# On-demand profiling of single requests (the `profile` option of
+# /api/analyze and the preview endpoints), off unless PROFILING_ENABLED=1.
+# Profiles are kept in PROFILES_DIR for PROFILE_RETENTION_S.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILES_DIR = os.environ.get("PROFILES_DIR", os.path.join(UPLOADS_DIR, "profiles"))
+PROFILE_RETENTION_S = float(os.environ.get("PROFILE_RETENTION_S", 7 * 24 * 3600))
+PROFILE_SAMPLE_INTERVAL_S = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_S", 0.005))
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", 40))
@@ -5,6 +5,12 @@ from .api.analysis import analysis_bp
 from .api.reports import reports_bp
 from .api.preview import preview_bp
 from .api.logs import logs_bp
+from .api.jobs import jobs_bp
+from .api.artifacts import artifacts_bp
+from .api.sweep import sweep_bp
+from .api.results import results_bp
+from .api.profiles import profiles_bp
+from .utils import monitoring
 
 def create_app():
     """Create and configure an instance of the Flask application."""
@@ -15,11 +21,19 @@ def create_app():
     # to the specific domain of your frontend.
     CORS(app)
 
+    # Request metrics, and the /metrics endpoint for Prometheus
+    monitoring.init_app(app)
+
     # Register blueprints
     app.register_blueprint(analysis_bp, url_prefix='/api')
     app.register_blueprint(reports_bp, url_prefix='/api')
     app.register_blueprint(preview_bp, url_prefix='/api/preview')
     app.register_blueprint(logs_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(artifacts_bp, url_prefix='/api')
+    app.register_blueprint(sweep_bp, url_prefix='/api')
+    app.register_blueprint(results_bp, url_prefix='/api')
+    app.register_blueprint(profiles_bp, url_prefix='/api')
 
     @app.route("/")
     def health_check():
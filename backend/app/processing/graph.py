@@ -1,126 +1,288 @@
+from typing import List, Tuple
+
 import numpy as np
 from skan import Skeleton, summarize
-import networkx as nx
-import pandas as pd
 
-def build_graph_from_skeleton(skeleton: np.ndarray):
+
+class SkeletonGraph:
     """
-    Builds a graph representation from a skeleton image using skan and networkx.
-    This version uses skan.summarize() to identify all paths and their IDs,
-    then fetches the coordinates for each path ID from the Skeleton object.
-    This is more robust than iterating from 0..n_paths.
+    Compact, array-backed graph of skeleton branches.
+
+    Nodes are skeleton junctions and endpoints, edges are the branches
+    between them. Everything is held in NumPy arrays:
+
+    - `node_pos`: (n_nodes, 2) int32 node positions as (x, y).
+    - `edge_src`, `edge_dst`: (n_edges,) int32 node indices of each edge.
+    - `edge_length`: (n_edges,) float64 branch lengths along the skeleton.
+    - `edge_id`: (n_edges,) int64 skan path id of each edge.
+    - `coords`, `coord_offsets`: the (x, y) pixel path of every edge in one
+      flat int32 buffer; edge i spans coords[coord_offsets[i]:coord_offsets[i + 1]].
+
+    Adjacency is available in CSR form through `adjacency()`.
+    """
+
+    def __init__(
+        self,
+        node_pos: np.ndarray,
+        edge_src: np.ndarray,
+        edge_dst: np.ndarray,
+        edge_length: np.ndarray,
+        edge_id: np.ndarray,
+        coords: np.ndarray,
+        coord_offsets: np.ndarray,
+    ):
+        self.node_pos = np.asarray(node_pos, dtype=np.int32).reshape(-1, 2)
+        self.edge_src = np.asarray(edge_src, dtype=np.int32)
+        self.edge_dst = np.asarray(edge_dst, dtype=np.int32)
+        self.edge_length = np.asarray(edge_length, dtype=np.float64)
+        self.edge_id = np.asarray(edge_id, dtype=np.int64)
+        self.coords = np.asarray(coords, dtype=np.int32).reshape(-1, 2)
+        self.coord_offsets = np.asarray(coord_offsets, dtype=np.int64)
+
+    @classmethod
+    def empty(cls) -> "SkeletonGraph":
+        return cls(
+            np.empty((0, 2)), np.empty(0), np.empty(0), np.empty(0), np.empty(0),
+            np.empty((0, 2)), np.zeros(1)
+        )
+
+    # --- Size and degree accessors ---
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_pos)
+
+    def number_of_edges(self) -> int:
+        return len(self.edge_src)
+
+    @property
+    def degrees(self) -> np.ndarray:
+        """Degree of every node."""
+        n = self.number_of_nodes()
+        return (
+            np.bincount(self.edge_src, minlength=n) + np.bincount(self.edge_dst, minlength=n)
+        ).astype(np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (
+            self.node_pos, self.edge_src, self.edge_dst, self.edge_length,
+            self.edge_id, self.coords, self.coord_offsets
+        ))
+
+    # --- Topology ---
+
+    def adjacency(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the CSR adjacency (offsets, neighbors, edges): the neighbors
+        of node n are neighbors[offsets[n]:offsets[n + 1]], reached through
+        the edges at the same positions.
+        """
+        n = self.number_of_nodes()
+        ends = np.concatenate([self.edge_src, self.edge_dst])
+        others = np.concatenate([self.edge_dst, self.edge_src])
+        edge_ids = np.tile(np.arange(self.number_of_edges()), 2)
+        order = np.argsort(ends, kind="stable")
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=n), out=offsets[1:])
+        return offsets, others[order], edge_ids[order]
+
+    def edge_subgraph(self, edge_mask: np.ndarray, node_mask: np.ndarray) -> "SkeletonGraph":
+        """
+        Returns a new graph with the selected edges and nodes; the selected
+        edges must only connect selected nodes. Nodes are renumbered.
+        """
+        new_index = np.cumsum(node_mask) - 1
+        counts = np.diff(self.coord_offsets)[edge_mask]
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        point_mask = np.repeat(edge_mask, np.diff(self.coord_offsets))
+        return SkeletonGraph(
+            self.node_pos[node_mask],
+            new_index[self.edge_src[edge_mask]],
+            new_index[self.edge_dst[edge_mask]],
+            self.edge_length[edge_mask],
+            self.edge_id[edge_mask],
+            self.coords[point_mask],
+            offsets,
+        )
+
+    # --- Geometry ---
+
+    def edge_coords(self, i: int) -> np.ndarray:
+        """The (x, y) pixel path of edge i, as a view into the flat buffer."""
+        return self.coords[self.coord_offsets[i]:self.coord_offsets[i + 1]]
+
+    def edge_polylines(self) -> List[np.ndarray]:
+        """The (x, y) pixel path of every edge, as views into the flat buffer."""
+        if self.number_of_edges() == 0:
+            return []
+        return np.split(self.coords, self.coord_offsets[1:-1])
+
+    def segments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (N, 2) float64 start and end points of every straight
+        pixel-to-pixel segment of every edge.
+        """
+        if len(self.coords) < 2:
+            empty = np.empty((0, 2), dtype=np.float64)
+            return empty, empty.copy()
+        points = self.coords.astype(np.float64)
+        # Segment k joins points k and k + 1, except across the end of an edge.
+        valid = np.ones(len(points) - 1, dtype=bool)
+        valid[self.coord_offsets[1:-1] - 1] = False
+        return points[:-1][valid], points[1:][valid]
+
+
+def build_graph_from_skeleton(skeleton: np.ndarray, with_summary: bool = False):
+    """
+    Builds a graph representation from a skeleton image using skan.
+
+    Branch endpoints, lengths and pixel paths are read in bulk from the
+    Skeleton's path index (a CSR matrix whose row i lists the pixel ids along
+    branch i), so no per-branch Python work is done. Nodes are the branch
+    endpoints, positioned at their pixel coordinates. Closed loops (a branch
+    whose ends are the same node) are skipped, and parallel branches between
+    the same pair of nodes collapse to one edge carrying the last branch.
+
+    Args:
+        skeleton: The skeleton image.
+        with_summary: Also compute skan's per-branch summary DataFrame, which
+            is costly and only needed for debugging.
+
+    Returns:
+        A tuple (SkeletonGraph, summary DataFrame or None).
     """
     skel_bool = skeleton.astype(bool)
+    if not skel_bool.any():
+        return SkeletonGraph.empty(), None
     graph_obj = Skeleton(skel_bool)
 
-    # Use summarize to get a dataframe of all branches. The index of this
-    # dataframe contains the correct, unique path IDs.
-    summary_df = summarize(graph_obj, separator='-')
-
-    G = nx.Graph()
-    node_map = {}
-    next_node_id = 0
-
-    # Iterate over the paths identified by summarize()
-    for path_id, branch_data in summary_df.iterrows():
-        # Get start and end node pixel indices from the summary
-        start_node_idx = int(branch_data['node-id-src'])
-        end_node_idx = int(branch_data['node-id-dst'])
-
-        # Get or create node for the start pixel
-        if start_node_idx not in node_map:
-            node_map[start_node_idx] = next_node_id
-            pos_y, pos_x = np.unravel_index(start_node_idx, skeleton.shape)
-            G.add_node(next_node_id, pos=(int(pos_x), int(pos_y)))
-            next_node_id += 1
-
-        # Get or create node for the end pixel
-        if end_node_idx not in node_map:
-            node_map[end_node_idx] = next_node_id
-            pos_y, pos_x = np.unravel_index(end_node_idx, skeleton.shape)
-            G.add_node(next_node_id, pos=(int(pos_x), int(pos_y)))
-            next_node_id += 1
-
-        u = node_map[start_node_idx]
-        v = node_map[end_node_idx]
-
-        if u == v:
-            continue
+    indptr = graph_obj.paths.indptr
+    indices = graph_obj.paths.indices
+    src = indices[indptr[:-1]]
+    dst = indices[indptr[1:] - 1]
+    lengths = graph_obj.path_lengths()
 
-        # Fetch the path coordinates using the correct path_id from the summary
-        path_coords = graph_obj.path_coordinates(path_id)
-        path_coords_xy = np.fliplr(path_coords)
+    # Closed loops are not edges between two nodes.
+    branches = np.nonzero(src != dst)[0]
+    src, dst = src[branches], dst[branches]
 
-        G.add_edge(
-            u,
-            v,
-            id=int(path_id),
-            length=branch_data['branch-distance'],
-            coords=path_coords_xy.copy()
-        )
+    # Number nodes by first appearance as a branch endpoint.
+    endpoints = np.column_stack([src, dst]).ravel()
+    pixel_ids, first_seen, inverse = np.unique(endpoints, return_index=True, return_inverse=True)
+    rank = np.empty(len(pixel_ids), dtype=np.int64)
+    rank[np.argsort(first_seen, kind="stable")] = np.arange(len(pixel_ids))
+    node_of = rank[inverse.ravel()].reshape(-1, 2)
+    node_pixels = np.empty(len(pixel_ids), dtype=np.int64)
+    node_pixels[rank] = pixel_ids
+    # skan coordinates are (row, col); the graph uses (x, y).
+    node_pos = graph_obj.coordinates[node_pixels][:, ::-1]
+
+    # One edge per node pair: it sits where the pair first appears and
+    # holds the pair's last branch.
+    u, v = node_of[:, 0], node_of[:, 1]
+    pair = np.minimum(u, v) * len(pixel_ids) + np.maximum(u, v)
+    _, first, pair_index = np.unique(pair, return_index=True, return_inverse=True)
+    last = np.full(len(first), -1, dtype=np.int64)
+    np.maximum.at(last, pair_index.ravel(), np.arange(len(pair)))
+    order = np.argsort(first, kind="stable")
+    first, last = first[order], last[order]
+    path_ids = branches[last]
+
+    # Gather the selected pixel paths into one flat buffer.
+    starts = indptr[path_ids]
+    counts = indptr[path_ids + 1] - starts
+    coord_offsets = np.zeros(len(path_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=coord_offsets[1:])
+    pixel_pos = np.arange(coord_offsets[-1]) - np.repeat(coord_offsets[:-1] - starts, counts)
+    coords = graph_obj.coordinates[indices[pixel_pos]][:, ::-1]
+
+    graph = SkeletonGraph(
+        node_pos,
+        u[first],
+        v[first],
+        lengths[path_ids],
+        path_ids,
+        coords,
+        coord_offsets,
+    )
 
-    # The rest of the pipeline expects a summary dataframe.
-    # We can return the one we generated.
-    return G, summary_df
+    summary_df = summarize(graph_obj, separator='-') if with_summary else None
+    return graph, summary_df
 
 
-def prune_graph(G: nx.Graph, prune_ratio: float):
+def prune_mask(G: SkeletonGraph, prune_ratio: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the edges and nodes that survive pruning, without modifying G.
+
+    Short dangling branches (edges shorter than `prune_ratio` times the median
+    edge length with a degree-1 end) are removed repeatedly. Removing an edge
+    only lowers degrees, so an edge that is dangling stays so until removed and
+    the end result does not depend on the removal order. A worklist of degree-1
+    nodes therefore only revisits the far end of each removed edge, and each
+    node enters it at most once.
+
+    Returns:
+        A tuple (edge_alive, node_keep) of boolean masks over G's edges and nodes.
+    """
+    n_edges = G.number_of_edges()
+    edge_alive = np.ones(n_edges, dtype=bool)
+    node_keep = np.ones(G.number_of_nodes(), dtype=bool)
+    if n_edges == 0:
+        return edge_alive, node_keep
+
+    # Using median is more robust to outliers than mean
+    threshold = prune_ratio * np.median(G.edge_length)
+    short = (G.edge_length < threshold).tolist()
+    if not any(short):
+        return edge_alive, node_keep
+
+    offsets, neighbors, edges = (a.tolist() for a in G.adjacency())
+    initial_degrees = G.degrees
+    degrees = initial_degrees.tolist()
+    alive = [True] * n_edges
+    worklist = [node for node, degree in enumerate(degrees) if degree == 1]
+
+    while worklist:
+        node = worklist.pop()
+        if degrees[node] != 1:
+            continue
+        # The single edge still attached to this endpoint
+        for k in range(offsets[node], offsets[node + 1]):
+            if alive[edges[k]]:
+                edge, other = edges[k], neighbors[k]
+                break
+        if not short[edge]:
+            continue
+        alive[edge] = False
+        degrees[node] -= 1
+        degrees[other] -= 1
+        if degrees[other] == 1:
+            worklist.append(other)
+
+    edge_alive[:] = alive
+    # Nodes left without any edge by the pruning are dropped; isolated nodes are kept.
+    node_keep[:] = (np.asarray(degrees) > 0) | (initial_degrees == 0)
+    return edge_alive, node_keep
+
+
+def prune_graph(G: SkeletonGraph, prune_ratio: float) -> SkeletonGraph:
     """
     Iteratively prunes short, dangling branches from the graph.
     A dangling branch is an edge connected to a degree-1 node (an endpoint).
+    Nodes left without any edge by the pruning are removed.
+
+    G itself is left untouched, so its node and edge counts remain available.
     """
-    if not G.nodes or not G.edges:
+    if G.number_of_nodes() == 0 or G.number_of_edges() == 0:
         return G
-
-    edge_lengths = [data['length'] for _, _, data in G.edges(data=True)]
-    if not edge_lengths:
+    edge_alive, node_keep = prune_mask(G, prune_ratio)
+    if edge_alive.all() and node_keep.all():
         return G
+    return G.edge_subgraph(edge_alive, node_keep)
 
-    # Using median is more robust to outliers than mean
-    median_edge_length = np.median(edge_lengths)
-    threshold = prune_ratio * median_edge_length
-
-    while True:
-        removed = False
-        # We need to compute degrees on each iteration as they change.
-        degrees = dict(G.degree())
-        endpoints = [node for node, degree in degrees.items() if degree == 1]
-
-        if not endpoints:
-            break
-
-        edges_to_remove = []
-        for node in endpoints:
-            # Node degree might have changed if a connected edge was removed in a previous pass
-            # This check is redundant in this specific loop structure but is good practice
-            if G.degree(node) != 1: continue
-
-            # There should be exactly one neighbor for a degree-1 node
-            neighbor = list(G.neighbors(node))[0]
-            edge_data = G.get_edge_data(node, neighbor)
-
-            if edge_data and edge_data['length'] < threshold:
-                edges_to_remove.append((node, neighbor))
-
-        if not edges_to_remove:
-            break
-
-        for u, v in edges_to_remove:
-            if G.has_edge(u, v):
-                G.remove_edge(u, v)
-                # Check if nodes have become isolated and remove them
-                if G.degree(u) == 0:
-                    G.remove_node(u)
-                if G.degree(v) == 0:
-                    G.remove_node(v)
-                removed = True
-
-        if not removed:
-            break
-
-    return G
 
-def fill_gaps(G: nx.Graph, max_gap_px: float):
+def fill_gaps(G: SkeletonGraph, max_gap_px: float):
     """
     Placeholder for gap-filling logic.
     """
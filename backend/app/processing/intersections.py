@@ -1,9 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-import networkx as nx
+from scipy.spatial import cKDTree
 from shapely.geometry import LineString, MultiLineString, Point
 from sklearn.cluster import DBSCAN
 
+from .graph import SkeletonGraph
+from .segments import (
+    polylines_to_segments, SegmentIndex, intersect_segment_pairs, annulus_candidates, intersect_segments_circles
+)
+
 # Normative scoring profiles
 NORM_PROFILES = {
     "ASTM": {"jonction": 1.5, "régulière": 1.0, "extrémité": 0.5},
@@ -11,25 +16,17 @@ NORM_PROFILES = {
 }
 
 
-def detect_and_cluster_intersections(
-    motifs: List[Dict[str, Any]],
-    graph: nx.Graph,
-    epsilon_px: float,
-    norm_profile: str = "ASTM"
-) -> List[Dict[str, Any]]:
+def _raw_intersections_shapely(
+    motifs: List[Dict[str, Any]], graph: SkeletonGraph, index: Optional[SegmentIndex] = None
+):
     """
-    Detects, clusters, classifies, and scores intersections between motifs and the skeleton graph.
+    Reference engine: intersects each motif with a Shapely MultiLineString
+    of the whole skeleton. `index` is not used.
     """
     # 1. Vectorize the skeleton graph into a single MultiLineString for efficient intersection
-    all_edges = []
-    for u, v, data in graph.edges(data=True):
-        # coords from skan are (row, col) -> (y, x)
-        coords = data.get('coords')
-        if coords is not None and len(coords) >= 2:
-            # The graph now stores coords in (x, y) format directly.
-            all_edges.append(LineString(coords))
-
-    skeleton_multiline = MultiLineString(all_edges)
+    skeleton_multiline = MultiLineString([
+        LineString(coords) for coords in graph.edge_polylines() if len(coords) >= 2
+    ])
 
     # 2. Detect all raw intersection points
     raw_intersections = []
@@ -64,6 +61,123 @@ def detect_and_cluster_intersections(
             raw_intersections.append([p.x, p.y])
             motif_ids_map.append(motif["id"])
 
+    return raw_intersections, motif_ids_map
+
+
+def _raw_intersections_numpy(
+    motifs: List[Dict[str, Any]], graph: SkeletonGraph, index: Optional[SegmentIndex] = None
+):
+    """
+    Vectorized engine: flattens the skeleton into segment arrays. Polyline
+    motifs are flattened too, paired with skeleton segments through a
+    uniform-grid index and solved in one batch. Circular motifs are solved
+    analytically from their center and radius, against the segments that
+    pass an annulus test.
+
+    `index` may supply the graph's prebuilt `SegmentIndex`, to share it
+    between calls on the same graph.
+    """
+    if index is None:
+        index = SegmentIndex(*graph.segments())
+    skel_starts, skel_ends = index.starts, index.ends
+    circle_ids = [i for i, motif in enumerate(motifs) if "radius" in motif]
+    line_ids = [i for i, motif in enumerate(motifs) if "radius" not in motif]
+
+    # Points found on each motif, with their position along it: the motif
+    # segment and the parameter on it, or the angle on a circle.
+    owners, points, segment_keys, positions = [], [], [], []
+
+    if line_ids:
+        motif_starts, motif_ends, motif_owner = polylines_to_segments(
+            [np.asarray(motifs[i]["geometry"].coords) for i in line_ids]
+        )
+        query_ids, segment_ids = index.candidate_pairs(motif_starts, motif_ends)
+        pair_ids, line_points, t = intersect_segment_pairs(
+            motif_starts[query_ids], motif_ends[query_ids],
+            skel_starts[segment_ids], skel_ends[segment_ids]
+        )
+        motif_segment = query_ids[pair_ids]
+        owners.append(np.asarray(line_ids, dtype=np.int64)[motif_owner[motif_segment]])
+        points.append(line_points)
+        segment_keys.append(motif_segment)
+        positions.append(t)
+
+    # Concentric circles share the annulus prefilter of their center.
+    centers = {}
+    for i in circle_ids:
+        centers.setdefault(tuple(motifs[i]["center"]), []).append(i)
+    for center, ids in centers.items():
+        radii = np.array([motifs[i]["radius"] for i in ids], dtype=np.float64)
+        circle_index, segment_ids = annulus_candidates(skel_starts, skel_ends, center, radii)
+        pair_ids, circle_points, angles = intersect_segments_circles(
+            skel_starts[segment_ids], skel_ends[segment_ids],
+            np.broadcast_to(np.asarray(center, dtype=np.float64), (len(segment_ids), 2)),
+            radii[circle_index]
+        )
+        owners.append(np.asarray(ids, dtype=np.int64)[circle_index[pair_ids]])
+        points.append(circle_points)
+        segment_keys.append(np.zeros(len(pair_ids), dtype=np.int64))
+        positions.append(angles)
+
+    if not points or sum(len(p) for p in points) == 0:
+        return [], []
+    owner = np.concatenate(owners)
+    points = np.concatenate(points)
+    segment_key = np.concatenate(segment_keys)
+    position = np.concatenate(positions)
+
+    # Order the points along each motif, and drop the duplicates found on both
+    # sides of a shared skeleton vertex, as Shapely's noding does.
+    rounded = np.round(points, 6)
+    order = np.lexsort((position, segment_key, owner))
+    _, first = np.unique(
+        np.column_stack([owner[order], rounded[order]]), axis=0, return_index=True
+    )
+    keep = order[np.sort(first)]
+
+    raw_intersections = points[keep].tolist()
+    motif_ids_map = [motifs[i]["id"] for i in owner[keep]]
+    return raw_intersections, motif_ids_map
+
+
+INTERSECTION_ENGINES = {
+    "numpy": _raw_intersections_numpy,
+    "shapely": _raw_intersections_shapely,
+}
+
+
+def detect_and_cluster_intersections(
+    motifs: List[Dict[str, Any]],
+    graph: SkeletonGraph,
+    epsilon_px: float,
+    norm_profile: str = "ASTM",
+    engine: str = "numpy",
+    index: Optional[SegmentIndex] = None
+) -> List[Dict[str, Any]]:
+    """
+    Detects, clusters, classifies, and scores intersections between motifs and the skeleton graph.
+
+    `engine` selects how raw motif/skeleton crossings are found: "numpy"
+    (vectorized, the default) or "shapely" (the reference implementation).
+    The numpy engine reuses `index`, the graph's SegmentIndex, when given.
+    """
+    if engine not in INTERSECTION_ENGINES:
+        raise ValueError(f"Unknown intersection engine: {engine}")
+    raw_intersections, motif_ids_map = INTERSECTION_ENGINES[engine](motifs, graph, index)
+    return cluster_intersections(raw_intersections, motif_ids_map, graph, epsilon_px, norm_profile)
+
+
+def cluster_intersections(
+    raw_intersections: List[List[float]],
+    motif_ids_map: List[Any],
+    graph: SkeletonGraph,
+    epsilon_px: float,
+    norm_profile: str = "ASTM"
+) -> List[Dict[str, Any]]:
+    """
+    Clusters raw crossing points (with the id of the motif each lies on)
+    within `epsilon_px`, then classifies and scores every cluster.
+    """
     if not raw_intersections:
         return []
 
@@ -72,55 +186,64 @@ def detect_and_cluster_intersections(
     db = DBSCAN(eps=epsilon_px, min_samples=1).fit(X)
     labels = db.labels_
 
-    # 4. Process each cluster to create a single intersection record
-    classified_intersections = []
-
-    # Get node positions for classification
-    junction_nodes = {data['pos']: nid for nid, data in graph.nodes(data=True) if graph.degree(nid) >= 3}
-    endpoint_nodes = {data['pos']: nid for nid, data in graph.nodes(data=True) if graph.degree(nid) == 1}
-
-    score_rules = NORM_PROFILES.get(norm_profile, NORM_PROFILES["ASTM"])
+    # 4. Group points by cluster in a single pass: a stable sort keeps each
+    # cluster's points in detection order, so its first point comes first.
+    # Noise (-1) should not happen with min_samples=1.
+    order = np.argsort(labels, kind="stable")
+    order = order[labels[order] != -1]
+    cluster_ids, starts, counts = np.unique(labels[order], return_index=True, return_counts=True)
+    if len(cluster_ids) == 0:
+        return []
 
-    for cluster_id in set(labels):
-        if cluster_id == -1: continue # Noise point, should not happen with min_samples=1
+    # Representative point is the centroid of the cluster
+    centroids = np.add.reduceat(X[order], starts, axis=0) / counts[:, None]
 
-        cluster_points = X[labels == cluster_id]
-        cluster_motif_ids = [motif_ids_map[i] for i, label in enumerate(labels) if label == cluster_id]
+    # 5. Classify every cluster with one nearest-node query per node kind:
+    # junction if a junction node is within epsilon, else endpoint if an
+    # endpoint node is, else a regular crossing.
+    positions = graph.node_pos.astype(np.float64)
+    degrees = graph.degrees
 
-        # Representative point is the centroid of the cluster
-        center_x, center_y = np.mean(cluster_points, axis=0)
+    def within_epsilon(node_mask: np.ndarray) -> np.ndarray:
+        if not node_mask.any():
+            return np.zeros(len(centroids), dtype=bool)
+        tree = cKDTree(positions[node_mask])
+        # Pad the bound slightly so that nodes at exactly epsilon are returned.
+        dist, _ = tree.query(centroids, k=1, distance_upper_bound=epsilon_px * (1 + 1e-9) + 1e-9)
+        return dist <= epsilon_px
 
-        # 5. Classify the cluster
-        intersection_type = "régulière" # Default type
+    near_junction = within_epsilon(degrees >= 3)
+    near_endpoint = within_epsilon(degrees == 1)
 
-        # Check for proximity to a junction node
-        is_junction = False
-        for pos, nid in junction_nodes.items():
-            dist = np.sqrt((center_x - pos[0])**2 + (center_y - pos[1])**2)
-            if dist <= epsilon_px:
-                intersection_type = "jonction"
-                is_junction = True
-                break
+    score_rules = NORM_PROFILES.get(norm_profile, NORM_PROFILES["ASTM"])
 
-        # If not a junction, check for proximity to an endpoint node
-        if not is_junction:
-            for pos, nid in endpoint_nodes.items():
-                dist = np.sqrt((center_x - pos[0])**2 + (center_y - pos[1])**2)
-                if dist <= epsilon_px:
-                    intersection_type = "extrémité"
-                    break
+    classified_intersections = []
+    for k, cluster_id in enumerate(cluster_ids):
+        if near_junction[k]:
+            intersection_type = "jonction"
+        elif near_endpoint[k]:
+            intersection_type = "extrémité"
+        else:
+            intersection_type = "régulière"
 
         # Assign score
         score = score_rules.get(intersection_type, 1.0)
 
+        # Every motif crossing the cluster, in detection order
+        cluster_motif_ids = list(dict.fromkeys(
+            motif_ids_map[i] for i in order[starts[k]:starts[k] + counts[k]]
+        ))
+
+        center_x, center_y = centroids[k]
         classified_intersections.append({
             "id": int(cluster_id) + 1,
             "x": center_x,
             "y": center_y,
             "type": intersection_type,
             "score": score,
-            # For simplicity, we assign the motif_id of the first point in the cluster
-            "motif_id": cluster_motif_ids[0]
+            # The motif of the first point in the cluster
+            "motif_id": cluster_motif_ids[0],
+            "motif_ids": cluster_motif_ids
         })
 
     return classified_intersections
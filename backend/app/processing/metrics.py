@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Tuple
 import numpy as np
-from ..schemas.models import Metrics
+from scipy import stats
+from ..schemas.models import Metrics, GrainSizeSummary
 
 
 def compute_final_metrics(
@@ -75,3 +76,38 @@ def compute_final_metrics(
         warnings.append(f"Low number of intersections ({int(N_int)}) may lead to statistically insignificant results.")
 
     return metrics, warnings
+
+
+def summarize_grain_sizes(g_values: List[float], confidence: float = 0.95) -> GrainSizeSummary:
+    """
+    Aggregates G values from several measurements (e.g. the images of a lot).
+
+    Args:
+        g_values: The G value of each measurement.
+        confidence: Confidence level of the interval on the mean.
+
+    Returns:
+        A GrainSizeSummary. The standard deviation and interval need at least
+        two values and are left unset otherwise.
+    """
+    n = len(g_values)
+    if n == 0:
+        return GrainSizeSummary(n=0, confidence=confidence)
+
+    g = np.asarray(g_values, dtype=float)
+    G_mean = float(np.mean(g))
+    if n < 2:
+        return GrainSizeSummary(n=n, G_mean=G_mean, confidence=confidence)
+
+    G_std = float(np.std(g, ddof=1))
+    # Two-sided Student-t interval of the mean
+    half_width = stats.t.ppf(0.5 + confidence / 2, n - 1) * G_std / np.sqrt(n)
+
+    return GrainSizeSummary(
+        n=n,
+        G_mean=G_mean,
+        G_std=G_std,
+        G_ci_low=G_mean - half_width,
+        G_ci_high=G_mean + half_width,
+        confidence=confidence
+    )
@@ -0,0 +1,119 @@
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+from scipy import stats
+
+from ..schemas.models import MonteCarloStats
+from .graph import SkeletonGraph
+from .segments import SegmentIndex
+from .motifs import generate_motifs
+from .intersections import _raw_intersections_numpy, cluster_intersections
+from .metrics import compute_final_metrics, summarize_grain_sizes
+
+# Seeds whose motif sets are intersected together in one batch.
+BATCH_SEEDS = 8
+# Seeds evaluated before early stopping is considered.
+MIN_SEEDS = 5
+
+
+def _seed_batch(
+    image_shape: tuple,
+    motif_params: Dict[str, Any],
+    seeds: List[int],
+    graph: SkeletonGraph,
+    index: SegmentIndex,
+    epsilon_px: float,
+    norm_profile: str,
+    pixel_size_um: float,
+):
+    """
+    Measures the motif sets of several seeds with one batched intersection
+    query. Returns the Metrics of each seed, in order.
+    """
+    motif_sets = [generate_motifs(image_shape, motif_params, seed) for seed in seeds]
+    # Tag the motif ids with their set so that the crossings can be split apart.
+    combined = [{**motif, "id": (k, motif["id"])} for k, motifs in enumerate(motif_sets) for motif in motifs]
+    raw_intersections, motif_ids_map = _raw_intersections_numpy(combined, graph, index)
+
+    set_of_point = np.array([k for k, _ in motif_ids_map], dtype=np.int64)
+    points = np.asarray(raw_intersections, dtype=np.float64).reshape(-1, 2)
+    results = []
+    for k, motifs in enumerate(motif_sets):
+        mine = np.nonzero(set_of_point == k)[0]
+        intersections = cluster_intersections(
+            points[mine].tolist(), [motif_ids_map[i][1] for i in mine], graph, epsilon_px, norm_profile
+        )
+        metrics, _ = compute_final_metrics(motifs, intersections, pixel_size_um)
+        results.append(metrics)
+    return results
+
+
+def monte_carlo_linear_stats(
+    image_shape: tuple,
+    graph: SkeletonGraph,
+    index: SegmentIndex,
+    epsilon_px: float,
+    params,
+    pixel_size_um: float,
+) -> MonteCarloStats:
+    """
+    Measures G over independent linear motif sets drawn from the seeds
+    random_seed, random_seed + 1, ..., all against the same graph and its
+    prebuilt SegmentIndex. Seed random_seed + k gives the same G as an
+    analysis with that random_seed.
+
+    Up to `params.monte_carlo_seeds` sets are measured, BATCH_SEEDS at a time.
+    With a `monte_carlo_target_accuracy`, it stops once at least MIN_SEEDS
+    sets reach it. Sets without any intersection have no G and are left out.
+    """
+    max_seeds = params.monte_carlo_seeds
+    target = params.monte_carlo_target_accuracy or None
+    confidence = params.monte_carlo_confidence
+
+    g_values = []
+    ell_um_values = []
+    seeds_used = 0
+    without_intersections = 0
+    relative_accuracy = None
+    seeds_needed = None
+    converged = False
+
+    while seeds_used < max_seeds and not converged:
+        seeds = [params.random_seed + seeds_used + k for k in range(min(BATCH_SEEDS, max_seeds - seeds_used))]
+        for metrics in _seed_batch(
+            image_shape, params.motifs, seeds, graph, index, epsilon_px, params.norm_profile, pixel_size_um
+        ):
+            if metrics.N_int > 0:
+                g_values.append(metrics.G)
+                # ell_um is rounded for display
+                ell_um_values.append(metrics.ell_mm * 1000.0)
+            else:
+                without_intersections += 1
+        seeds_used += len(seeds)
+
+        n = len(ell_um_values)
+        if n < 2:
+            continue
+        ell = np.asarray(ell_um_values)
+        ell_mean = float(np.mean(ell))
+        t = stats.t.ppf(0.5 + confidence / 2, n - 1)
+        spread = t * float(np.std(ell, ddof=1))
+        relative_accuracy = spread / math.sqrt(n) / ell_mean
+        if target is not None:
+            # Seeds with intersections needed, scaled back up by the share that has some
+            needed = math.ceil((spread / (target * ell_mean)) ** 2)
+            seeds_needed = max(math.ceil(needed * seeds_used / n), MIN_SEEDS)
+            converged = seeds_used >= MIN_SEEDS and relative_accuracy <= target
+
+    return MonteCarloStats(
+        seeds_used=seeds_used,
+        seeds_without_intersections=without_intersections,
+        G_values=g_values,
+        G=summarize_grain_sizes(g_values, confidence),
+        ell_um_mean=float(np.mean(ell_um_values)) if ell_um_values else None,
+        relative_accuracy=relative_accuracy,
+        target_relative_accuracy=target,
+        seeds_needed=seeds_needed,
+        converged=converged,
+    )
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import numpy as np
 from shapely.geometry import LineString, Point
 
@@ -18,62 +18,87 @@ def generate_motifs(image_shape: tuple, params: Dict[str, Any], seed: int) -> Li
         raise ValueError(f"Unknown motif type: {motif_type}")
 
 
-def _generate_linear_motifs(image_shape: tuple, params: Dict[str, Any], rng) -> List[Dict[str, Any]]:
-    motifs = []
+def _clip_segments_to_box(starts: np.ndarray, ends: np.ndarray, w: float, h: float):
+    """
+    Clips segments to the [0, w] x [0, h] image box (Liang-Barsky).
+    Returns the clipped (starts, ends) and a mask of the segments that keep
+    a non-zero length.
+    """
+    d = ends - starts
+    t0 = np.zeros(len(starts))
+    t1 = np.ones(len(starts))
+    for p, q in (
+        (-d[:, 0], starts[:, 0]), (d[:, 0], w - starts[:, 0]),
+        (-d[:, 1], starts[:, 1]), (d[:, 1], h - starts[:, 1]),
+    ):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+        entering = p < 0
+        leaving = p > 0
+        t0 = np.where(entering, np.maximum(t0, r), t0)
+        t1 = np.where(leaving, np.minimum(t1, r), t1)
+        # Parallel to this edge and outside of it
+        t1 = np.where((p == 0) & (q < 0), -1.0, t1)
+    keep = t1 > t0
+    return starts + t0[:, None] * d, starts + t1[:, None] * d, keep
+
+
+def draw_linear_lines(image_shape: tuple, params: Dict[str, Any], rng) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Draws the linear test lines of one motif set, clipped to the image.
+
+    Returns:
+        A tuple (indices, starts, ends): the index of each kept line among the
+        `count` drawn, and its (x, y) end points.
+    """
     h, w = image_shape
     count = params.get("count", 10)
     length_px = params.get("length_px", min(h, w) * 0.8)
     orientations = params.get("orientations", [0, 45, 90, 135])
 
-    for i in range(count):
-        # Choose a random orientation
-        angle_deg = rng.choice(orientations)
-        angle_rad = np.deg2rad(angle_deg)
+    # Define a safe area for the center of the line to be generated
+    # This prevents the line from starting too close to the edge.
+    # A simple padding is more robust than complex trigonometric buffers.
+    pad_x = w * 0.1
+    pad_y = h * 0.1
 
-        # Define a safe area for the center of the line to be generated
-        # This prevents the line from starting too close to the edge.
-        # A simple padding is more robust than complex trigonometric buffers.
-        pad_x = w * 0.1
-        pad_y = h * 0.1
+    # Ensure the range is valid, especially for very thin images
+    low_x, high_x = pad_x, w - pad_x
+    low_y, high_y = pad_y, h - pad_y
 
-        # Ensure the range is valid, especially for very thin images
-        low_x, high_x = pad_x, w - pad_x
-        low_y, high_y = pad_y, h - pad_y
+    centers = np.empty((count, 2))
+    angles_deg = np.empty(count)
+    for i in range(count):
+        # Choose a random orientation
+        angles_deg[i] = rng.choice(orientations)
 
         if low_x >= high_x or low_y >= high_y:
             # Fallback to center if padding is too large for image dimensions
-            center_x, center_y = w/2, h/2
+            centers[i] = (w / 2, h / 2)
         else:
-            center_x = rng.uniform(low_x, high_x)
-            center_y = rng.uniform(low_y, high_y)
-
-        # Calculate start and end points
-        dx = (length_px / 2) * np.cos(angle_rad)
-        dy = (length_px / 2) * np.sin(angle_rad)
+            centers[i] = (rng.uniform(low_x, high_x), rng.uniform(low_y, high_y))
 
-        x1, y1 = center_x - dx, center_y - dy
-        x2, y2 = center_x + dx, center_y + dy
+    # Calculate start and end points
+    angles_rad = np.deg2rad(angles_deg)
+    half = (length_px / 2) * np.column_stack([np.cos(angles_rad), np.sin(angles_rad)])
 
-        # Clip line to image boundaries to be safe
-        line = LineString([(x1, y1), (x2, y2)])
-        bounds = LineString([(0,0), (w,0), (w,h), (0,h), (0,0)])
-        clipped_line = line.intersection(bounds.buffer(0.1))
+    # Clip lines to the image boundaries; a line clipped to nothing or to a
+    # single point is dropped.
+    starts, ends, keep = _clip_segments_to_box(centers - half, centers + half, w, h)
+    indices = np.nonzero(keep)[0]
+    return indices, starts[keep], ends[keep]
 
-        if clipped_line.is_empty or not isinstance(clipped_line, LineString):
-            continue
-
-        final_coords = list(clipped_line.coords)
-
-        # A valid LineString requires at least two points. Clipping can reduce a
-        # line to a single point or nothing.
-        if len(final_coords) < 2:
-            continue
 
+def _generate_linear_motifs(image_shape: tuple, params: Dict[str, Any], rng) -> List[Dict[str, Any]]:
+    indices, starts, ends = draw_linear_lines(image_shape, params, rng)
+    motifs = []
+    for i, start, end in zip(indices.tolist(), starts.tolist(), ends.tolist()):
+        line = LineString([start, end])
         motifs.append({
             "id": f"L-{i}",
             "type": "linear",
-            "geometry": LineString(final_coords),
-            "length_px": clipped_line.length
+            "geometry": line,
+            "length_px": line.length
         })
 
     return motifs
@@ -92,13 +117,17 @@ def _generate_circular_motifs(image_shape: tuple, params: Dict[str, Any], rng) -
 
     for i, r in enumerate(radii):
         if r > 0:
-            # Shapely represents a circle as a point buffer
+            # Circles are exact primitives: intersections are solved from the
+            # center and radius. The polygonal ring is only used for drawing
+            # and by the Shapely reference engine.
             circle = Point(center_x, center_y).buffer(r).exterior
             motifs.append({
                 "id": f"C-{i}",
                 "type": "circular",
+                "center": (center_x, center_y),
+                "radius": float(r),
                 "geometry": circle,
-                "length_px": circle.length
+                "length_px": 2 * np.pi * r
             })
 
     return motifs
@@ -0,0 +1,362 @@
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .. import config
+from ..schemas.models import AnalysisParameters, AnalysisResult, EdgeStats, Timings, CacheStatus, Overlays, DebugOverlays, DebugStats
+from ..utils.image_utils import create_overlay_image, draw_graph_on_image
+from ..utils.monitoring import observe_analysis
+from ..utils.stage_cache import stage_cache, stage_key, derived_key
+from .preprocess import preprocess_image
+from .skeleton import skeletonize_image, estimate_border_width
+from .tiling import preprocess_image_tiled, skeletonize_image_tiled, estimate_border_width_tiled
+from .graph import SkeletonGraph, build_graph_from_skeleton, prune_graph
+from .motifs import generate_motifs
+from .intersections import detect_and_cluster_intersections
+from .segments import SegmentIndex
+from .montecarlo import monte_carlo_linear_stats
+from .metrics import compute_final_metrics
+from .render import render_artifacts
+
+# The stages reported to `on_stage`, in execution order.
+PIPELINE_STAGES = (
+    "preprocess",
+    "skeleton",
+    "border_width",
+    "graph",
+    "motifs",
+    "intersections",
+    "metrics",
+    "monte_carlo",
+    "render",
+)
+
+# The parts of an AnalysisResult a caller can ask for through `include`.
+# Metrics, warnings and timings are always returned; the other sections are
+# only rendered and serialized on request.
+RESULT_SECTIONS = (
+    "metrics",
+    "intersections",
+    "motifs",
+    "edges",
+    "overlays",
+    "debug",
+)
+
+
+def _build_and_prune_graph(skeleton: np.ndarray, prune_ratio: float, graph: Optional[SkeletonGraph] = None):
+    """
+    Builds the skeleton graph, unless an already built `graph` is given, and prunes it.
+    Returns the node and edge counts before pruning along with the pruned graph.
+    """
+    if graph is None:
+        graph, _ = build_graph_from_skeleton(skeleton)
+
+    # Capture stats before pruning
+    nodes_before = graph.number_of_nodes()
+    edges_before = graph.number_of_edges()
+
+    pruned_graph = prune_graph(graph, prune_ratio)
+    return nodes_before, edges_before, pruned_graph
+
+
+# --- Cached stages ---
+# Each stage is keyed on its upstream stage's key and the parameters it
+# depends on (see STAGE_PARAMS), so callers evaluating several parameter sets
+# share every stage whose inputs did not change.
+
+def _tiling(params: AnalysisParameters, shape) -> Optional[dict]:
+    """
+    The tiling arguments of the image-sized stages, or None when the image
+    fits in one tile. Tiling bounds the float working arrays of the local
+    steps on large images (see the tiled stages for what stays full-frame);
+    it does not change their output, so it is not part of the cache keys.
+    """
+    if params.tile_size > 0 and max(shape[:2]) > params.tile_size:
+        return {"tile_size": params.tile_size, "workers": min(params.tile_workers, config.CPU_SHARE)}
+    return None
+
+
+def preprocess_stage(original_image: np.ndarray, image_digest: str, params: AnalysisParameters):
+    """Returns (key, binary image, cache status) of the preprocessing stage."""
+    tiling = _tiling(params, original_image.shape)
+    preprocess_args = (
+        original_image,
+        params.gaussian_sigma,
+        params.adaptive_block_size,
+        params.adaptive_offset,
+        params.morph_open_kernel,
+        params.area_opening_min_size_px,
+        params.detect_twins,
+        params.threshold_backend
+    )
+    key = stage_key("preprocess", image_digest, params)
+    binary_image, status = stage_cache.get_or_compute(
+        key,
+        lambda: preprocess_image_tiled(*preprocess_args, **tiling) if tiling else preprocess_image(*preprocess_args)
+    )
+    return key, binary_image, status
+
+
+def skeleton_stage(binary_image: np.ndarray, preprocess_key: str, params: AnalysisParameters):
+    """Returns (key, skeleton, cache status) of the skeletonization stage."""
+    tiling = _tiling(params, binary_image.shape)
+    key = stage_key("skeleton", preprocess_key, params)
+    skeleton, status = stage_cache.get_or_compute(
+        key,
+        lambda: skeletonize_image_tiled(binary_image, **tiling) if tiling else skeletonize_image(binary_image)
+    )
+    return key, skeleton, status
+
+
+def border_width_stage(binary_image: np.ndarray, skeleton: np.ndarray, skeleton_key: str, params: AnalysisParameters):
+    """Returns (border width, cache status) of the border width stage."""
+    tiling = _tiling(params, binary_image.shape)
+    return stage_cache.get_or_compute(
+        stage_key("border_width", skeleton_key, params),
+        lambda: (
+            estimate_border_width_tiled(binary_image, skeleton, **tiling) if tiling
+            else estimate_border_width(binary_image, skeleton)
+        )
+    )
+
+
+def graph_stage(
+    skeleton: np.ndarray,
+    skeleton_key: str,
+    params: AnalysisParameters,
+    build_graph: Optional[Callable[[], SkeletonGraph]] = None,
+):
+    """
+    Returns ((nodes before pruning, edges before pruning, pruned graph), cache
+    status) of the graph stage. `build_graph` may supply the unpruned graph,
+    e.g. to share it between several prune ratios.
+    """
+    return stage_cache.get_or_compute(
+        stage_key("graph", skeleton_key, params),
+        lambda: _build_and_prune_graph(
+            skeleton, params.skeleton_prune_ratio, build_graph() if build_graph is not None else None
+        )
+    )
+
+
+def segment_index_stage(pruned_graph: SkeletonGraph, graph_key: str) -> SegmentIndex:
+    """The SegmentIndex of the pruned graph, shared by every motif set measured on it."""
+    index, _ = stage_cache.get_or_compute(
+        derived_key("segment_index", graph_key, {}),
+        lambda: SegmentIndex(*pruned_graph.segments())
+    )
+    return index
+
+
+def run_analysis(
+    original_image: np.ndarray,
+    image_digest: str,
+    params: AnalysisParameters,
+    pixel_size_um: float,
+    on_stage: Optional[Callable[[str], None]] = None,
+    start_total_time: Optional[float] = None,
+    include: Iterable[str] = RESULT_SECTIONS,
+) -> AnalysisResult:
+    """
+    Runs the full analysis pipeline on a decoded image and assembles the result.
+
+    Args:
+        original_image: The decoded BGR image.
+        image_digest: Content digest of the encoded image, used to key the stage cache.
+        params: The analysis parameters.
+        pixel_size_um: The size of one pixel in micrometers.
+        on_stage: Optional callback invoked with each stage name of
+            PIPELINE_STAGES as soon as that stage has completed.
+        start_total_time: Reference time for `total_s`; defaults to now.
+        include: The RESULT_SECTIONS to return. Sections left out are
+            neither rendered nor encoded, and are None in the result.
+            Rendered images are encoded per layer, written to the artifact
+            store and referenced by URL.
+
+    Returns:
+        The complete AnalysisResult.
+    """
+    if start_total_time is None:
+        start_total_time = time.time()
+    include = set(include)
+
+    def stage_done(stage: str):
+        if on_stage is not None:
+            on_stage(stage)
+
+    # --- Full Processing Pipeline ---
+    # Stages up to pruning are cached by image content and the parameters
+    # they depend on, so re-submitting an image while tuning downstream
+    # parameters (motifs, epsilon_factor, norm_profile) skips them.
+    timings = {}
+    cache_status = {}
+
+    # 1. Preprocessing
+    start_time = time.time()
+    preprocess_key, binary_image, cache_status["preprocess"] = preprocess_stage(original_image, image_digest, params)
+    timings["preprocess_s"] = time.time() - start_time
+    stage_done("preprocess")
+
+    # 2. Skeletonization & Border Width
+    start_time = time.time()
+    skeleton_key, skeleton, cache_status["skeleton"] = skeleton_stage(binary_image, preprocess_key, params)
+    timings["skeleton_s"] = time.time() - start_time
+    stage_done("skeleton")
+
+    start_time = time.time()
+    border_width, cache_status["border_width"] = border_width_stage(binary_image, skeleton, skeleton_key, params)
+    timings["border_width_s"] = time.time() - start_time
+    stage_done("border_width")
+
+    # 3. Graph Construction and Pruning
+    start_time = time.time()
+    (nodes_before, edges_before, pruned_graph), cache_status["graph"] = graph_stage(skeleton, skeleton_key, params)
+    segment_index = segment_index_stage(pruned_graph, stage_key("graph", skeleton_key, params))
+
+    # Capture stats after pruning
+    nodes_after = pruned_graph.number_of_nodes()
+    edges_after = pruned_graph.number_of_edges()
+
+    timings["graph_s"] = time.time() - start_time
+    stage_done("graph")
+
+    # 4. Motif Generation
+    start_time = time.time()
+    motifs = generate_motifs(original_image.shape[:2], params.motifs, params.random_seed)
+    motifs_s = time.time() - start_time
+    stage_done("motifs")
+
+    # 5. Intersection Detection
+    start_time = time.time()
+    epsilon = border_width * params.epsilon_factor
+    intersections = detect_and_cluster_intersections(
+        motifs, pruned_graph, epsilon, params.norm_profile, params.intersection_engine, segment_index
+    )
+    timings["intersections_s"] = time.time() - start_time
+    stage_done("intersections")
+
+    # 6. Final Metrics Calculation
+    start_time = time.time()
+    metrics, warnings = compute_final_metrics(motifs, intersections, pixel_size_um)
+    metrics_s = time.time() - start_time
+    stage_done("metrics")
+
+    # 7. Monte Carlo statistics over further linear motif sets
+    monte_carlo = None
+    if params.monte_carlo_seeds > 0:
+        if params.motifs.get("type", "linear") == "linear":
+            start_time = time.time()
+            monte_carlo = monte_carlo_linear_stats(
+                original_image.shape[:2], pruned_graph, segment_index, epsilon, params, pixel_size_um
+            )
+            timings["monte_carlo_s"] = time.time() - start_time
+        else:
+            warnings.append("Monte Carlo statistics need linear motifs; they were skipped.")
+    stage_done("monte_carlo")
+
+    # --- Assemble Result ---
+    # Only the requested sections are rendered. The images are independent
+    # and drawn, encoded and stored in parallel; render_s is the wall time of
+    # that step, encode_s the encoding time summed over the images.
+    start_time = time.time()
+    intersections_out = intersections if "intersections" in include else None
+
+    # Motifs for JSON serialization
+    serializable_motifs = None
+    if "motifs" in include:
+        serializable_motifs = []
+        for motif in motifs:
+            serializable_motif = {
+                "id": motif["id"],
+                "type": motif["type"],
+                "length_px": motif["length_px"],
+                "geometry": {"coordinates": list(motif["geometry"].coords)}
+            }
+            if "radius" in motif:
+                serializable_motif["center"] = list(motif["center"])
+                serializable_motif["radius"] = motif["radius"]
+            serializable_motifs.append(serializable_motif)
+
+    # Edge Stats & Geometry
+    edge_stats = None
+    if "edges" in include:
+        edge_lengths = pruned_graph.edge_length
+        edge_stats = EdgeStats(
+            n_nodes=nodes_after,
+            n_edges=edges_after,
+            mean_edge_length_px=float(np.mean(edge_lengths)) if len(edge_lengths) else 0,
+            edges=[{'coords': coords.tolist()} for coords in pruned_graph.edge_polylines()]
+        )
+
+    render_tasks = {}
+    if include & {"overlays", "debug"}:
+        # One blank canvas for the overlays drawn on black; create_overlay_image
+        # draws on its own copy.
+        blank = np.zeros_like(original_image)
+        # The motifs-only overlay is shared by the overlays and debug sections
+        render_tasks["motifs"] = (lambda: create_overlay_image(blank, motifs=motifs), "graphic")
+    if "overlays" in include:
+        render_tasks["annotated"] = (
+            lambda: create_overlay_image(original_image, skeleton, motifs, intersections), "photo"
+        )
+        render_tasks["skeleton_overlay"] = (lambda: create_overlay_image(blank, skeleton=skeleton), "graphic")
+    if "debug" in include:
+        render_tasks["binary"] = (lambda: binary_image, "mask")
+        render_tasks["skeleton"] = (lambda: skeleton, "mask")
+        # Draw the pruned graph for debugging
+        render_tasks["pruned_graph"] = (lambda: draw_graph_on_image(pruned_graph, original_image.shape), "graphic")
+    urls, artifact_timings = render_artifacts(render_tasks, config.RENDER_WORKERS)
+
+    overlays = None
+    if "overlays" in include:
+        overlays = Overlays(
+            annotated_image_url=urls["annotated"],
+            skeleton_image_url=urls["skeleton_overlay"],
+            motifs_image_url=urls["motifs"]
+        )
+
+    debug_overlays = None
+    debug_stats = None
+    if "debug" in include:
+        debug_overlays = DebugOverlays(
+            binary_image_url=urls["binary"],
+            skeleton_image_url=urls["skeleton"],
+            pruned_graph_image_url=urls["pruned_graph"],
+            motifs_image_url=urls["motifs"],
+        )
+        debug_stats = DebugStats(
+            nodes_before_pruning=nodes_before,
+            edges_before_pruning=edges_before,
+            nodes_after_pruning=nodes_after,
+            edges_after_pruning=edges_after,
+            edge_geometries_count=len(edge_stats.edges) if edge_stats is not None else 0
+        )
+
+    if include & {"motifs", "edges", "overlays", "debug"}:
+        timings["render_s"] = time.time() - start_time
+    if artifact_timings:
+        timings["encode_s"] = sum(t["encode_s"] for t in artifact_timings.values())
+        timings["artifacts"] = artifact_timings
+    stage_done("render")
+
+    timings["total_s"] = time.time() - start_total_time
+    # Stages left out of Timings are only reported to the monitoring
+    stage_seconds = {name[:-2]: value for name, value in timings.items() if name.endswith("_s")}
+    observe_analysis(original_image.shape, {**stage_seconds, "motifs": motifs_s, "metrics": metrics_s}, cache_status)
+
+    return AnalysisResult(
+        metrics=metrics,
+        monte_carlo=monte_carlo,
+        intersections=intersections_out,
+        edges_stats=edge_stats,
+        motifs=serializable_motifs,
+        overlays=overlays,
+        warnings=warnings,
+        timings=Timings(**timings),
+        cache=CacheStatus(**cache_status),
+        params_used=params,
+        debug_overlays=debug_overlays,
+        debug_stats=debug_stats
+    )
@@ -21,8 +21,8 @@ def _detect_and_remove_twins(binary_image: np.ndarray) -> np.ndarray:
 
     # Filter and draw lines. Here, we can add more logic to filter for twins
     # (e.g., based on orientation or relationship to grain boundaries)
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
+    # OpenCV returns the lines as (N, 1, 4) or (N, 4) depending on the version.
+    for x1, y1, x2, y2 in lines.reshape(-1, 4).tolist():
         # Draw the line on the mask with a certain thickness
         cv2.line(twin_mask, (x1, y1), (x2, y2), (255), 2)
 
@@ -33,70 +33,212 @@ def _detect_and_remove_twins(binary_image: np.ndarray) -> np.ndarray:
     return result
 
 
-def preprocess_image(
+def to_gray(image: np.ndarray) -> np.ndarray:
+    """Converts a BGR(A) image to grayscale; grayscale images are returned as is."""
+    if image.ndim == 3 and image.shape[2] in [3, 4]:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def blur(gray: np.ndarray, gaussian_sigma: float) -> np.ndarray:
+    """Gaussian blur to reduce noise."""
+    # The kernel size is determined by sigma. (0,0) lets OpenCV calculate it.
+    return cv2.GaussianBlur(gray, (0, 0), gaussian_sigma)
+
+
+def _surface_skimage(blurred: np.ndarray, adaptive_block_size: int) -> np.ndarray:
+    # skimage's threshold_local is a robust implementation.
+    return skimage.filters.threshold_local(blurred, adaptive_block_size, method='gaussian', offset=0)
+
+
+# The local means OpenCV's adaptiveThreshold uses, computed with the same
+# filters on the uint8 image and rounded to uint8. Unlike adaptiveThreshold
+# this keeps the surface reusable across offsets; the mean variant matches it
+# exactly, the Gaussian one up to the rounding of the blur.
+_CV_BORDER = cv2.BORDER_REPLICATE | cv2.BORDER_ISOLATED
+
+
+def _surface_opencv_gaussian(blurred: np.ndarray, adaptive_block_size: int) -> np.ndarray:
+    size = (adaptive_block_size, adaptive_block_size)
+    return cv2.GaussianBlur(blurred, size, 0, borderType=_CV_BORDER)
+
+
+def _surface_opencv_mean(blurred: np.ndarray, adaptive_block_size: int) -> np.ndarray:
+    size = (adaptive_block_size, adaptive_block_size)
+    return cv2.boxFilter(blurred, -1, size, normalize=True, borderType=_CV_BORDER)
+
+
+def _surface_integral(blurred: np.ndarray, adaptive_block_size: int) -> np.ndarray:
+    # Bradley-Roth: the mean of the block around each pixel, read from an
+    # integral image in four lookups whatever the block size. Blocks are
+    # clipped to the image rather than padded.
+    h, w = blurred.shape
+    half = adaptive_block_size // 2
+    integral = cv2.integral(blurred, sdepth=cv2.CV_64F)
+    # Replicating the integral's first and last rows and columns clamps the
+    # block corners to the image, so every lookup is a plain shifted slice.
+    padded = cv2.copyMakeBorder(integral, half, half, half, half, cv2.BORDER_REPLICATE)
+    k = 2 * half + 1
+    sums = padded[k:k + h, k:k + w] - padded[:h, k:k + w]
+    sums -= padded[k:k + h, :w]
+    sums += padded[:h, :w]
+    # Sizes of the clipped blocks, per row and per column
+    rows = np.arange(h)
+    cols = np.arange(w)
+    row_counts = np.minimum(rows + half + 1, h) - np.maximum(rows - half, 0)
+    col_counts = np.minimum(cols + half + 1, w) - np.maximum(cols - half, 0)
+    sums /= row_counts[:, None]
+    sums /= col_counts[None, :]
+    return sums.astype(np.float32)
+
+
+# How the local threshold surface is computed, selected by the
+# `threshold_backend` parameter. "skimage" (a float64 Gaussian surface) is the
+# reference; the others trade exactness for speed on large images.
+THRESHOLD_BACKENDS = {
+    "skimage": _surface_skimage,
+    "opencv_gaussian": _surface_opencv_gaussian,
+    "opencv_mean": _surface_opencv_mean,
+    "integral": _surface_integral,
+}
+
+
+def threshold_surface(blurred: np.ndarray, adaptive_block_size: int, backend: str = "skimage") -> np.ndarray:
+    """
+    The local threshold of every pixel before the offset is subtracted, so
+    that it can be reused across offsets.
+    """
+    if backend not in THRESHOLD_BACKENDS:
+        raise ValueError(f"Unknown threshold backend: {backend}")
+    return THRESHOLD_BACKENDS[backend](blurred, adaptive_block_size)
+
+
+def binarize_with_surface(
+    blurred: np.ndarray,
+    surface: np.ndarray,
+    adaptive_offset: int = 2,
+    morph_open_kernel: int = 3,
+) -> np.ndarray:
+    """
+    Thresholds the blurred image against `surface` minus the offset, then
+    applies the morphological opening.
+    """
+    # We invert the threshold because the algorithm expects dark boundaries on a
+    # light background. If blurred > th, it's background (False).
+    # We want boundaries, where blurred <= th.
+    if surface.dtype == np.uint8:
+        # Keep the uint8 surfaces from wrapping around below zero
+        surface = surface.astype(np.int16)
+    th = surface - adaptive_offset
+    binary = (blurred <= th)
+
+    # Convert boolean to uint8 for OpenCV operations
+    binary_uint8 = binary.astype(np.uint8) * 255
+
+    # Morphological opening to remove small noise speckles
+    if morph_open_kernel > 0:
+        kernel = np.ones((morph_open_kernel, morph_open_kernel), np.uint8)
+        return cv2.morphologyEx(binary_uint8, cv2.MORPH_OPEN, kernel)
+    return binary_uint8
+
+
+def binarize_local(
     image: np.ndarray,
     gaussian_sigma: float = 1.0,
     adaptive_block_size: int = 101,
     adaptive_offset: int = 2,
     morph_open_kernel: int = 3,
-    area_opening_min_size_px: int = 500,
-    detect_twins: bool = False,
+    threshold_backend: str = "skimage",
 ) -> np.ndarray:
     """
-    Performs preprocessing on the input image to generate a clean binary image of grain boundaries.
+    Runs the neighborhood-local preprocessing steps: grayscale conversion,
+    blur, adaptive thresholding and morphological opening.
 
-    Args:
-        image: Input image as a NumPy array.
-        gaussian_sigma: Sigma for the Gaussian blur filter.
-        adaptive_block_size: Size of the pixel neighborhood for adaptive thresholding.
-        adaptive_offset: Constant subtracted from the mean in adaptive thresholding.
-        morph_open_kernel: Kernel size for morphological opening.
-        area_opening_min_size_px: Minimum size of objects to keep after area opening.
-        detect_twins: If True, attempt to detect and remove twin lines.
+    Each output pixel only depends on input pixels within `local_radius`,
+    which is what allows these steps to run tile by tile.
 
     Returns:
-        A binary image (np.uint8, values 0 or 255) where 255 represents the grain boundaries.
+        A binary image (np.uint8, values 0 or 255) before area opening.
     """
     # 1. Convert to grayscale if necessary
-    if image.ndim == 3 and image.shape[2] in [3, 4]:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
+    gray = to_gray(image)
 
     # 2. Apply Gaussian blur to reduce noise
-    # The kernel size is determined by sigma. (0,0) lets OpenCV calculate it.
-    blurred = cv2.GaussianBlur(gray, (0, 0), gaussian_sigma)
+    blurred = blur(gray, gaussian_sigma)
 
-    # 3. Apply adaptive thresholding (Bradley-Roth method)
-    # skimage's threshold_local is a robust implementation.
-    # The result is a boolean array. We invert it because the algorithm expects
-    # dark boundaries on a light background. If blurred > th, it's background (False).
-    # We want boundaries, where blurred <= th.
-    th = skimage.filters.threshold_local(blurred, adaptive_block_size, method='gaussian', offset=adaptive_offset)
-    binary = (blurred <= th)
+    # 3. Apply adaptive thresholding, then 4. morphological opening
+    surface = threshold_surface(blurred, adaptive_block_size, threshold_backend)
+    return binarize_with_surface(blurred, surface, adaptive_offset, morph_open_kernel)
 
-    # Convert boolean to uint8 for OpenCV operations
-    binary_uint8 = binary.astype(np.uint8) * 255
 
-    # 4. Morphological opening to remove small noise speckles
-    if morph_open_kernel > 0:
-        kernel = np.ones((morph_open_kernel, morph_open_kernel), np.uint8)
-        opened = cv2.morphologyEx(binary_uint8, cv2.MORPH_OPEN, kernel)
-    else:
-        opened = binary_uint8
+def local_radius(gaussian_sigma: float, adaptive_block_size: int, morph_open_kernel: int) -> int:
+    """
+    Upper bound, in pixels, on how far `binarize_local` looks around each pixel:
+    the Gaussian blur, the threshold surface and the opening reach add up.
+    The skimage surface reaches furthest of the threshold backends.
+    """
+    # OpenCV sizes the blur kernel to about 3 sigma for 8-bit images; 4 sigma is a safe bound.
+    blur_radius = int(np.ceil(4 * gaussian_sigma)) + 1
+    # threshold_local uses sigma = (block_size - 1) / 6, truncated at 4 sigma.
+    threshold_radius = int(4 * (adaptive_block_size - 1) / 6.0 + 0.5) + 1
+    # Erosion then dilation, each reaching at most the kernel size.
+    morph_radius = max(morph_open_kernel, 0)
+    return blur_radius + threshold_radius + morph_radius
 
+
+def clean_binary(
+    binary_image: np.ndarray,
+    area_opening_min_size_px: int = 500,
+    detect_twins: bool = False,
+) -> np.ndarray:
+    """
+    Runs the image-wide preprocessing steps on the output of `binarize_local`:
+    area opening of small components and optional twin removal.
+    """
     # 5. Area opening to remove small, disconnected components
     # remove_small_objects works on boolean arrays
     if area_opening_min_size_px > 0:
-        cleaned_bool = remove_small_objects(opened.astype(bool), min_size=area_opening_min_size_px)
+        cleaned_bool = remove_small_objects(binary_image.astype(bool), min_size=area_opening_min_size_px)
         # Invert the image so boundaries are foreground (True) for skeletonization
         final_binary = cleaned_bool.astype(np.uint8) * 255
     else:
-        final_binary = opened
+        final_binary = binary_image
 
     # 6. (Optional) Detect and remove twins
     if detect_twins:
         final_binary = _detect_and_remove_twins(final_binary)
 
-
     return final_binary
+
+
+def preprocess_image(
+    image: np.ndarray,
+    gaussian_sigma: float = 1.0,
+    adaptive_block_size: int = 101,
+    adaptive_offset: int = 2,
+    morph_open_kernel: int = 3,
+    area_opening_min_size_px: int = 500,
+    detect_twins: bool = False,
+    threshold_backend: str = "skimage",
+) -> np.ndarray:
+    """
+    Performs preprocessing on the input image to generate a clean binary image of grain boundaries.
+
+    Args:
+        image: Input image as a NumPy array.
+        gaussian_sigma: Sigma for the Gaussian blur filter.
+        adaptive_block_size: Size of the pixel neighborhood for adaptive thresholding.
+        adaptive_offset: Constant subtracted from the mean in adaptive thresholding.
+        morph_open_kernel: Kernel size for morphological opening.
+        area_opening_min_size_px: Minimum size of objects to keep after area opening.
+        detect_twins: If True, attempt to detect and remove twin lines.
+        threshold_backend: How the local threshold surface is computed, one
+            of THRESHOLD_BACKENDS.
+
+    Returns:
+        A binary image (np.uint8, values 0 or 255) where 255 represents the grain boundaries.
+    """
+    opened = binarize_local(
+        image, gaussian_sigma, adaptive_block_size, adaptive_offset, morph_open_kernel, threshold_backend
+    )
+    return clean_binary(opened, area_opening_min_size_px, detect_twins)
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .. import config
+from ..schemas.models import AnalysisParameters
+from ..utils.stage_cache import StageCache, derived_key
+from .preprocess import to_gray, blur, threshold_surface, binarize_with_surface, clean_binary
+
+
+class SessionCaches:
+    """
+    Memory-only caches of preview intermediates, one per session, each
+    bounded to `max_bytes`, for the `max_sessions` most recently used
+    sessions. Kept apart from the stage cache, so that tweaking a slider
+    on a large image neither evicts the stages of /api/analyze nor writes
+    full-resolution frames to the disk tier.
+    """
+
+    def __init__(self, max_bytes: int, max_sessions: int):
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self._caches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> StageCache:
+        with self._lock:
+            cache = self._caches.get(session_id)
+            if cache is None:
+                cache = StageCache(self.max_bytes)
+                self._caches[session_id] = cache
+            self._caches.move_to_end(session_id)
+            while len(self._caches) > max(self.max_sessions, 1):
+                self._caches.popitem(last=False)
+            return cache
+
+
+session_caches = SessionCaches(config.PREVIEW_CACHE_MAX_BYTES, config.PREVIEW_CACHE_SESSIONS)
+
+
+def _odd(value: float, minimum: int = 3) -> int:
+    size = max(int(round(value)), minimum)
+    return size if size % 2 == 1 else size + 1
+
+
+def scale_preprocess_params(params: AnalysisParameters, scale: float) -> Dict[str, float]:
+    """
+    The preprocessing parameters, which are in pixels of the full image, for
+    an image downscaled by `scale`: lengths scale linearly, areas quadratically.
+    """
+    if scale >= 1:
+        return {
+            "gaussian_sigma": params.gaussian_sigma,
+            "adaptive_block_size": params.adaptive_block_size,
+            "morph_open_kernel": params.morph_open_kernel,
+            "area_opening_min_size_px": params.area_opening_min_size_px,
+        }
+    return {
+        "gaussian_sigma": params.gaussian_sigma * scale,
+        "adaptive_block_size": _odd(params.adaptive_block_size * scale),
+        "morph_open_kernel": max(int(round(params.morph_open_kernel * scale)), 1) if params.morph_open_kernel > 0 else 0,
+        "area_opening_min_size_px": int(round(params.area_opening_min_size_px * scale * scale)),
+    }
+
+
+def preview_preprocess(
+    session_id: str,
+    load_image: Callable[[], np.ndarray],
+    params: AnalysisParameters,
+    max_dim: Optional[int] = None,
+) -> Tuple[np.ndarray, Dict[str, str], Dict[str, float]]:
+    """
+    Preprocesses a preview session's image, reusing cached intermediates.
+
+    The grayscale image (per `max_dim`), its blur (per sigma) and the local
+    threshold surface (per block size and backend) are cached in the
+    session's cache (see SessionCaches), so a parameter change only
+    recomputes the steps downstream of it: changing the offset, the opening
+    kernel, the minimum area or twin detection only re-thresholds against
+    the cached surface.
+
+    With `max_dim`, the image is first downscaled so that its longest side
+    is at most `max_dim` pixels, and the parameters are scaled to match; the
+    preview then approximates the full-resolution result. Without it, the
+    preview is identical to `preprocess_image`.
+
+    Returns:
+        A tuple (binary image, cache status per cached step, timings).
+    """
+    cache_status = {}
+    timings = {}
+    cache = session_caches.get(session_id)
+
+    def cached(step: str, key: str, compute: Callable[[], object]):
+        start = time.time()
+        value, cache_status[step] = cache.get_or_compute(key, compute)
+        timings[f"{step}_s"] = time.time() - start
+        return value
+
+    def load_gray():
+        gray = to_gray(load_image())
+        scale = 1.0
+        if max_dim and max(gray.shape[:2]) > max_dim:
+            scale = max_dim / max(gray.shape[:2])
+            size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return gray, scale
+
+    gray_key = derived_key("preview_gray", session_id, {"max_dim": max_dim})
+    gray, scale = cached("gray", gray_key, load_gray)
+    scaled = scale_preprocess_params(params, scale)
+
+    blur_key = derived_key("preview_blur", gray_key, {"gaussian_sigma": scaled["gaussian_sigma"]})
+    blurred = cached("blur", blur_key, lambda: blur(gray, scaled["gaussian_sigma"]))
+
+    surface_key = derived_key("preview_surface", blur_key, {
+        "adaptive_block_size": scaled["adaptive_block_size"],
+        "threshold_backend": params.threshold_backend,
+    })
+    surface = cached(
+        "threshold", surface_key,
+        lambda: threshold_surface(blurred, scaled["adaptive_block_size"], params.threshold_backend)
+    )
+
+    start = time.time()
+    opened = binarize_with_surface(blurred, surface, params.adaptive_offset, scaled["morph_open_kernel"])
+    binary = clean_binary(opened, scaled["area_opening_min_size_px"], params.detect_twins)
+    timings["binarize_s"] = time.time() - start
+    return binary, cache_status, timings
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from .. import config
+from ..utils.artifact_store import artifact_store
+from ..utils.image_utils import encode_layer
+
+# An artifact to render: a function drawing the image, and its layer kind
+# for `encode_layer`.
+RenderTask = Tuple[Callable[[], np.ndarray], str]
+
+
+def _render_one(task: RenderTask) -> Tuple[str, Dict[str, float]]:
+    draw, kind = task
+    start = time.time()
+    image = draw()
+    drawn = time.time()
+    data, ext = encode_layer(image, kind, config.OVERLAY_FORMAT, config.OVERLAY_QUALITY, config.IMAGE_COMPRESSION)
+    url = artifact_store.url(artifact_store.put(data, ext))
+    return url, {"draw_s": drawn - start, "encode_s": time.time() - drawn}
+
+
+def render_artifacts(
+    tasks: Dict[str, RenderTask], workers: int = 1
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, float]]]:
+    """
+    Draws, encodes and stores independent artifacts, on a thread pool when
+    `workers` > 1: OpenCV drawing and the Pillow/zlib encoders release the GIL.
+
+    Returns:
+        A tuple (urls, timings) keyed like `tasks`: the artifact URL of each
+        image, and its drawing and encoding times.
+    """
+    names = list(tasks)
+    if workers > 1 and len(names) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(names))) as executor:
+            rendered = list(executor.map(_render_one, (tasks[name] for name in names)))
+    else:
+        rendered = [_render_one(tasks[name]) for name in names]
+    urls = {name: url for name, (url, _) in zip(names, rendered)}
+    timings = {name: timing for name, (_, timing) in zip(names, rendered)}
+    return urls, timings
@@ -0,0 +1,257 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Tolerance on the segment parameters, so that crossings exactly at a vertex
+# shared by two consecutive segments are found on both of them (the
+# duplicates are removed afterwards).
+_PARAM_TOL = 1e-9
+
+
+def polylines_to_segments(polylines: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flattens polylines into segment arrays.
+
+    Args:
+        polylines: Arrays of (x, y) vertices; polylines with fewer than two
+            vertices are ignored.
+
+    Returns:
+        A tuple (starts, ends, owners): the (N, 2) float64 start and end points
+        of every segment, and the index of the polyline each segment belongs to.
+    """
+    keep = [i for i, p in enumerate(polylines) if p is not None and len(p) >= 2]
+    if not keep:
+        empty = np.empty((0, 2), dtype=np.float64)
+        return empty, empty.copy(), np.empty(0, dtype=np.int64)
+
+    lengths = np.array([len(polylines[i]) for i in keep])
+    points = np.concatenate([np.asarray(polylines[i], dtype=np.float64).reshape(-1, 2) for i in keep])
+
+    # Segment k joins points k and k + 1, except across the end of a polyline.
+    valid = np.ones(len(points) - 1, dtype=bool)
+    valid[np.cumsum(lengths)[:-1] - 1] = False
+
+    owners = np.repeat(np.asarray(keep, dtype=np.int64), lengths - 1)
+    return points[:-1][valid], points[1:][valid], owners
+
+
+class SegmentIndex:
+    """
+    Uniform-grid spatial index over a fixed set of segments.
+
+    Each segment is registered in every grid cell its bounding box overlaps,
+    stored in CSR form (cells sorted by id, with offsets), so that candidate
+    lookups are pure array operations.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, cell_size: float = 8.0):
+        self.starts = starts
+        self.ends = ends
+        self.cell_size = float(cell_size)
+
+        n = len(starts)
+        if n == 0:
+            self.origin = np.zeros(2)
+            self.n_cols = self.n_rows = 1
+            self.cell_offsets = np.zeros(2, dtype=np.int64)
+            self.cell_segments = np.empty(0, dtype=np.int64)
+            return
+
+        lo = np.minimum(starts, ends)
+        hi = np.maximum(starts, ends)
+        self.origin = lo.min(axis=0)
+        cell_lo = ((lo - self.origin) // self.cell_size).astype(np.int64)
+        cell_hi = ((hi - self.origin) // self.cell_size).astype(np.int64)
+        self.n_cols, self.n_rows = (cell_hi.max(axis=0) + 1).tolist()
+
+        # Enumerate the (segment, cell) pairs covered by each bounding box.
+        span = cell_hi - cell_lo + 1
+        counts = span[:, 0] * span[:, 1]
+        seg_ids = np.repeat(np.arange(n), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = cell_lo[seg_ids, 0] + local % span[seg_ids, 0]
+        cy = cell_lo[seg_ids, 1] + local // span[seg_ids, 0]
+        cell_ids = cy * self.n_cols + cx
+
+        order = np.argsort(cell_ids, kind="stable")
+        self.cell_segments = seg_ids[order]
+        self.cell_offsets = np.zeros(self.n_cols * self.n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_ids, minlength=self.n_cols * self.n_rows), out=self.cell_offsets[1:])
+
+    @property
+    def nbytes(self) -> int:
+        return self.starts.nbytes + self.ends.nbytes + self.cell_offsets.nbytes + self.cell_segments.nbytes
+
+    def candidate_pairs(self, q_starts: np.ndarray, q_ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (query_ids, segment_ids): every indexed segment that may
+        intersect each query segment, without duplicates.
+        """
+        if len(q_starts) == 0 or len(self.cell_segments) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Sample each query segment every half cell. Any point of the segment
+        # is then in the cell of a sample or in one of its 8 neighbours.
+        step = self.cell_size / 2
+        lengths = np.hypot(*(q_ends - q_starts).T)
+        n_samples = np.ceil(lengths / step).astype(np.int64) + 1
+        q_ids = np.repeat(np.arange(len(q_starts)), n_samples)
+        k = np.arange(n_samples.sum()) - np.repeat(np.cumsum(n_samples) - n_samples, n_samples)
+        t = k / np.maximum(n_samples[q_ids] - 1, 1)
+        samples = q_starts[q_ids] + t[:, None] * (q_ends - q_starts)[q_ids]
+        cells = np.floor((samples - self.origin) / self.cell_size).astype(np.int64)
+
+        neighbours = np.array([(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        cells = (cells[:, None, :] + neighbours[None, :, :]).reshape(-1, 2)
+        q_ids = np.repeat(q_ids, len(neighbours))
+        inside = (
+            (cells[:, 0] >= 0) & (cells[:, 0] < self.n_cols) &
+            (cells[:, 1] >= 0) & (cells[:, 1] < self.n_rows)
+        )
+        q_ids = q_ids[inside]
+        cell_ids = cells[inside, 1] * self.n_cols + cells[inside, 0]
+
+        # Each (query, cell) pair once, then expand to the segments of the cell.
+        pair_keys = np.unique(q_ids * (self.n_cols * self.n_rows) + cell_ids)
+        q_ids = pair_keys // (self.n_cols * self.n_rows)
+        cell_ids = pair_keys % (self.n_cols * self.n_rows)
+        begin = self.cell_offsets[cell_ids]
+        counts = self.cell_offsets[cell_ids + 1] - begin
+        q_ids = np.repeat(q_ids, counts)
+        pos = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(begin, counts)
+        seg_ids = self.cell_segments[pos]
+
+        # A segment spanning several visited cells is found more than once.
+        pairs = np.unique(q_ids * len(self.starts) + seg_ids)
+        return pairs // len(self.starts), pairs % len(self.starts)
+
+
+def intersect_segment_pairs(
+    a0: np.ndarray, a1: np.ndarray, b0: np.ndarray, b1: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intersects segment pairs a[i] x b[i] in one batch.
+
+    Proper crossings give one point. Collinear overlaps give the two ends of
+    the overlap, like the start and end points taken from an overlapping
+    Shapely LineString.
+
+    Returns:
+        A tuple (pair_ids, points, t): the index of the pair each point comes
+        from, the (M, 2) points, and their parameter along segment a.
+    """
+    r = a1 - a0
+    s = b1 - b0
+    qp = b0 - a0
+    denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+    qp_x_s = qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]
+    qp_x_r = qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]
+
+    scale = np.hypot(*r.T) * np.hypot(*s.T)
+    parallel = np.abs(denom) <= 1e-12 * np.maximum(scale, 1e-300)
+
+    # Proper (non-parallel) crossings
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = qp_x_s / denom
+        u = qp_x_r / denom
+    hit = (
+        ~parallel &
+        (t >= -_PARAM_TOL) & (t <= 1 + _PARAM_TOL) &
+        (u >= -_PARAM_TOL) & (u <= 1 + _PARAM_TOL)
+    )
+    cross_ids = np.nonzero(hit)[0]
+    cross_t = np.clip(t[hit], 0.0, 1.0)
+    cross_points = a0[hit] + cross_t[:, None] * r[hit]
+
+    # Collinear overlaps: project b onto a and keep the shared interval.
+    r_len = np.hypot(*r.T)
+    collinear = parallel & (np.abs(qp_x_r) <= 1e-9 * np.maximum(r_len, 1e-300)) & (r_len > 0)
+    col_ids = np.nonzero(collinear)[0]
+    rr = np.einsum("ij,ij->i", r[col_ids], r[col_ids])
+    tb0 = np.einsum("ij,ij->i", qp[col_ids], r[col_ids]) / rr
+    tb1 = np.einsum("ij,ij->i", (b1 - a0)[col_ids], r[col_ids]) / rr
+    lo = np.maximum(np.minimum(tb0, tb1), 0.0)
+    hi = np.minimum(np.maximum(tb0, tb1), 1.0)
+    overlap = lo <= hi + _PARAM_TOL
+    col_ids, lo, hi = col_ids[overlap], lo[overlap], np.maximum(hi[overlap], lo[overlap])
+    overlap_ids = np.concatenate([col_ids, col_ids])
+    overlap_t = np.concatenate([lo, hi])
+    overlap_points = a0[overlap_ids] + overlap_t[:, None] * r[overlap_ids]
+
+    return (
+        np.concatenate([cross_ids, overlap_ids]),
+        np.concatenate([cross_points, overlap_points]),
+        np.concatenate([cross_t, overlap_t]),
+    )
+
+
+def annulus_candidates(starts: np.ndarray, ends: np.ndarray, center, radii: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Prefilters segments against circles of a common center: a segment can
+    only cross the circle of radius r if its distance to the center is at
+    most r and its farthest end is at least r away.
+
+    Returns:
+        A tuple (circle_ids, segment_ids) of the candidate pairs.
+    """
+    if len(starts) == 0 or len(radii) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    c = np.asarray(center, dtype=np.float64)
+    d = ends - starts
+    f = starts - c
+    dd = np.einsum("ij,ij->i", d, d)
+    # Closest point of each segment to the center
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(-np.einsum("ij,ij->i", f, d) / dd, 0.0, 1.0)
+    t[dd == 0] = 0.0
+    d_min = np.hypot(*(f + t[:, None] * d).T)
+    d_max = np.maximum(np.hypot(*f.T), np.hypot(*(ends - c).T))
+
+    # With the segments sorted by their distance to the center, the segments
+    # closer than r form a prefix, so each circle only scans that prefix.
+    order = np.argsort(d_min, kind="stable")
+    d_min_sorted = d_min[order]
+    circle_ids = []
+    segment_ids = []
+    for i, r in enumerate(np.asarray(radii, dtype=np.float64)):
+        closer = order[:np.searchsorted(d_min_sorted, r * (1 + _PARAM_TOL), side="right")]
+        hit = closer[d_max[closer] >= r * (1 - _PARAM_TOL)]
+        circle_ids.append(np.full(len(hit), i, dtype=np.int64))
+        segment_ids.append(hit)
+    return np.concatenate(circle_ids), np.concatenate(segment_ids)
+
+
+def intersect_segments_circles(
+    starts: np.ndarray, ends: np.ndarray, centers: np.ndarray, radii: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intersects segment/circle pairs starts[i]-ends[i] x circle(centers[i], radii[i])
+    in one batch, solving |start + t (end - start) - center|^2 = radius^2.
+
+    A segment crossing the circle twice gives two points; a tangent segment
+    gives the same point twice.
+
+    Returns:
+        A tuple (pair_ids, points, angles): the index of the pair each point
+        comes from, the (M, 2) points, and their angle around the center in [0, 2 pi).
+    """
+    d = ends - starts
+    f = starts - centers
+    a = np.einsum("ij,ij->i", d, d)
+    b = 2 * np.einsum("ij,ij->i", f, d)
+    c = np.einsum("ij,ij->i", f, f) - radii ** 2
+    disc = b * b - 4 * a * c
+    valid = (a > 0) & (disc >= 0)
+
+    ids = np.nonzero(valid)[0]
+    root = np.sqrt(disc[ids])
+    pair_ids = np.concatenate([ids, ids])
+    t = np.concatenate([(-b[ids] - root) / (2 * a[ids]), (-b[ids] + root) / (2 * a[ids])])
+    on_segment = (t >= -_PARAM_TOL) & (t <= 1 + _PARAM_TOL)
+    pair_ids, t = pair_ids[on_segment], np.clip(t[on_segment], 0.0, 1.0)
+
+    points = starts[pair_ids] + t[:, None] * d[pair_ids]
+    offsets = points - centers[pair_ids]
+    angles = np.mod(np.arctan2(offsets[:, 1], offsets[:, 0]), 2 * np.pi)
+    return pair_ids, points, angles
@@ -0,0 +1,153 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..schemas.models import AnalysisParameters, Metrics
+from ..utils.stage_cache import stage_key
+from .pipeline import preprocess_stage, skeleton_stage, border_width_stage, graph_stage, segment_index_stage
+from .graph import build_graph_from_skeleton
+from .motifs import generate_motifs
+from .intersections import detect_and_cluster_intersections
+from .metrics import compute_final_metrics
+
+# Columns of a sweep table after the swept parameters.
+METRIC_COLUMNS = tuple(Metrics.model_fields)
+
+
+def expand_grid(base: AnalysisParameters, grid: Dict[str, List[Any]]) -> List[AnalysisParameters]:
+    """
+    The parameter sets of every point of `grid`, the cartesian product of
+    the listed values, applied over `base`. The last parameter varies fastest.
+    Raises ValueError on unknown parameters, empty value lists or invalid values.
+    """
+    for name, values in grid.items():
+        if name not in AnalysisParameters.model_fields:
+            raise ValueError(f"Unknown parameter in grid: {name}")
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"Grid values of {name} must be a non-empty list")
+
+    base_dict = base.model_dump()
+    names = list(grid)
+    return [
+        AnalysisParameters(**{**base_dict, **dict(zip(names, combination))})
+        for combination in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def _measure(shape, pruned_graph, segment_index, border_width: float, params: AnalysisParameters, pixel_size_um: float):
+    """The downstream stages of one grid point: motifs, intersections and metrics."""
+    motifs = generate_motifs(shape, params.motifs, params.random_seed)
+    intersections = detect_and_cluster_intersections(
+        motifs, pruned_graph, border_width * params.epsilon_factor, params.norm_profile, params.intersection_engine,
+        segment_index
+    )
+    return compute_final_metrics(motifs, intersections, pixel_size_um)
+
+
+def _upstream(original_image: np.ndarray, image_digest: str, group: List[AnalysisParameters], stage_runs: Dict[str, int]):
+    """
+    Runs the upstream stages of a group of points sharing their preprocessing.
+    Returns the preprocess key, and the (pruned graph, its SegmentIndex,
+    border width) of every distinct graph stage key of the group. Stages
+    computed rather than read from the cache are counted in `stage_runs`.
+    """
+    preprocess_key, binary_image, status = preprocess_stage(original_image, image_digest, group[0])
+    stage_runs["preprocess"] += status == "miss"
+
+    skeletons = {}
+    graphs = {}
+    for params in group:
+        skeleton_key = stage_key("skeleton", preprocess_key, params)
+        if skeleton_key not in skeletons:
+            _, skeleton, status = skeleton_stage(binary_image, preprocess_key, params)
+            border_width, _ = border_width_stage(binary_image, skeleton, skeleton_key, params)
+            # The unpruned graph, built on first use and shared by the prune ratios
+            skeletons[skeleton_key] = (skeleton, border_width, [])
+            stage_runs["skeleton"] += status == "miss"
+        skeleton, border_width, unpruned = skeletons[skeleton_key]
+
+        graph_key = stage_key("graph", skeleton_key, params)
+        if graph_key not in graphs:
+            def build(skeleton=skeleton, unpruned=unpruned):
+                if not unpruned:
+                    unpruned.append(build_graph_from_skeleton(skeleton)[0])
+                return unpruned[0]
+            (_, _, pruned_graph), status = graph_stage(skeleton, skeleton_key, params, build)
+            # Built once per graph, for every motif set and epsilon measured on it
+            segment_index = segment_index_stage(pruned_graph, graph_key)
+            graphs[graph_key] = (pruned_graph, segment_index, border_width)
+            stage_runs["graph"] += status == "miss"
+    return preprocess_key, graphs
+
+
+def run_sweep(
+    original_image: np.ndarray,
+    image_digest: str,
+    points: List[AnalysisParameters],
+    pixel_size_um: float,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Computes the metrics of every parameter set in `points` on one image.
+
+    Points are grouped by their preprocessing stage, and within a group by
+    skeleton and graph stage keys, so each stage runs once per distinct
+    upstream setting; the unpruned graph is built once per skeleton and
+    pruned per prune ratio. Stages go through the stage cache, so later
+    analyses of the image reuse them as well. The downstream stages of a
+    group's points, which are cheap, then run on `workers` threads. Only one
+    group's images are held at a time.
+
+    Returns:
+        A dict with per-point `results` (a Metrics and its warnings, or an
+        error message), in the order of `points`, plus the number of distinct
+        executions of each upstream stage (cache hits excluded) and the
+        upstream and downstream times.
+    """
+    shape = original_image.shape[:2]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(points)
+    stage_runs = {"preprocess": 0, "skeleton": 0, "graph": 0}
+    timings = {"upstream_s": 0.0, "downstream_s": 0.0}
+
+    groups: Dict[str, List[int]] = {}
+    for index, params in enumerate(points):
+        groups.setdefault(stage_key("preprocess", image_digest, params), []).append(index)
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for indices in groups.values():
+            start_time = time.time()
+            try:
+                preprocess_key, graphs = _upstream(original_image, image_digest, [points[i] for i in indices], stage_runs)
+            except Exception as e:
+                # e.g. an invalid preprocessing setting: only its points fail
+                for index in indices:
+                    results[index] = {"error": str(e)}
+                continue
+            finally:
+                timings["upstream_s"] += time.time() - start_time
+
+            start_time = time.time()
+
+            def measure(index: int):
+                params = points[index]
+                skeleton_key = stage_key("skeleton", preprocess_key, params)
+                pruned_graph, segment_index, border_width = graphs[stage_key("graph", skeleton_key, params)]
+                try:
+                    metrics, warnings = _measure(shape, pruned_graph, segment_index, border_width, params, pixel_size_um)
+                    return {"metrics": metrics, "warnings": warnings}
+                except Exception as e:
+                    return {"error": str(e)}
+
+            measured = executor.map(measure, indices) if executor else map(measure, indices)
+            for index, result in zip(indices, measured):
+                results[index] = result
+            timings["downstream_s"] += time.time() - start_time
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {"results": results, "stage_runs": stage_runs, "timings": timings}
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+from .preprocess import binarize_local, clean_binary, local_radius
+from .skeleton import skeletonize_image
+
+Window = Tuple[slice, slice]
+
+
+def iter_tiles(shape: tuple, tile_size: int) -> Iterator[Window]:
+    """Yields the (row, col) slices of the tiles covering an image of `shape`."""
+    h, w = shape[:2]
+    for y in range(0, h, tile_size):
+        for x in range(0, w, tile_size):
+            yield slice(y, min(y + tile_size, h)), slice(x, min(x + tile_size, w))
+
+
+def _with_halo(core: Window, halo: int, shape: tuple) -> Tuple[Window, Window]:
+    """
+    Grows a tile by `halo` pixels on each side, clipped to the image.
+    Returns the grown window and the position of the core inside it.
+    """
+    h, w = shape[:2]
+    rows, cols = core
+    y0, x0 = max(rows.start - halo, 0), max(cols.start - halo, 0)
+    y1, x1 = min(rows.stop + halo, h), min(cols.stop + halo, w)
+    window = (slice(y0, y1), slice(x0, x1))
+    inner = (slice(rows.start - y0, rows.stop - y0), slice(cols.start - x0, cols.stop - x0))
+    return window, inner
+
+
+def _map_tiles(func: Callable[[Window], None], shape: tuple, tile_size: int, workers: int):
+    """Calls `func` on every tile, on a thread pool when `workers` > 1."""
+    tiles = list(iter_tiles(shape, tile_size))
+    if workers > 1 and len(tiles) > 1:
+        # OpenCV, scipy.ndimage and the skimage kernels release the GIL.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(func, tiles))
+    else:
+        for tile in tiles:
+            func(tile)
+
+
+def preprocess_image_tiled(
+    image: np.ndarray,
+    gaussian_sigma: float = 1.0,
+    adaptive_block_size: int = 101,
+    adaptive_offset: int = 2,
+    morph_open_kernel: int = 3,
+    area_opening_min_size_px: int = 500,
+    detect_twins: bool = False,
+    threshold_backend: str = "skimage",
+    tile_size: int = 1024,
+    workers: int = 1,
+) -> np.ndarray:
+    """
+    Tiled equivalent of `preprocess_image`.
+
+    The neighborhood-local steps run per tile, on a halo of `local_radius`
+    pixels so that the tile cores match the full-frame result exactly; only
+    the cores are written to the output. The float64 blur and threshold
+    surfaces therefore never exceed the size of a tile plus its halo.
+    Area opening and twin removal need whole connected components and run
+    once on the stitched uint8 mask, so they still allocate full-frame
+    arrays (the boolean mask and its component labels, about 10 bytes per
+    pixel): the peak memory of this stage is bounded by the image size, not
+    by the tile size.
+    """
+    halo = local_radius(gaussian_sigma, adaptive_block_size, morph_open_kernel)
+    opened = np.empty(image.shape[:2], dtype=np.uint8)
+
+    def process(core: Window):
+        window, inner = _with_halo(core, halo, image.shape)
+        tile = binarize_local(
+            image[window], gaussian_sigma, adaptive_block_size, adaptive_offset, morph_open_kernel, threshold_backend
+        )
+        opened[core] = tile[inner]
+
+    _map_tiles(process, image.shape, tile_size, workers)
+    return clean_binary(opened, area_opening_min_size_px, detect_twins)
+
+
+def skeletonize_image_tiled(binary_image: np.ndarray, tile_size: int = 1024, workers: int = 1) -> np.ndarray:
+    """
+    Tiled equivalent of `skeletonize_image`.
+
+    Thinning peels one pixel layer per pass, so a pixel's final state only
+    depends on the part of its object within about twice the object's
+    largest inscribed radius. Each tile's halo is grown until it exceeds
+    that reach, measured on the tile itself, before the core is kept.
+    Boundary masks are thin, so halos stay small; but a blob wider than
+    the tile grows its halo up to the whole image, and that tile is then
+    thinned full-frame.
+    """
+    skeleton = np.zeros(binary_image.shape[:2], dtype=bool)
+    max_halo = max(binary_image.shape[:2])
+
+    def process(core: Window):
+        halo = 16
+        while True:
+            window, inner = _with_halo(core, halo, binary_image.shape)
+            tile = binary_image[window]
+            # Distances are overestimated where objects touch the window edge,
+            # which only makes the halo more conservative.
+            reach = 2 * int(np.ceil(distance_transform_edt(tile > 0).max(initial=0))) + 4
+            if reach <= halo or halo >= max_halo:
+                break
+            halo = min(max(reach, 2 * halo), max_halo)
+        skeleton[core] = skeletonize_image(tile)[inner]
+
+    _map_tiles(process, binary_image.shape, tile_size, workers)
+    return skeleton
+
+
+def estimate_border_width_tiled(
+    binary_image: np.ndarray,
+    skeleton: np.ndarray,
+    tile_size: int = 1024,
+    workers: int = 1,
+) -> float:
+    """
+    Tiled equivalent of `estimate_border_width`.
+
+    The distance transform is only sampled on skeleton pixels, which lie
+    on boundaries; it is computed per tile with a halo wider than any sampled
+    distance, so the samples match the full-frame transform.
+    """
+    if np.count_nonzero(binary_image) == 0 or np.count_nonzero(skeleton) == 0:
+        return 1.0
+
+    samples: List[np.ndarray] = []
+    max_halo = max(binary_image.shape[:2])
+
+    def process(core: Window):
+        if not skeleton[core].any():
+            return
+        halo = 16
+        while True:
+            window, inner = _with_halo(core, halo, binary_image.shape)
+            dist_transform = distance_transform_edt(binary_image[window] == 0)
+            distances = dist_transform[inner][skeleton[core]]
+            # Exact once every sampled distance is shorter than the halo.
+            if distances.max(initial=0) < halo or halo >= max_halo:
+                break
+            halo = min(2 * halo, max_halo)
+        samples.append(distances)
+
+    _map_tiles(process, binary_image.shape, tile_size, workers)
+
+    # The actual width is twice the distance
+    local_widths = 2 * np.concatenate(samples)
+    if len(local_widths) == 0:
+        return 1.0
+
+    # Use median for robustness against outliers (e.g., at junctions)
+    return max(1.0, float(np.median(local_widths)))
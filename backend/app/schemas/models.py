@@ -1,7 +1,10 @@
 import uuid
 from typing import List, Dict, Any, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from .. import config
+from ..processing.preprocess import local_radius
 
 
 class AnalysisParameters(BaseModel):
@@ -12,18 +15,48 @@ class AnalysisParameters(BaseModel):
     area_opening_min_size_px: int = 500
     skeleton_prune_ratio: float = 0.5
     detect_twins: bool = False
+    # Local threshold surface: "skimage" (reference), "opencv_gaussian",
+    # "opencv_mean" or "integral" (Bradley-Roth box mean)
+    threshold_backend: str = "skimage"
     max_gap_connect_px: float = 100.0 # Will be recalculated based on mean edge length
     epsilon_factor: float = 1.0
     norm_profile: str = "ASTM"
+    intersection_engine: str = "numpy" # "numpy" (vectorized) or "shapely" (reference)
     motifs: Dict[str, Any] = {
         "type": "circular",
         "count": 3
     }
     random_seed: int = 42
 
+    # Monte Carlo statistics for linear motifs: G over up to
+    # `monte_carlo_seeds` independent motif sets (0 disables), drawn from
+    # random_seed, random_seed + 1, ... Stops early once the relative accuracy
+    # of the mean intercept length reaches `monte_carlo_target_accuracy`.
+    # At most MONTE_CARLO_MAX_SEEDS, which bounds the time of a request.
+    monte_carlo_seeds: int = Field(0, ge=0, le=config.MONTE_CARLO_MAX_SEEDS)
+    monte_carlo_target_accuracy: float = Field(0.0, ge=0)
+    monte_carlo_confidence: float = Field(0.95, gt=0, lt=1)
+
     # Gap filling strategy
     gap_filling_strategy: str = "extension_auto" # "extension_auto", "manual", "preserve"
 
+    # Tiled execution for very large images: preprocessing, skeletonization and
+    # border width run on tiles of this size (0 disables tiling), on up to
+    # `tile_workers` threads, capped at the worker's CPU share. Results match
+    # the untiled run. Tiles are at least TILE_MIN_SIZE and wider than the
+    # preprocessing halo.
+    tile_size: int = Field(0, ge=0)
+    tile_workers: int = Field(1, ge=1)
+
+    @model_validator(mode="after")
+    def _check_tile_size(self):
+        if self.tile_size > 0:
+            halo = local_radius(self.gaussian_sigma, self.adaptive_block_size, self.morph_open_kernel)
+            minimum = max(config.TILE_MIN_SIZE, halo + 1)
+            if self.tile_size < minimum:
+                raise ValueError(f"tile_size must be 0 or at least {minimum} px with these parameters")
+        return self
+
 
 class Metrics(BaseModel):
     L_mm: float
@@ -34,6 +67,37 @@ class Metrics(BaseModel):
     N_AE: float
 
 
+class GrainSizeSummary(BaseModel):
+    """
+    Aggregate of G over several measurements: mean, sample standard deviation
+    and a Student-t confidence interval of the mean.
+    """
+    n: int
+    G_mean: Optional[float] = None
+    G_std: Optional[float] = None
+    G_ci_low: Optional[float] = None
+    G_ci_high: Optional[float] = None
+    confidence: float = 0.95
+
+
+class MonteCarloStats(BaseModel):
+    """
+    G over independent linear motif sets measured on the same skeleton, one
+    set per seed. The relative accuracy is the half-width of the confidence
+    interval of the mean intercept length divided by that mean, as in ASTM
+    E112; `seeds_needed` estimates how many seeds reach the target.
+    """
+    seeds_used: int
+    seeds_without_intersections: int = 0
+    G_values: List[float]
+    G: GrainSizeSummary
+    ell_um_mean: Optional[float] = None
+    relative_accuracy: Optional[float] = None
+    target_relative_accuracy: Optional[float] = None
+    seeds_needed: Optional[int] = None
+    converged: bool = False
+
+
 class Intersection(BaseModel):
     id: int
     x: float
@@ -41,6 +105,7 @@ class Intersection(BaseModel):
     type: str
     score: float
     motif_id: Union[int, str]
+    motif_ids: List[Union[int, str]] = [] # Every motif crossing this intersection
 
 
 class EdgeStats(BaseModel):
@@ -51,9 +116,12 @@ class EdgeStats(BaseModel):
 
 
 class Overlays(BaseModel):
-    annotated_png_base64: str
-    skeleton_png_base64: str
-    motifs_png_base64: str
+    """
+    URLs of the rendered overlays in the artifact store.
+    """
+    annotated_image_url: str
+    skeleton_image_url: str
+    motifs_image_url: str
 
 
 class Timings(BaseModel):
@@ -62,17 +130,32 @@ class Timings(BaseModel):
     skeleton_s: float
     graph_s: float
     intersections_s: float
+    monte_carlo_s: Optional[float] = None # Only when Monte Carlo statistics were requested
+    render_s: Optional[float] = None # Only when some rendered section was included
+    encode_s: Optional[float] = None # Image encoding and storage, summed over the images
+    artifacts: Optional[Dict[str, Dict[str, float]]] = None # draw_s and encode_s of each image
     total_s: float
 
 
+class CacheStatus(BaseModel):
+    """
+    Where each cacheable stage's output came from: "memory" or "disk" for a
+    stage cache hit, "miss" when it was computed for this request.
+    """
+    preprocess: str
+    skeleton: str
+    border_width: str
+    graph: str
+
+
 class DebugOverlays(BaseModel):
     """
-    A model to hold base64 encoded images for debugging the pipeline.
+    A model to hold the URLs of the images for debugging the pipeline.
     """
-    binary_image_base64: str
-    skeleton_image_base64: str
-    pruned_graph_image_base64: str
-    motifs_image_base64: str
+    binary_image_url: str
+    skeleton_image_url: str
+    pruned_graph_image_url: str
+    motifs_image_url: str
 
 
 class DebugStats(BaseModel):
@@ -89,12 +172,16 @@ class DebugStats(BaseModel):
 class AnalysisResult(BaseModel):
     image_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     metrics: Metrics
-    intersections: List[Intersection]
-    edges_stats: EdgeStats
-    motifs: List[Dict[str, Any]] # Add motifs for rendering
-    overlays: Overlays
+    monte_carlo: Optional[MonteCarloStats] = None
+    # The sections below are None unless requested through `include`
+    intersections: Optional[List[Intersection]] = None
+    edges_stats: Optional[EdgeStats] = None
+    motifs: Optional[List[Dict[str, Any]]] = None # Add motifs for rendering
+    overlays: Optional[Overlays] = None
     warnings: List[str]
     timings: Timings
+    cache: Optional[CacheStatus] = None
     params_used: AnalysisParameters
     debug_overlays: Optional[DebugOverlays] = None
     debug_stats: Optional[DebugStats] = None
+    profile_id: Optional[str] = None # Set when the request was profiled, see /api/profiles
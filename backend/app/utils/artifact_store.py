@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import sqlite3
+from typing import Callable, Optional, Set
+
+from .. import config
+
+# MIME types of the artifact formats the store accepts, by file extension.
+ARTIFACT_MIME_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+}
+
+_NAME_RE = re.compile(r"^([0-9a-f]{64})\.([a-z]+)$")
+
+# The store is trimmed at most this often per process, since it walks the directory.
+_PURGE_INTERVAL_S = 60.0
+
+
+class ArtifactStore:
+    """
+    Content-addressed file store for rendered images.
+
+    An artifact is named after the sha256 of its bytes plus its extension and
+    stored as `<root>/<digest[:2]>/<name>`, so a name always denotes the same
+    content: it can be served with a strong ETag and cached forever. Writing
+    the same content again only refreshes its mtime, which is what retention
+    and eviction go by.
+
+    Artifacts named by `pinned` (those of stored results) are exempt from
+    both, and do not count towards `max_bytes`: they live as long as the
+    results referring to them. `pinned` returns None when the pins cannot
+    be read, and nothing is deleted then.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        url_prefix: str,
+        max_bytes: int = 0,
+        retention_s: float = 0,
+        pinned: Optional[Callable[[], Optional[Set[str]]]] = None,
+    ):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.retention_s = retention_s
+        self.pinned = pinned
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, ext: str) -> str:
+        """Stores `data` and returns its artifact name."""
+        if ext not in ARTIFACT_MIME_TYPES:
+            raise ValueError(f"Unsupported artifact type: {ext}")
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        path = self._path(name)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a partial artifact is never served.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._maybe_purge()
+        return name
+
+    def url(self, name: str) -> str:
+        return f"{self.url_prefix}/{name}"
+
+    def name_from_url(self, url: str) -> Optional[str]:
+        """The artifact name an URL of this store points to, or None."""
+        prefix = self.url_prefix + "/"
+        if not url.startswith(prefix):
+            return None
+        name = url[len(prefix):]
+        return name if _NAME_RE.match(name) else None
+
+    def path(self, name: str) -> Optional[str]:
+        """The file of artifact `name`, or None if the name is invalid or unknown."""
+        match = _NAME_RE.match(name)
+        if match is None or match.group(2) not in ARTIFACT_MIME_TYPES:
+            return None
+        path = self._path(name)
+        return path if os.path.isfile(path) else None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name)
+
+    # --- Retention ---
+
+    def _maybe_purge(self):
+        with self._lock:
+            now = time.time()
+            if now - self._last_purge < _PURGE_INTERVAL_S:
+                return
+            self._last_purge = now
+        self.purge()
+
+    def purge(self):
+        """
+        Deletes the unpinned artifacts older than the retention period, then
+        the least recently written ones until they fit in `max_bytes`.
+        """
+        pinned = self.pinned() if self.pinned is not None else set()
+        if pinned is None:
+            return
+        files = []
+        total = 0
+        cutoff = time.time() - self.retention_s if self.retention_s > 0 else None
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                if name in pinned:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if cutoff is not None and stat.st_mtime < cutoff:
+                    self._remove(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if self.max_bytes <= 0 or total <= self.max_bytes:
+            return
+        for _, size, path in sorted(files):
+            self._remove(path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _referenced_by_results() -> Optional[Set[str]]:
+    # Imported here: the result store refers to this module
+    from .result_store import result_store
+    try:
+        return result_store.artifact_names()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+artifact_store = ArtifactStore(
+    config.ARTIFACTS_DIR,
+    config.ARTIFACTS_URL_PREFIX,
+    max_bytes=config.ARTIFACTS_MAX_BYTES,
+    retention_s=config.ARTIFACT_RETENTION_S,
+    pinned=_referenced_by_results,
+)
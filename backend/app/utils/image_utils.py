@@ -1,7 +1,8 @@
 import base64
 import io
+from typing import Tuple
+
 import cv2
-import networkx as nx
 import numpy as np
 from PIL import Image
 
@@ -20,27 +21,90 @@ def read_image_from_bytes(image_bytes: bytes) -> np.ndarray:
     return img
 
 
-def encode_image_to_base64(image_array: np.ndarray) -> str:
-    """
-    Encodes a NumPy array image into a Base64 PNG string.
-    """
+# Encoder effort for each compression setting: (PNG zlib level, WebP method).
+COMPRESSION_PRESETS = {
+    "fast": (1, 0),
+    "balanced": (6, 4),
+    "small": (9, 6),
+}
+
+# Layer kinds understood by `encode_layer`.
+LAYER_KINDS = ("mask", "graphic", "photo")
+
+
+def _to_pil(image_array: np.ndarray) -> Image.Image:
     # Ensure the image is in a web-compatible format (e.g., RGB for color, L for grayscale)
     if image_array.ndim == 3 and image_array.shape[2] == 3:
         # OpenCV uses BGR, Pillow/web uses RGB. Convert it.
         image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(image_array)
+        return Image.fromarray(image_array)
     elif image_array.ndim == 2:
         # Grayscale image
-        pil_img = Image.fromarray(image_array, 'L')
-    else:
-        raise ValueError(f"Unsupported image array shape for encoding: {image_array.shape}")
+        return Image.fromarray(image_array, 'L')
+    raise ValueError(f"Unsupported image array shape for encoding: {image_array.shape}")
 
+
+def encode_image_to_png(image_array: np.ndarray, compress_level: int = 6) -> bytes:
+    """
+    Encodes a NumPy array image into PNG bytes.
+    """
     # Save image to an in-memory buffer
     buffered = io.BytesIO()
-    pil_img.save(buffered, format="PNG")
+    _to_pil(image_array).save(buffered, format="PNG", compress_level=compress_level)
+    return buffered.getvalue()
+
 
-    # Encode buffer to base64
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+def encode_layer(
+    image_array: np.ndarray,
+    kind: str,
+    photo_format: str = "png",
+    quality: int = 85,
+    compression: str = "balanced",
+) -> Tuple[bytes, str]:
+    """
+    Encodes an image layer in the format suited to its content.
+
+    - "mask": a single-channel on/off image (e.g. the binary image or the
+      skeleton), written as a 1-bit PNG; pixels are on where nonzero.
+    - "graphic": drawings on a flat background, written as a lossless PNG.
+    - "photo": anything built on the original micrograph, written as
+      `photo_format` ("png", "webp" or "jpg") at `quality` for the lossy ones.
+
+    `compression` ("fast", "balanced" or "small") trades encoding time for size.
+
+    Returns:
+        A tuple (encoded bytes, file extension).
+    """
+    if compression not in COMPRESSION_PRESETS:
+        raise ValueError(f"Unknown compression setting: {compression}")
+    png_level, webp_method = COMPRESSION_PRESETS[compression]
+
+    buffered = io.BytesIO()
+    if kind == "mask":
+        if image_array.ndim != 2:
+            raise ValueError(f"A mask must be single-channel, got shape {image_array.shape}")
+        Image.fromarray(image_array > 0).save(buffered, format="PNG", compress_level=png_level)
+        return buffered.getvalue(), "png"
+    if kind == "graphic" or (kind == "photo" and photo_format == "png"):
+        return encode_image_to_png(image_array, png_level), "png"
+    if kind != "photo":
+        raise ValueError(f"Unknown layer kind: {kind}")
+
+    pil_img = _to_pil(image_array)
+    if photo_format == "webp":
+        pil_img.save(buffered, format="WEBP", quality=quality, method=webp_method)
+    elif photo_format == "jpg":
+        pil_img.save(buffered, format="JPEG", quality=quality, optimize=compression == "small")
+    else:
+        raise ValueError(f"Unsupported photo format: {photo_format}")
+    return buffered.getvalue(), photo_format
+
+
+def encode_image_to_base64(image_array: np.ndarray) -> str:
+    """
+    Encodes a NumPy array image into a Base64 PNG string.
+    """
+    img_str = base64.b64encode(encode_image_to_png(image_array)).decode("utf-8")
 
     # Prepend the required data URI scheme
     return f"data:image/png;base64,{img_str}"
@@ -69,7 +133,12 @@ def create_overlay_image(
     if motifs is not None:
         for motif in motifs:
             geom = motif['geometry']
-            if geom.geom_type == 'LineString':
+            if 'radius' in motif:
+                # Draw circles from their exact center and radius, with 4 bits of subpixel precision
+                center = tuple(int(round(v * 16)) for v in motif['center'])
+                cv2.circle(overlay, center, int(round(motif['radius'] * 16)), color=(255, 0, 0), thickness=2,
+                           lineType=cv2.LINE_AA, shift=4)
+            elif geom.geom_type == 'LineString':
                 coords = np.array(geom.coords, dtype=np.int32).reshape((-1, 1, 2))
                 cv2.polylines(overlay, [coords], isClosed=False, color=(255, 0, 0), thickness=2)
             elif geom.geom_type == 'Polygon' or geom.geom_type == 'LinearRing': # Circle
@@ -93,21 +162,18 @@ def create_overlay_image(
     return overlay
 
 
-def draw_graph_on_image(graph: nx.Graph, image_shape: tuple) -> np.ndarray:
+def draw_graph_on_image(graph, image_shape: tuple) -> np.ndarray:
     """
-    Draws the edges of a networkx graph onto a blank image.
+    Draws the edges of a SkeletonGraph onto a blank image.
     This is useful for debugging the graph structure.
     """
     # Create a blank black image with 3 channels
     image = np.zeros((image_shape[0], image_shape[1], 3), dtype=np.uint8)
 
-    # Iterate through the edges and draw them
-    for _, _, data in graph.edges(data=True):
-        coords = data.get('coords')
-        if coords is not None and len(coords) >= 2:
-            # The graph now stores coords in (x, y) format.
-            # cv2.polylines expects points as (x, y).
-            points = np.array(coords, dtype=np.int32).reshape((-1, 1, 2))
-            cv2.polylines(image, [points], isClosed=False, color=(0, 255, 0), thickness=1)
+    # The graph stores coords in (x, y) format, as cv2.polylines expects.
+    # All edges are drawn in a single call.
+    polylines = [coords.reshape((-1, 1, 2)) for coords in graph.edge_polylines() if len(coords) >= 2]
+    if polylines:
+        cv2.polylines(image, polylines, isClosed=False, color=(0, 255, 0), thickness=1)
 
     return image
@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from .. import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    stages TEXT NOT NULL DEFAULT '[]',
+    result_path TEXT,
+    error TEXT
+)
+"""
+
+
+class JobStore:
+    """
+    SQLite-backed state for asynchronous analysis jobs.
+
+    Every process (gunicorn workers and their pool processes) opens its own
+    short-lived connections, so the store needs no coordinating service.
+    Results are too large for a row and are kept as JSON files next to the
+    database, referenced by path.
+    """
+
+    def __init__(self, db_path: str, results_dir: str, retention_s: float = 0):
+        self.db_path = db_path
+        self.results_dir = results_dir
+        self.retention_s = retention_s
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            os.makedirs(self.results_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def create(self, job_id: str):
+        self.purge_expired()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, now, now),
+            )
+
+    def mark_running(self, job_id: str):
+        self._update(job_id, status="running")
+
+    def record_stage(self, job_id: str, stage: str):
+        """Appends `stage` to the list of completed pipeline stages."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row["stages"])
+            stages.append(stage)
+            conn.execute(
+                "UPDATE jobs SET stages = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(stages), time.time(), job_id),
+            )
+
+    def complete(self, job_id: str, result_json: str):
+        path = os.path.join(self.results_dir, f"{job_id}.json")
+        # Write atomically so a concurrent status request never reads half a result.
+        fd, tmp_path = tempfile.mkstemp(dir=self.results_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(result_json)
+        os.replace(tmp_path, path)
+        self._update(job_id, status="done", result_path=path)
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def load_result(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not job.get("result_path"):
+            return None
+        with open(job["result_path"], "r") as f:
+            return json.load(f)
+
+    def completed_stages(self, job: Dict[str, Any]) -> List[str]:
+        return json.loads(job["stages"])
+
+    def purge_expired(self):
+        """Drops jobs (and their result files) older than the retention period."""
+        if self.retention_s <= 0:
+            return
+        cutoff = time.time() - self.retention_s
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, result_path FROM jobs WHERE updated_at < ?", (cutoff,)
+            ).fetchall()
+            for row in rows:
+                if row["result_path"]:
+                    try:
+                        os.remove(row["result_path"])
+                    except OSError:
+                        pass
+            conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+
+job_store = JobStore(config.JOB_STORE_PATH, config.JOB_RESULTS_DIR, config.JOB_RETENTION_S)
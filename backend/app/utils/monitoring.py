@@ -0,0 +1,135 @@
+import os
+import time
+from typing import Dict
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Prometheus metrics of the API and the analysis pipeline.
+#
+# With PROMETHEUS_MULTIPROC_DIR set (see docker-compose.yml), every process
+# (gunicorn workers and their pool processes) writes its values to files in
+# that directory, and /metrics aggregates them, whichever worker answers.
+# The directory must be local to the container and emptied when gunicorn
+# starts, which gunicorn.conf.py does.
+
+# From the cached stages of small images up to whole analyses of large ones
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_PIXEL_BUCKETS = (1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7)
+_BYTE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+
+STAGE_SECONDS = Histogram(
+    "grain_stage_duration_seconds",
+    "Duration of each analysis stage, including motif generation, metrics, rendering and serialization.",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_CACHE_LOOKUPS = Counter(
+    "grain_stage_cache_lookups_total",
+    "Stage cache lookups by stage and result: memory, disk or miss.",
+    ["stage", "result"],
+)
+IMAGE_PIXELS = Histogram(
+    "grain_image_pixels",
+    "Size in pixels of the analyzed images.",
+    buckets=_PIXEL_BUCKETS,
+)
+REQUESTS = Counter(
+    "grain_http_requests_total",
+    "HTTP requests by route, method and status.",
+    ["endpoint", "method", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "grain_http_request_duration_seconds",
+    "Time to build the response of an HTTP request (streamed bodies excluded).",
+    ["endpoint", "method"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "grain_http_requests_in_progress",
+    "HTTP requests being handled.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+REQUEST_BYTES = Histogram(
+    "grain_http_request_bytes",
+    "Size of the request bodies, e.g. uploaded images.",
+    ["endpoint"],
+    buckets=_BYTE_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "grain_http_response_bytes",
+    "Size of the response bodies whose length is known.",
+    ["endpoint"],
+    buckets=_BYTE_BUCKETS,
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_analysis(image_shape: tuple, stage_seconds: Dict[str, float], cache_status: Dict[str, str]):
+    """Records one analysis: its image size, stage durations and stage cache results."""
+    IMAGE_PIXELS.observe(image_shape[0] * image_shape[1])
+    for stage, seconds in stage_seconds.items():
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    for stage, result in cache_status.items():
+        STAGE_CACHE_LOOKUPS.labels(stage, result).inc()
+
+
+def _endpoint() -> str:
+    # The route pattern, not the path, to keep ids out of the labels
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = _endpoint()
+    REQUESTS_IN_PROGRESS.labels(g.metrics_endpoint).inc()
+    if request.content_length:
+        REQUEST_BYTES.labels(g.metrics_endpoint).observe(request.content_length)
+
+
+def _after_request(response):
+    endpoint = g.get("metrics_endpoint")
+    if endpoint is None:
+        return response
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - g.metrics_start)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(response.content_length)
+    return response
+
+
+def _teardown_request(exc):
+    endpoint = g.get("metrics_endpoint")
+    if endpoint is not None:
+        REQUESTS_IN_PROGRESS.labels(endpoint).dec()
+
+
+def metrics_view():
+    """Exposes the metrics, aggregated over every process when multiprocess mode is on."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app: Flask):
+    """Instruments every request of `app` and serves the metrics at /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
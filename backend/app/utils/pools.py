@@ -0,0 +1,32 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools are created lazily, so that each gunicorn worker owns its
+# pools after forking, and are shared by name between requests.
+_pools = {}
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """Returns the named process pool of this worker, creating it on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        # "spawn" keeps the pool processes independent of the worker's
+        # threads and OpenCV/BLAS state at fork time.
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _pools[name] = pool
+    return pool
+
+
+def discard_process_pool(name: str, pool: ProcessPoolExecutor):
+    """
+    Forgets a pool whose process crashed; a broken pool rejects all new
+    work, so the next `get_process_pool` call starts a fresh one. Every
+    future of the broken pool reports the crash, some only after that
+    fresh pool took its name, so only `pool` itself is ever discarded.
+    """
+    if _pools.get(name) is pool:
+        del _pools[name]
+    pool.shutdown(wait=False, cancel_futures=True)
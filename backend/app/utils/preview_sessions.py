@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+from typing import Optional
+
+from .. import config
+from .stage_cache import image_digest
+
+
+class PreviewSessionStore:
+    """
+    Images uploaded for interactive preprocessing previews.
+
+    A session is identified by the digest of its image, so uploading the same
+    image again returns the same session. Images live on the shared uploads
+    volume, which lets any worker serve any session; a session expires when
+    it has not been used for `ttl_s`.
+    """
+
+    def __init__(self, root: str, ttl_s: float):
+        self.root = root
+        self.ttl_s = ttl_s
+
+    def create(self, image_bytes: bytes) -> str:
+        """Stores an image and returns its session id."""
+        self.purge_expired()
+        session_id = image_digest(image_bytes)
+        path = self._path(session_id)
+        if os.path.exists(path):
+            os.utime(path)
+            return session_id
+        os.makedirs(self.root, exist_ok=True)
+        # Write to a temporary file first so other workers never read a partial image.
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(image_bytes)
+        os.replace(tmp_path, path)
+        return session_id
+
+    def exists(self, session_id: str) -> bool:
+        """Whether the session is known; using it keeps it alive."""
+        path = self._path(session_id)
+        if path is None or not os.path.isfile(path):
+            return False
+        os.utime(path)
+        return True
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        """Returns the session's image bytes, or None if it does not exist."""
+        if not self.exists(session_id):
+            return None
+        with open(self._path(session_id), "rb") as f:
+            return f.read()
+
+    def purge_expired(self):
+        if self.ttl_s <= 0 or not os.path.isdir(self.root):
+            return
+        cutoff = time.time() - self.ttl_s
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, session_id: str) -> Optional[str]:
+        # Session ids are sha256 digests; anything else is not a valid id.
+        if len(session_id) != 64 or any(c not in "0123456789abcdef" for c in session_id):
+            return None
+        return os.path.join(self.root, f"{session_id}.img")
+
+
+preview_sessions = PreviewSessionStore(config.PREVIEW_SESSIONS_DIR, config.PREVIEW_SESSION_TTL_S)
@@ -0,0 +1,207 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from .. import config
+
+# Profile ids are uuid4 hex strings.
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Files of a stored profile, by kind: the summary with the top functions and
+# memory peaks, the collapsed stacks (flamegraph.pl, speedscope) and the raw
+# cProfile stats (snakeviz, pstats).
+PROFILE_FILES = {
+    "summary": ("summary.json", "application/json"),
+    "stacks": ("stacks.collapsed", "text/plain"),
+    "pstats": ("profile.pstats", "application/octet-stream"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when another request of this process is already being profiled."""
+
+
+# cProfile and tracemalloc are process-wide: one profile at a time.
+_active = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfiler:
+    """
+    Profiles one request in the calling thread: cProfile for a deterministic
+    function table, a sampler thread recording the thread's stack every
+    `sample_interval_s` for collapsed stacks, and tracemalloc for the peak
+    memory of each stage, delimited by `stage_done` calls.
+    """
+
+    def __init__(self, endpoint: str, sample_interval_s: float, top_n: int):
+        self.request_id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.sample_interval_s = sample_interval_s
+        self.top_n = top_n
+        self.stacks = Counter()
+        self.stage_peaks = []
+        self._profile = cProfile.Profile()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._stage_start = 0.0
+
+    def start(self):
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusy("Another request is being profiled; try again later")
+        self.started_at = time.time()
+        self._stage_start = time.perf_counter()
+        self._wall_start = self._stage_start
+        tracemalloc.start()
+        self._sampler.start()
+        self._profile.enable()
+
+    def stage_done(self, stage: str):
+        """Records the peak memory and duration of the stage that just ended."""
+        current, peak = tracemalloc.get_traced_memory()
+        now = time.perf_counter()
+        self.stage_peaks.append({
+            "stage": stage,
+            "duration_s": now - self._stage_start,
+            "peak_bytes": peak,
+            "end_bytes": current,
+        })
+        self._stage_start = now
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        self._profile.disable()
+        # What ran after the last stage, or the whole request without stages
+        self.stage_done("rest" if self.stage_peaks else "request")
+        self.wall_s = time.perf_counter() - self._wall_start
+        self._stop.set()
+        self._sampler.join()
+        self.peak_bytes = max(stage["peak_bytes"] for stage in self.stage_peaks)
+        tracemalloc.stop()
+        _active.release()
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval_s):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def top_functions(self) -> List[Dict[str, Any]]:
+        """The `top_n` functions by cumulative time."""
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "ncalls": ncalls,
+                "tottime_s": tottime,
+                "cumtime_s": cumtime,
+            })
+        rows.sort(key=lambda row: row["cumtime_s"], reverse=True)
+        return rows[:self.top_n]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "endpoint": self.endpoint,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "peak_bytes": self.peak_bytes,
+            "stages": self.stage_peaks,
+            "samples": sum(self.stacks.values()),
+            "sample_interval_s": self.sample_interval_s,
+            "top_functions": self.top_functions(),
+        }
+
+
+class ProfileStore:
+    """
+    Profiles by request id on the uploads volume, so that any worker can
+    serve them. Profiles older than `retention_s` are deleted.
+    """
+
+    def __init__(self, root: str, retention_s: float = 0):
+        self.root = root
+        self.retention_s = retention_s
+
+    def put(self, profiler: RequestProfiler):
+        self.purge_expired()
+        directory = os.path.join(self.root, profiler.request_id)
+        os.makedirs(directory, exist_ok=True)
+        self._write(directory, "stacks", "".join(f"{stack} {count}\n" for stack, count in profiler.stacks.items()))
+        profiler._profile.dump_stats(os.path.join(directory, PROFILE_FILES["pstats"][0]))
+        # Written last: a profile is complete once its summary exists
+        self._write(directory, "summary", json.dumps(profiler.summary()))
+
+    def path(self, request_id: str, kind: str) -> Optional[str]:
+        if not _ID_RE.match(request_id) or kind not in PROFILE_FILES:
+            return None
+        if not os.path.isfile(os.path.join(self.root, request_id, PROFILE_FILES["summary"][0])):
+            return None
+        return os.path.join(self.root, request_id, PROFILE_FILES[kind][0])
+
+    def purge_expired(self):
+        if self.retention_s <= 0 or not os.path.isdir(self.root):
+            return
+        cutoff = time.time() - self.retention_s
+        for request_id in os.listdir(self.root):
+            directory = os.path.join(self.root, request_id)
+            try:
+                if os.stat(directory).st_mtime >= cutoff:
+                    continue
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write(directory: str, kind: str, text: str):
+        # Write atomically so a concurrent reader never sees half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(directory, PROFILE_FILES[kind][0]))
+
+
+profile_store = ProfileStore(config.PROFILES_DIR, config.PROFILE_RETENTION_S)
+
+
+@contextmanager
+def maybe_profile(endpoint: str, enabled: bool):
+    """
+    Profiles the enclosed block when `enabled`, yielding the RequestProfiler,
+    and stores the profile afterwards, also when the block fails. Otherwise
+    yields None and costs nothing. Raises ProfilerBusy if another request of
+    this process is being profiled.
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = RequestProfiler(endpoint, config.PROFILE_SAMPLE_INTERVAL_S, config.PROFILE_TOP_N)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profile_store.put(profiler)
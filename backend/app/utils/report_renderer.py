@@ -0,0 +1,88 @@
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import urllib.parse
+import urllib.request
+
+import jinja2
+
+from .. import config
+from .artifact_store import artifact_store
+
+REPORT_TEMPLATE = "report_template.html"
+
+
+@functools.lru_cache(maxsize=1)
+def _environment() -> jinja2.Environment:
+    # A plain Jinja environment, so that reports also render in pool processes
+    # without a Flask application context.
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(config.TEMPLATES_DIR),
+        autoescape=jinja2.select_autoescape(["html"]),
+    )
+
+
+def template_version() -> str:
+    """Digest of the report template, part of every cached report's key."""
+    with open(os.path.join(config.TEMPLATES_DIR, REPORT_TEMPLATE), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _artifact_name(url: str) -> str:
+    """
+    The artifact an overlay URL points to. Raises ValueError for any other
+    URL: results posted by clients must not make the renderer fetch local
+    files or other hosts.
+    """
+    name = artifact_store.name_from_url(url)
+    if name is None:
+        raise ValueError(f"Overlay URLs must point to {artifact_store.url_prefix}/: {url}")
+    return name
+
+
+def check_overlay_urls(overlays: dict):
+    """Raises ValueError unless every overlay URL points into the artifact store."""
+    for url in overlays.values():
+        _artifact_name(url)
+
+
+def _local_image_src(url: str) -> str:
+    """
+    Points an artifact URL at the artifact file itself, so WeasyPrint reads it
+    from disk instead of the client re-sending the image. Raises ValueError
+    for any other URL, and FileNotFoundError for an artifact that no longer
+    exists, rather than rendering (and caching) a report without its images.
+    """
+    name = _artifact_name(url)
+    path = artifact_store.path(name)
+    if path is None:
+        raise FileNotFoundError(f"The overlay image {name} is no longer available")
+    return pathlib.Path(path).as_uri()
+
+
+def _fetch_artifact(url: str):
+    """
+    WeasyPrint URL fetcher that only reads files of the artifact store, so
+    that nothing in a template or result reaches other files or hosts.
+    """
+    parsed = urllib.parse.urlparse(url)
+    root = os.path.join(os.path.realpath(artifact_store.root), "")
+    if parsed.scheme != "file" or not os.path.realpath(urllib.request.url2pathname(parsed.path)).startswith(root):
+        raise ValueError(f"Reports may only embed artifact files: {url}")
+    from weasyprint import default_url_fetcher
+    return default_url_fetcher(url)
+
+
+def render_report_pdf(result_json: str) -> bytes:
+    """Renders the PDF report of a serialized AnalysisResult."""
+    result = json.loads(result_json)
+    # Overlay images are referenced by URL and read from the artifact store
+    if result.get("overlays"):
+        result["overlays"] = {key: _local_image_src(url) for key, url in result["overlays"].items()}
+
+    # Imported here: only the report pool processes need WeasyPrint loaded
+    from weasyprint import HTML
+    html_out = _environment().get_template(REPORT_TEMPLATE).render(result=result)
+    return HTML(string=html_out, url_fetcher=_fetch_artifact).write_pdf()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+from typing import Optional
+
+from .. import config
+
+
+class ReportStore:
+    """
+    Cache of rendered PDF reports on the uploads volume.
+
+    A report is keyed by the digest of the result it was rendered from and
+    the version of the report template, so a cached PDF is valid for as long
+    as it exists. Renders in progress are marked with a claim file, which lets
+    the workers sharing the volume avoid rendering the same report twice, and
+    failed renders leave their error message until the next attempt.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0, render_timeout_s: float = 120):
+        self.root = root
+        self.max_bytes = max_bytes
+        # A claim older than this belongs to a render that died.
+        self.render_timeout_s = render_timeout_s
+
+    @staticmethod
+    def key(result_digest: str, template_version: str) -> str:
+        return f"{result_digest}-{template_version}"
+
+    def path(self, key: str) -> Optional[str]:
+        """The path of the cached PDF, or None if it is not rendered yet."""
+        path = self._file(key, "pdf")
+        if not os.path.isfile(path):
+            return None
+        try:
+            # Refresh the mtime so eviction is least-recently-used.
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, pdf_bytes: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, self._file(key, "pdf"))
+        self._remove(self._file(key, "error"))
+        self._trim()
+
+    def claim(self, key: str) -> bool:
+        """
+        Marks the report as being rendered. Returns False if another render
+        of it is already in progress; a failed render's error is cleared.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = self._file(key, "pending")
+        try:
+            if time.time() - os.stat(path).st_mtime > self.render_timeout_s:
+                self._remove(path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        self._remove(self._file(key, "error"))
+        return True
+
+    def release(self, key: str):
+        self._remove(self._file(key, "pending"))
+
+    def is_pending(self, key: str) -> bool:
+        path = self._file(key, "pending")
+        try:
+            return time.time() - os.stat(path).st_mtime <= self.render_timeout_s
+        except OSError:
+            return False
+
+    def fail(self, key: str, error: str):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._file(key, "error"), "w") as f:
+            f.write(error)
+
+    def pop_error(self, key: str) -> Optional[str]:
+        """Returns and clears the error of the last failed render, if any."""
+        path = self._file(key, "error")
+        try:
+            with open(path, "r") as f:
+                error = f.read()
+        except OSError:
+            return None
+        self._remove(path)
+        return error
+
+    def _file(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _trim(self):
+        if self.max_bytes <= 0:
+            return
+        files = []
+        total = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".pdf"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+report_store = ReportStore(config.REPORTS_DIR, config.REPORTS_MAX_BYTES, config.REPORT_TIMEOUT_S)
@@ -0,0 +1,312 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import config
+from .artifact_store import artifact_store
+
+# Result ids are the AnalysisResult.image_id uuids.
+_ID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# Metrics kept as columns, so that they can be queried without reading results.
+METRIC_COLUMNS = ("L_mm", "N_int", "ell_mm", "ell_um", "G", "N_AE")
+
+_SCHEMA = (
+    f"""
+    CREATE TABLE IF NOT EXISTS results (
+        image_id TEXT PRIMARY KEY,
+        image_digest TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        {", ".join(f"{name} REAL NOT NULL" for name in METRIC_COLUMNS)},
+        total_s REAL NOT NULL,
+        params TEXT NOT NULL,
+        timings TEXT NOT NULL,
+        result_path TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS results_by_digest ON results (image_digest, created_at, image_id)",
+    "CREATE INDEX IF NOT EXISTS results_by_date ON results (created_at, image_id)",
+    # The artifacts (overlay images) each result refers to, kept by the
+    # artifact store while the result is
+    """
+    CREATE TABLE IF NOT EXISTS result_artifacts (
+        name TEXT NOT NULL,
+        image_id TEXT NOT NULL,
+        PRIMARY KEY (name, image_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS result_artifacts_by_result ON result_artifacts (image_id)",
+)
+
+_INSERT = (
+    f"INSERT OR REPLACE INTO results (image_id, image_digest, created_at, {', '.join(METRIC_COLUMNS)}, "
+    f"total_s, params, timings, result_path) VALUES ({', '.join('?' * (len(METRIC_COLUMNS) + 7))})"
+)
+
+# Expired results are looked for at most this often.
+_PURGE_INTERVAL_S = 3600
+
+
+def _artifact_names(result) -> List[str]:
+    """The artifact store names of the overlay images of an AnalysisResult."""
+    urls = []
+    for section in (result.overlays, result.debug_overlays):
+        if section is not None:
+            urls.extend(section.model_dump().values())
+    names = (artifact_store.name_from_url(url) for url in urls)
+    return sorted({name for name in names if name is not None})
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "image_id": row["image_id"],
+        "image_digest": row["image_digest"],
+        "created_at": row["created_at"],
+        "metrics": {name: row[name] for name in METRIC_COLUMNS},
+        "params_used": json.loads(row["params"]),
+        "timings": json.loads(row["timings"]),
+    }
+
+
+def _parse_cursor(cursor: str) -> Tuple[float, str]:
+    created_at, _, image_id = cursor.partition("_")
+    try:
+        return float(created_at), image_id
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class ResultStore:
+    """
+    Analysis results by image_id, kept as the JSON returned to the client.
+
+    The metrics, parameters, timings and image digest of every result are
+    indexed in SQLite, for queries across results; the full result JSON,
+    which can be large, is a file next to the database. Both live on the
+    uploads volume so that any worker can serve a later request for them.
+
+    `put` writes the result file right away, so that any worker or process
+    can serve the result as soon as it is returned; only the index rows are
+    batched: a writer thread inserts the queued rows every
+    `flush_interval_s` (or once `batch_size` are queued) in a single
+    transaction, and until then the result is missing from queries. Results
+    older than `retention_s` are deleted.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        root: str,
+        retention_s: float = 0,
+        flush_interval_s: float = 0.2,
+        batch_size: int = 100,
+    ):
+        self.db_path = db_path
+        self.root = root
+        self.retention_s = retention_s
+        self.flush_interval_s = flush_interval_s
+        self.batch_size = batch_size
+        self._initialized = False
+        # image_id -> (index row, artifact names), not inserted yet
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._last_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    # --- Writes ---
+
+    def put(self, result, image_digest: str):
+        """Stores an AnalysisResult of the image with content digest `image_digest`, and queues its index row."""
+        if not _ID_RE.match(result.image_id):
+            raise ValueError(f"Invalid result id: {result.image_id}")
+        entry = (self._write_result(result, image_digest, time.time()), _artifact_names(result))
+        with self._lock:
+            self._pending[result.image_id] = entry
+            full = len(self._pending) >= self.batch_size
+        if self.flush_interval_s <= 0:
+            self.flush()
+            return
+        self._ensure_writer()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Inserts the queued index rows."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.items())
+            if batch:
+                with self._connect() as conn:
+                    conn.executemany(_INSERT, [row for _, (row, _) in batch])
+                    conn.executemany("DELETE FROM result_artifacts WHERE image_id = ?", [(image_id,) for image_id, _ in batch])
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO result_artifacts (name, image_id) VALUES (?, ?)",
+                        [(name, image_id) for image_id, (_, names) in batch for name in names],
+                    )
+                with self._lock:
+                    for image_id, entry in batch:
+                        # Unless the result was put again meanwhile
+                        if self._pending.get(image_id) is entry:
+                            del self._pending[image_id]
+            if time.time() - self._last_purge > _PURGE_INTERVAL_S:
+                self.purge_expired()
+
+    def _write_result(self, result, image_digest: str, created_at: float) -> tuple:
+        """Writes the result file and returns the index row of the result."""
+        image_id = result.image_id
+        path = self._path(image_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write atomically so a concurrent reader never sees half a result.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(result.model_dump_json(exclude_none=True))
+        os.replace(tmp_path, path)
+        metrics = result.metrics
+        return (
+            image_id,
+            image_digest,
+            created_at,
+            *(getattr(metrics, name) for name in METRIC_COLUMNS),
+            result.timings.total_s,
+            result.params_used.model_dump_json(),
+            result.timings.model_dump_json(exclude_none=True),
+            path,
+        )
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._run_writer, name="result-store-writer", daemon=True)
+            self._writer.start()
+        # Store what is still queued when the process exits.
+        atexit.register(self.flush)
+
+    def _run_writer(self):
+        while True:
+            self._wakeup.wait(self.flush_interval_s)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error):
+                # Kept queued, and retried on the next flush
+                pass
+
+    # --- Reads ---
+
+    def get(self, image_id: str) -> Optional[Tuple[str, str]]:
+        """Returns (result JSON, its sha256 digest), or None for an unknown id."""
+        if not _ID_RE.match(image_id):
+            return None
+        try:
+            with open(self._path(image_id), "r") as f:
+                result_json = f.read()
+        except OSError:
+            return None
+        return result_json, hashlib.sha256(result_json.encode("utf-8")).hexdigest()
+
+    def query(
+        self,
+        image_digest: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lists stored results, newest first, optionally only those of one image
+        digest or created within [since, until). Pages are `limit` results
+        long; pass the returned cursor to get the next page, or None when
+        there is none. Raises ValueError on an invalid cursor.
+        """
+        # Rows this process queued are listed too
+        self.flush()
+        conditions = []
+        values: List[Any] = []
+        if image_digest is not None:
+            conditions.append("image_digest = ?")
+            values.append(image_digest)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            values.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            values.append(until)
+        if cursor is not None:
+            # Keyset pagination: a page costs the same wherever it starts
+            conditions.append("(created_at, image_id) < (?, ?)")
+            values.extend(_parse_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM results {where} ORDER BY created_at DESC, image_id DESC LIMIT ?",
+                (*values, limit + 1),
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at']!r}_{rows[-1]['image_id']}"
+        return [_row_to_dict(row) for row in rows], next_cursor
+
+    def artifact_names(self) -> set:
+        """The names of the artifacts referred to by stored results, queued ones included."""
+        with self._lock:
+            names = {name for _, entry_names in self._pending.values() for name in entry_names}
+        with self._connect() as conn:
+            names.update(row["name"] for row in conn.execute("SELECT DISTINCT name FROM result_artifacts"))
+        return names
+
+    def purge_expired(self):
+        """Drops results (and their files) older than the retention period."""
+        self._last_purge = time.time()
+        if self.retention_s <= 0:
+            return
+        cutoff = time.time() - self.retention_s
+        with self._connect() as conn:
+            rows = conn.execute("SELECT result_path FROM results WHERE created_at < ?", (cutoff,)).fetchall()
+            for row in rows:
+                try:
+                    os.remove(row["result_path"])
+                except OSError:
+                    pass
+            conn.execute(
+                "DELETE FROM result_artifacts WHERE image_id IN (SELECT image_id FROM results WHERE created_at < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,))
+
+    def _path(self, image_id: str) -> str:
+        return os.path.join(self.root, image_id[:2], f"{image_id}.json")
+
+
+result_store = ResultStore(
+    config.RESULT_STORE_PATH,
+    config.RESULTS_DIR,
+    config.RESULT_RETENTION_S,
+    config.RESULT_STORE_FLUSH_S,
+    config.RESULT_STORE_BATCH_SIZE,
+)
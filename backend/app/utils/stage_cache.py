@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from .. import config
+
+# The AnalysisParameters fields each pipeline stage depends on. A stage's key
+# is derived from its upstream stage's key plus these fields only, so that
+# changing e.g. `epsilon_factor` leaves every cached stage valid.
+STAGE_PARAMS = {
+    "preprocess": (
+        "gaussian_sigma",
+        "adaptive_block_size",
+        "adaptive_offset",
+        "morph_open_kernel",
+        "area_opening_min_size_px",
+        "detect_twins",
+        "threshold_backend",
+    ),
+    "skeleton": (),
+    "border_width": (),
+    "graph": ("skeleton_prune_ratio",),
+}
+
+
+def image_digest(image_bytes: bytes) -> str:
+    """Returns the content digest used to key every stage of an image."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def stage_key(stage: str, upstream_key: str, params) -> str:
+    """
+    Builds the cache key of `stage` from the key of the stage it consumes
+    (the image digest for the first stage) and the parameters it depends on.
+    """
+    return derived_key(stage, upstream_key, {name: getattr(params, name) for name in STAGE_PARAMS[stage]})
+
+
+def derived_key(stage: str, upstream_key: str, values: dict) -> str:
+    """Builds the cache key of `stage` from its upstream key and the values it depends on."""
+    payload = json.dumps([stage, upstream_key, values], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# The disk tier is trimmed (a walk over all its files) once this process
+# has written this fraction of its bound since the last trim, or at most
+# every _TRIM_INTERVAL_S while it writes.
+_TRIM_FRACTION = 0.05
+_TRIM_INTERVAL_S = 60.0
+# Temporary files older than this were orphaned by a crash mid-write.
+_STALE_TMP_S = 600.0
+
+
+def _estimate_nbytes(value: Any) -> int:
+    """Rough in-memory size of a cached stage output."""
+    if isinstance(value, (tuple, list)):
+        return sum(_estimate_nbytes(v) for v in value)
+    # NumPy arrays and array-backed objects such as SkeletonGraph
+    return int(getattr(value, "nbytes", 64))
+
+
+class StageCache:
+    """
+    Content-addressed cache for pipeline stage outputs.
+
+    Entries live in a size-bounded in-memory LRU. When `disk_dir` is set they
+    are also pickled there, which lets the other gunicorn workers sharing the
+    uploads volume reuse them; the disk tier is bounded too, evicting the
+    least recently used files first. Since that walks the whole tier, it
+    only runs once enough has been written since the last time.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._written_since_trim = 0
+        self._last_trim = time.time()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.disk_dir is not None
+
+    def get(self, key: str) -> Tuple[Optional[str], Any]:
+        """
+        Looks up `key`. Returns a tuple (tier, value) where tier is "memory",
+        "disk", or None on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return "memory", self._entries[key][0]
+
+        value = self._read_disk(key)
+        if value is not None:
+            self._put_memory(key, value)
+            return "disk", value
+        return None, None
+
+    def put(self, key: str, value: Any):
+        self._put_memory(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """
+        Returns the cached value for `key`, computing and storing it on a miss.
+        The second element reports where it came from: "memory", "disk" or "miss".
+        """
+        if not self.enabled:
+            return compute(), "miss"
+        tier, value = self.get(key)
+        if tier is not None:
+            return value, tier
+        value = compute()
+        self.put(key, value)
+        return value, "miss"
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    # --- Memory tier ---
+
+    def _put_memory(self, key: str, value: Any):
+        nbytes = _estimate_nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self._size -= evicted_nbytes
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _read_disk(self, key: str) -> Any:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            # Refresh the mtime so disk eviction is least-recently-used.
+            os.utime(path)
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so other workers never read a partial entry.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                nbytes = f.tell()
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError, TypeError, AttributeError):
+            # The value was computed; failing to share it must not fail the caller.
+            self._remove(tmp_path)
+            return
+        self._maybe_trim_disk(nbytes)
+
+    def _maybe_trim_disk(self, nbytes: int):
+        if self.disk_max_bytes <= 0:
+            return
+        with self._lock:
+            self._written_since_trim += nbytes
+            now = time.time()
+            if (
+                self._written_since_trim < self.disk_max_bytes * _TRIM_FRACTION
+                and now - self._last_trim < _TRIM_INTERVAL_S
+            ):
+                return
+            self._written_since_trim = 0
+            self._last_trim = now
+        self._trim_disk()
+
+    def _trim_disk(self):
+        files = []
+        total = 0
+        stale_tmp = time.time() - _STALE_TMP_S
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    if stat.st_mtime < stale_tmp:
+                        self._remove(path)
+                    continue
+                if not name.endswith(".pkl"):
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        for _, size, path in sorted(files):
+            self._remove(path)
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# One cache per worker process; the disk tier is what the workers share.
+stage_cache = StageCache(
+    config.STAGE_CACHE_MAX_BYTES,
+    disk_dir=config.STAGE_CACHE_DIR if config.STAGE_CACHE_DISK else None,
+    disk_max_bytes=config.STAGE_CACHE_DISK_MAX_BYTES,
+)
@@ -0,0 +1,268 @@
+"""
+Benchmarks every pipeline stage, and the whole /api/analyze request, over a
+matrix of image sizes and grain densities.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+
+Each stage is run `--repeat` times on a synthetic Voronoi microstructure;
+its median wall time and its peak RSS above the RSS before the stage are
+recorded. With `--baseline`, the run fails (exit status 1) when a stage is
+slower, or needs more memory, than the baseline by more than the threshold.
+Baselines are only comparable on the same machine.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# The analysis endpoint must neither hit the stage cache nor write to the
+# real uploads volume; config reads these once, on import.
+os.environ["STAGE_CACHE_MAX_BYTES"] = "0"
+os.environ["STAGE_CACHE_DISK"] = "0"
+os.environ.setdefault("UPLOADS_DIR", tempfile.mkdtemp(prefix="benchmark-uploads-"))
+
+import cv2
+import numpy as np
+from scipy.spatial import Voronoi
+
+from app.schemas.models import AnalysisParameters
+from app.processing.preprocess import preprocess_image
+from app.processing.skeleton import skeletonize_image, estimate_border_width
+from app.processing.graph import build_graph_from_skeleton, prune_graph
+from app.processing.motifs import generate_motifs
+from app.processing.intersections import detect_and_cluster_intersections
+
+SIZES = (1024, 2048, 3072, 4096, 5120)
+# Grains per megapixel
+DENSITIES = {"coarse": 50, "fine": 200}
+STAGES = (
+    "preprocess",
+    "skeletonize",
+    "border_width",
+    "build_graph",
+    "prune_graph",
+    "intersections",
+    "analyze_api",
+)
+
+# Differences below these are noise, whatever the ratio.
+MIN_DELTA_S = 0.05
+MIN_DELTA_BYTES = 16 * 1024 * 1024
+
+
+def voronoi_image(size: int, grains: int, seed: int = 0, line_width: int = 3) -> np.ndarray:
+    """A white image of `size` x `size` pixels with the black boundaries of `grains` Voronoi cells."""
+    rng = np.random.default_rng(seed)
+    points = rng.random((grains, 2)) * size
+    # Far points close the cells at the border
+    far = np.array([[-size, -size], [2 * size, -size], [-size, 2 * size], [2 * size, 2 * size]])
+    vor = Voronoi(np.concatenate([points, far]))
+    image = np.full((size, size), 255, dtype=np.uint8)
+    for ridge in vor.ridge_vertices:
+        if -1 in ridge:
+            continue
+        (x1, y1), (x2, y2) = vor.vertices[ridge]
+        # Vertices far outside the image overflow cv2's fixed-point coordinates
+        p1 = np.clip([x1, y1], -size, 2 * size).astype(int)
+        p2 = np.clip([x2, y2], -size, 2 * size).astype(int)
+        cv2.line(image, tuple(map(int, p1)), tuple(map(int, p2)), 0, line_width)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+# --- Peak RSS ---
+
+def _read_status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the peak RSS of this process (Linux); returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(fn, repeat: int):
+    """
+    Runs `fn` `repeat` times. Returns its median and minimum wall time and
+    its peak RSS increase, and the output of the last run.
+    """
+    times = []
+    rss_delta = None
+    for _ in range(repeat):
+        per_stage_rss = _reset_peak_rss()
+        rss_before = _read_status_kb("VmRSS") if per_stage_rss else 0
+        start = time.perf_counter()
+        output = fn()
+        times.append(time.perf_counter() - start)
+        if per_stage_rss:
+            rss_delta = max(rss_delta or 0, (_read_status_kb("VmHWM") - rss_before) * 1024)
+    stats = {
+        "wall_s": statistics.median(times),
+        "wall_s_min": min(times),
+        "peak_rss_delta_bytes": rss_delta,
+    }
+    return stats, output
+
+
+def run_case(size: int, grains: int, stages, repeat: int, client) -> dict:
+    """Benchmarks the selected stages on one synthetic image, feeding each stage the previous one's output."""
+    image = voronoi_image(size, grains)
+    params = AnalysisParameters(motifs={"type": "linear", "count": 20})
+    outputs = {}
+    results = {}
+
+    def stage(name, fn):
+        # Upstream outputs are always computed, but only timed when selected
+        if name in stages:
+            results[name], outputs[name] = measure(fn, repeat)
+        else:
+            outputs[name] = fn()
+
+    stage("preprocess", lambda: preprocess_image(
+        image, params.gaussian_sigma, params.adaptive_block_size, params.adaptive_offset,
+        params.morph_open_kernel, params.area_opening_min_size_px, params.detect_twins
+    ))
+    binary = outputs["preprocess"]
+    stage("skeletonize", lambda: skeletonize_image(binary))
+    skeleton = outputs["skeletonize"]
+    stage("border_width", lambda: estimate_border_width(binary, skeleton))
+    stage("build_graph", lambda: build_graph_from_skeleton(skeleton)[0])
+    graph = outputs["build_graph"]
+    stage("prune_graph", lambda: prune_graph(graph, params.skeleton_prune_ratio))
+    motifs = generate_motifs(image.shape[:2], params.motifs, params.random_seed)
+    epsilon = outputs["border_width"] * params.epsilon_factor
+    stage("intersections", lambda: detect_and_cluster_intersections(
+        motifs, outputs["prune_graph"], epsilon, params.norm_profile, params.intersection_engine
+    ))
+
+    if "analyze_api" in stages:
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+        def analyze():
+            response = client.post("/api/analyze", data={
+                "image": (io.BytesIO(image_bytes), "benchmark.png"),
+                "params": params.model_dump_json(),
+                "pixel_size_um": "1.0",
+            }, content_type="multipart/form-data")
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/analyze failed: {response.get_json()}")
+
+        results["analyze_api"], _ = measure(analyze, repeat)
+    return results
+
+
+def run(sizes, densities, stages, repeat: int) -> dict:
+    from app.main import create_app
+    client = create_app().test_client()
+    # Compiles the JIT-compiled (numba) graph code and warms up imports
+    run_case(256, 10, stages, 1, client)
+
+    cases = {}
+    for size in sizes:
+        for density in densities:
+            grains = max(1, round(DENSITIES[density] * size * size / 1e6))
+            name = f"{size}x{size}/{density}"
+            print(f"{name}: {grains} grains", file=sys.stderr)
+            cases[name] = run_case(size, grains, stages, repeat, client)
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "cases": cases,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, rss_threshold: float) -> list:
+    """
+    Returns a description of every regression of `results` against
+    `baseline`: a stage whose median wall time, or peak RSS increase, grew
+    by more than the threshold (a fraction) and by more than the noise floor.
+    """
+    regressions = []
+    for case, stages in results["cases"].items():
+        for stage, current in stages.items():
+            reference = baseline.get("cases", {}).get(case, {}).get(stage)
+            if reference is None:
+                continue
+            checks = (
+                ("wall_s", threshold, MIN_DELTA_S),
+                ("peak_rss_delta_bytes", rss_threshold, MIN_DELTA_BYTES),
+            )
+            for key, limit, min_delta in checks:
+                now, before = current.get(key), reference.get(key)
+                if now is None or before is None:
+                    continue
+                if now > before * (1 + limit) and now - before > min_delta:
+                    growth = f"+{(now / before - 1) * 100:.0f}%" if before > 0 else "from zero"
+                    regressions.append(f"{case} {stage} {key}: {before:.4g} -> {now:.4g} ({growth})")
+    return regressions
+
+
+def _print_table(results: dict):
+    print(f"{'case':<16} {'stage':<14} {'median s':>10} {'min s':>10} {'peak RSS MiB':>13}")
+    for case, stages in results["cases"].items():
+        for stage, r in stages.items():
+            rss = r["peak_rss_delta_bytes"]
+            rss_text = f"{rss / 2**20:.1f}" if rss is not None else "n/a"
+            print(f"{case:<16} {stage:<14} {r['wall_s']:>10.4f} {r['wall_s_min']:>10.4f} {rss_text:>13}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Image sizes in pixels (square)")
+    parser.add_argument("--densities", nargs="+", choices=sorted(DENSITIES), default=list(DENSITIES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is kept")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as the new baseline")
+    parser.add_argument("--baseline", help="Compare with this baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed wall time increase (0.2 = 20%%)")
+    parser.add_argument("--rss-threshold", type=float, default=0.2, help="Allowed peak RSS increase")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    results = run(args.sizes, args.densities, set(args.stages), args.repeat)
+    _print_table(results)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
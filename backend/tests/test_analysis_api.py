@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.api import analysis
+from app.api.analysis import analysis_bp
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+Y_JUNCTION_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_y_junction.png")
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def _post_analyze(client, **fields):
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        data = {
+            'image': (io.BytesIO(f.read()), 'y.png'),
+            'params': json.dumps({"adaptive_block_size": 51, "area_opening_min_size_px": 10}),
+            'pixel_size_um': '1.0',
+            **fields,
+        }
+    return client.post('/api/analyze', data=data, content_type='multipart/form-data')
+
+
+def test_analyze_is_lean_by_default(client):
+    response = _post_analyze(client)
+    assert response.status_code == 200
+    result = response.get_json()
+
+    assert "metrics" in result
+    for section in ("intersections", "motifs", "edges_stats", "overlays", "debug_overlays", "debug_stats"):
+        assert section not in result
+    assert "render_s" not in result["timings"] and "encode_s" not in result["timings"]
+
+
+def test_analyze_returns_requested_sections(client):
+    response = _post_analyze(client, include="intersections,overlays")
+    assert response.status_code == 200
+    result = response.get_json()
+
+    assert isinstance(result["intersections"], list)
+    assert result["overlays"]["annotated_image_url"].startswith("/api/artifacts/")
+    assert "debug_overlays" not in result and "edges_stats" not in result
+    assert result["timings"]["render_s"] >= 0
+    assert result["timings"]["encode_s"] >= 0
+
+
+def test_analyze_rejects_unknown_sections(client):
+    response = _post_analyze(client, include="metrics,thumbnails")
+    assert response.status_code == 400
+    assert "thumbnails" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("params", [
+    {"monte_carlo_seeds": -1},
+    {"monte_carlo_seeds": config.MONTE_CARLO_MAX_SEEDS + 1},
+    {"monte_carlo_confidence": 1.0},
+    {"monte_carlo_confidence": 0},
+    {"monte_carlo_target_accuracy": -0.05},
+])
+def test_analyze_rejects_out_of_range_monte_carlo_parameters(client, params):
+    response = _post_analyze(client, params=json.dumps(params))
+    assert response.status_code == 400
+    assert next(iter(params)) in response.get_json()["error"]
+
+
+class FullStore:
+    def put(self, result, image_digest):
+        raise OSError(28, "No space left on device")
+
+
+def test_analysis_survives_a_failure_to_store_its_result(client, monkeypatch):
+    """Failing to store a result only costs its reports, not the analysis."""
+    monkeypatch.setattr(analysis, "result_store", FullStore())
+    response = _post_analyze(client)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["metrics"]["N_int"] > 0
+    assert any("could not be stored" in warning for warning in result["warnings"])
+
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        item = analysis._analyze_batch_item(f.read(), {"adaptive_block_size": 51, "area_opening_min_size_px": 10}, 1.0)
+    assert item["metrics"]["N_int"] > 0
+    assert any("could not be stored" in warning for warning in item["warnings"])
+
+
+def test_parallel_rendering_matches_sequential(client, monkeypatch):
+    results = {}
+    for workers in (1, 3):
+        monkeypatch.setattr(config, "RENDER_WORKERS", workers)
+        response = _post_analyze(client, include="overlays,debug")
+        assert response.status_code == 200
+        results[workers] = response.get_json()
+
+    # Artifacts are content-addressed, so equal URLs mean identical images
+    assert results[3]["overlays"] == results[1]["overlays"]
+    assert results[3]["debug_overlays"] == results[1]["debug_overlays"]
+    assert set(results[3]["timings"]["artifacts"]) == {
+        "annotated", "skeleton_overlay", "motifs", "binary", "skeleton", "pruned_graph"
+    }
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import artifacts
+from app.utils.artifact_store import ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts"), "/api/artifacts", max_bytes=0, retention_s=0)
+
+
+def test_put_is_content_addressed(store):
+    name = store.put(b"same bytes", "png")
+    assert store.put(b"same bytes", "png") == name
+    assert store.put(b"other bytes", "png") != name
+
+    assert store.name_from_url(store.url(name)) == name
+    with open(store.path(name), "rb") as f:
+        assert f.read() == b"same bytes"
+    # Names that are not digests never map to a file
+    assert store.path("../../etc/passwd") is None
+    assert store.name_from_url("/api/artifacts/../secret.png") is None
+
+
+def test_purge_applies_retention_then_size_bound(store):
+    old = store.put(b"old" * 10, "png")
+    recent = store.put(b"recent" * 10, "png")
+    newest = store.put(b"newest" * 10, "png")
+    now = time.time()
+    os.utime(store.path(old), (now - 3600, now - 3600))
+    os.utime(store.path(recent), (now - 60, now - 60))
+
+    store.retention_s = 600
+    store.purge()
+    assert store.path(old) is None
+    assert store.path(recent) is not None
+
+    # Over the size bound, the least recently written artifact goes first
+    store.max_bytes = 70
+    store.purge()
+    assert store.path(recent) is None
+    assert store.path(newest) is not None
+
+
+def test_pinned_artifacts_are_kept(store):
+    pinned = store.put(b"pinned" * 10, "png")
+    unpinned = store.put(b"unpinned" * 10, "png")
+    old = time.time() - 3600
+    for name in (pinned, unpinned):
+        os.utime(store.path(name), (old, old))
+    store.retention_s = 600
+
+    # Pins that cannot be read delete nothing
+    store.pinned = lambda: None
+    store.purge()
+    assert store.path(unpinned) is not None
+
+    store.pinned = lambda: {pinned}
+    store.purge()
+    assert store.path(pinned) is not None
+    assert store.path(unpinned) is None
+
+    # Pinned artifacts do not count towards the size bound either
+    store.retention_s = 0
+    store.max_bytes = 70
+    fresh = store.put(b"fresh" * 10, "png")
+    store.purge()
+    assert store.path(pinned) is not None and store.path(fresh) is not None
+
+
+def test_artifact_route_serves_immutable_content(store, monkeypatch):
+    monkeypatch.setattr(artifacts, "artifact_store", store)
+    app = Flask(__name__)
+    app.register_blueprint(artifacts.artifacts_bp, url_prefix='/api')
+    client = app.test_client()
+    name = store.put(b"\x89PNG fake", "png")
+
+    response = client.get(store.url(name))
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.headers["ETag"] == f'"{name.split(".")[0]}"'
+    assert "immutable" in response.headers["Cache-Control"]
+
+    revalidated = client.get(store.url(name), headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    assert client.get("/api/artifacts/" + "0" * 64 + ".png").status_code == 404
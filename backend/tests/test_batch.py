@@ -0,0 +1,123 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.api import analysis
+from app.api.analysis import analysis_bp
+from app.processing.metrics import summarize_grain_sizes
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+Y_JUNCTION_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_y_junction.png")
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def _post_batch(client, images):
+    data = {
+        'image': [(io.BytesIO(image_bytes), name) for name, image_bytes in images],
+        'params': json.dumps({"adaptive_block_size": 51, "area_opening_min_size_px": 10}),
+        'pixel_size_um': '1.0',
+    }
+    response = client.post('/api/analyze/batch', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_summarize_grain_sizes():
+    summary = summarize_grain_sizes([5.0, 6.0, 7.0], confidence=0.95)
+    assert summary.n == 3
+    assert summary.G_mean == pytest.approx(6.0)
+    assert summary.G_std == pytest.approx(1.0)
+    # t(0.975, 2) = 4.303
+    assert summary.G_ci_high - summary.G_mean == pytest.approx(4.303 / 3 ** 0.5, rel=1e-3)
+
+    single = summarize_grain_sizes([5.0])
+    assert single.G_mean == 5.0 and single.G_std is None and single.G_ci_low is None
+    assert summarize_grain_sizes([]).G_mean is None
+
+
+def test_batch_streams_one_line_per_image_and_a_summary(client):
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        image_bytes = f.read()
+
+    lines = _post_batch(client, [("y1.png", image_bytes), ("bad.png", b"not an image"), ("y2.png", image_bytes)])
+
+    assert len(lines) == 4
+    per_image = {line["filename"]: line for line in lines[:-1]}
+    assert per_image["y1.png"]["type"] == "result"
+    assert "metrics" in per_image["y1.png"] and "overlays" not in per_image["y1.png"]
+    assert per_image["bad.png"]["type"] == "error"
+
+    summary = lines[-1]
+    assert summary["type"] == "summary"
+    assert summary["n_images"] == 3
+    assert summary["n_failed"] == 1
+    assert summary["timed_out"] is False
+
+
+def test_batch_honors_timeout(client, monkeypatch):
+    monkeypatch.setattr(config, "BATCH_TIMEOUT_S", 0)
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        image_bytes = f.read()
+
+    lines = _post_batch(client, [("y1.png", image_bytes)])
+
+    assert lines[0]["type"] == "error"
+    assert "timeout" in lines[0]["error"]
+    assert lines[-1]["timed_out"] is True
+    assert lines[-1]["n_failed"] == 1
+
+
+def test_batch_timeout_still_reports_images_finished_while_the_client_read(client, monkeypatch):
+    release = threading.Event()
+
+    def fake_item(image_bytes, params_dict, pixel_size_um):
+        if image_bytes == b"slow":
+            time.sleep(0.2)
+        elif image_bytes == b"stuck":
+            release.wait(10)
+        return {"metrics": {"N_int": 10, "G": 5.0}}
+
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(analysis, "get_process_pool", lambda name, n: pool)
+    monkeypatch.setattr(analysis, "_analyze_batch_item", fake_item)
+    monkeypatch.setattr(config, "BATCH_TIMEOUT_S", 1.0)
+
+    response = client.post('/api/analyze/batch', data={
+        'image': [(io.BytesIO(body), f"{body.decode()}.png") for body in (b"fast", b"slow", b"stuck")],
+        'params': '{}',
+        'pixel_size_um': '1.0',
+    }, content_type='multipart/form-data')
+    chunks = iter(response.response)
+    lines = [json.loads(next(chunks))]
+    # The deadline passes while the client is busy; "slow" has finished meanwhile.
+    time.sleep(1.5)
+    lines += [json.loads(chunk) for chunk in chunks]
+    release.set()
+    pool.shutdown()
+
+    per_image = {line["filename"]: line for line in lines[:-1]}
+    assert len(per_image) == 3
+    assert per_image["fast.png"]["type"] == "result"
+    assert per_image["slow.png"]["type"] == "result"
+    assert per_image["stuck.png"]["type"] == "error" and "timeout" in per_image["stuck.png"]["error"]
+    summary = lines[-1]
+    assert summary["timed_out"] is True
+    assert summary["n_failed"] == 1
+    assert summary["n"] == 2
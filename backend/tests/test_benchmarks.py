@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import run as bench
+
+
+def _results(wall_s, rss):
+    return {"cases": {"1024x1024/fine": {"preprocess": {"wall_s": wall_s, "wall_s_min": wall_s, "peak_rss_delta_bytes": rss}}}}
+
+
+def test_compare_flags_only_regressions_beyond_threshold_and_noise():
+    baseline = _results(1.0, 100 * 2**20)
+    assert bench.compare(_results(1.1, 110 * 2**20), baseline, 0.2, 0.2) == []
+    assert bench.compare(_results(0.5, 50 * 2**20), baseline, 0.2, 0.2) == []
+
+    regressions = bench.compare(_results(1.5, 100 * 2**20), baseline, 0.2, 0.2)
+    assert len(regressions) == 1 and "preprocess wall_s" in regressions[0]
+    regressions = bench.compare(_results(1.0, 200 * 2**20), baseline, 0.2, 0.2)
+    assert len(regressions) == 1 and "peak_rss_delta_bytes" in regressions[0]
+
+    # Tiny stages doubling in time are noise
+    assert bench.compare(_results(0.02, 0), _results(0.01, 0), 0.2, 0.2) == []
+    # Cases and stages missing from the baseline are not compared
+    assert bench.compare(_results(9.0, 0), {"cases": {}}, 0.2, 0.2) == []
+
+
+def test_harness_runs_and_fails_on_regression(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    args = ["--sizes", "256", "--densities", "fine", "--repeat", "1",
+            "--stages", "preprocess", "skeletonize", "analyze_api"]
+    assert bench.main(args + ["--save-baseline", str(baseline_path)]) == 0
+
+    baseline = json.loads(baseline_path.read_text())
+    stages = baseline["cases"]["256x256/fine"]
+    assert set(stages) == {"preprocess", "skeletonize", "analyze_api"}
+    assert all(stage["wall_s"] > 0 for stage in stages.values())
+
+    # A baseline faster than anything possible
+    stages["analyze_api"]["wall_s"] = -1.0
+    baseline_path.write_text(json.dumps(baseline))
+    assert bench.main(args + ["--baseline", str(baseline_path)]) == 1
+
+
+def test_voronoi_image_has_closed_cells():
+    import cv2
+    image = bench.voronoi_image(512, 40)
+    assert image.shape == (512, 512, 3)
+    background = (image[:, :, 0] == 255).astype("uint8")
+    n_labels, _ = cv2.connectedComponents(background, connectivity=4)
+    # One component per grain, give or take cells merged or split at the border
+    assert 30 <= n_labels - 1 <= 60
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.processing.graph import SkeletonGraph, build_graph_from_skeleton, prune_graph
+
+
+def _graph(n_nodes, edges, lengths):
+    """Builds a SkeletonGraph with two-point straight paths between node positions."""
+    rng = np.random.default_rng(0)
+    pos = rng.integers(0, 100, size=(n_nodes, 2))
+    src, dst = zip(*edges)
+    coords = np.concatenate([[pos[u], pos[v]] for u, v in edges])
+    return SkeletonGraph(pos, src, dst, lengths, np.arange(len(edges)), coords, np.arange(len(edges) + 1) * 2)
+
+
+def _prune_by_rounds(G, prune_ratio):
+    """Reference pruning: remove every short dangling edge, recompute degrees, repeat."""
+    n = G.number_of_nodes()
+    alive = np.ones(G.number_of_edges(), dtype=bool)
+    short = G.edge_length < prune_ratio * np.median(G.edge_length)
+    while True:
+        degrees = np.bincount(G.edge_src[alive], minlength=n) + np.bincount(G.edge_dst[alive], minlength=n)
+        dangling = alive & short & ((degrees[G.edge_src] == 1) | (degrees[G.edge_dst] == 1))
+        if not dangling.any():
+            return alive
+        alive &= ~dangling
+
+
+def test_spur_chain_is_pruned_in_one_call():
+    """A chain of short edges hanging off a long cycle is removed entirely; the cycle is untouched."""
+    cycle = [(0, 1), (1, 2), (2, 0)]
+    chain = [(2, 3), (3, 4), (4, 5), (5, 6)]
+    G = _graph(7, cycle + chain, [10.0] * 3 + [1.0] * 4)
+
+    pruned = prune_graph(G, 5.0)
+
+    assert pruned.number_of_edges() == 3
+    assert pruned.number_of_nodes() == 3
+    assert pruned.degrees.tolist() == [2, 2, 2]
+    # The input graph is left as it was
+    assert G.number_of_edges() == 7
+
+
+def test_pruning_matches_round_based_reference():
+    """The worklist pruning removes exactly the edges a round-by-round pass would."""
+    rng = np.random.default_rng(42)
+    for _ in range(50):
+        n_nodes = int(rng.integers(5, 60))
+        edges = {tuple(sorted(e)) for e in rng.integers(0, n_nodes, size=(n_nodes + 5, 2)) if e[0] != e[1]}
+        edges = sorted(edges)
+        G = _graph(n_nodes, edges, rng.uniform(0.5, 10.0, size=len(edges)))
+        expected = _prune_by_rounds(G, 1.0)
+
+        pruned = prune_graph(G, 1.0)
+
+        assert sorted(pruned.edge_id.tolist()) == np.nonzero(expected)[0].tolist()
+
+
+def test_built_graph_nodes_sit_at_branch_ends():
+    """Each edge's pixel path runs from its source node's position to its destination node's."""
+    skeleton = np.zeros((40, 60), dtype=bool)
+    skeleton[20, 5:55] = True
+    skeleton[5:20, 30] = True
+    skeleton[21:35, 12] = True
+
+    graph, summary = build_graph_from_skeleton(skeleton)
+
+    assert summary is None
+    assert graph.number_of_edges() == 5
+    assert sorted(graph.degrees.tolist()) == [1, 1, 1, 1, 3, 3]
+    for i in range(graph.number_of_edges()):
+        path = graph.edge_coords(i)
+        assert skeleton[path[:, 1], path[:, 0]].all()
+        assert path[0].tolist() == graph.node_pos[graph.edge_src[i]].tolist()
+        assert path[-1].tolist() == graph.node_pos[graph.edge_dst[i]].tolist()
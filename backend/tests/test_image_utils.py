@@ -0,0 +1,39 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.image_utils import encode_layer, encode_image_to_png
+
+
+@pytest.fixture
+def mask():
+    mask = np.zeros((64, 64), dtype=np.uint8)
+    mask[10:50, 20:30] = 255
+    return mask
+
+
+def test_masks_are_lossless_1bit_pngs(mask):
+    data, ext = encode_layer(mask, "mask")
+    assert ext == "png"
+    decoded = Image.open(io.BytesIO(data))
+    assert decoded.mode == "1"
+    assert np.array_equal(np.array(decoded), mask > 0)
+    assert len(data) < len(encode_image_to_png(mask))
+
+
+def test_photo_layers_use_the_requested_format(mask):
+    photo = np.dstack([mask, mask // 2, np.full_like(mask, 128)])
+    for photo_format, pil_format in (("png", "PNG"), ("webp", "WEBP"), ("jpg", "JPEG")):
+        data, ext = encode_layer(photo, "photo", photo_format=photo_format, quality=70, compression="fast")
+        assert ext == photo_format
+        assert Image.open(io.BytesIO(data)).format == pil_format
+
+    with pytest.raises(ValueError):
+        encode_layer(photo, "photo", compression="extreme")
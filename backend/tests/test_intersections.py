@@ -0,0 +1,162 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+from shapely.geometry import LineString, Point
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.processing.preprocess import preprocess_image
+from app.processing.skeleton import skeletonize_image
+from app.processing.graph import SkeletonGraph, build_graph_from_skeleton, prune_graph
+from app.processing.motifs import generate_motifs
+from app.processing.intersections import (
+    detect_and_cluster_intersections,
+    _raw_intersections_numpy,
+    _raw_intersections_shapely,
+)
+from app.processing.segments import (
+    polylines_to_segments, SegmentIndex, intersect_segment_pairs, annulus_candidates, intersect_segments_circles
+)
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+
+
+@pytest.fixture(scope="module", params=["synthetic_voronoi_standard.png", "synthetic_voronoi_dense.png"])
+def pruned_graph_and_shape(request):
+    img = cv2.imread(os.path.join(INPUT_DIR, request.param), cv2.IMREAD_GRAYSCALE)
+    assert img is not None, f"Failed to load image {request.param}"
+    binary_img = preprocess_image(img, adaptive_offset=10, morph_open_kernel=0, area_opening_min_size_px=0)
+    graph, _ = build_graph_from_skeleton(skeletonize_image(binary_img))
+    return prune_graph(graph, 0.5), img.shape
+
+
+def _random_lines(shape, count, seed):
+    h, w = shape
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": f"L-{i}", "type": "linear",
+         "geometry": LineString([tuple(rng.uniform(0, [w, h])), tuple(rng.uniform(0, [w, h]))])}
+        for i in range(count)
+    ]
+
+
+def _point_set(points, motif_ids):
+    return sorted((m, round(x, 6), round(y, 6)) for (x, y), m in zip(points, motif_ids))
+
+
+def test_numpy_engine_matches_shapely_reference(pruned_graph_and_shape):
+    graph, shape = pruned_graph_and_shape
+    motifs = _random_lines(shape, 20, seed=0)
+
+    ref_points, ref_ids = _raw_intersections_shapely(motifs, graph)
+    points, ids = _raw_intersections_numpy(motifs, graph)
+    assert len(ref_points) > 0
+    assert _point_set(points, ids) == _point_set(ref_points, ref_ids)
+
+    def summary(intersections):
+        return sorted((round(i["x"], 6), round(i["y"], 6), i["type"], i["score"]) for i in intersections)
+
+    assert summary(detect_and_cluster_intersections(motifs, graph, 2.0, engine="numpy")) == \
+        summary(detect_and_cluster_intersections(motifs, graph, 2.0, engine="shapely"))
+
+
+def test_circular_motifs_are_solved_exactly(pruned_graph_and_shape):
+    """Analytic circle crossings converge to those of ever finer polygons."""
+    graph, shape = pruned_graph_and_shape
+    motifs = generate_motifs(shape, {"type": "circular", "count": 5}, seed=42)
+    for motif in motifs:
+        assert motif["length_px"] == pytest.approx(2 * np.pi * motif["radius"], rel=1e-12)
+
+    points, ids = _raw_intersections_numpy(motifs, graph)
+    assert len(points) > 0
+    for quad_segs, atol in [(256, 0.05), (16384, 1e-4)]:
+        polygons = [
+            {**m, "geometry": Point(m["center"]).buffer(m["radius"], quad_segs=quad_segs).exterior} for m in motifs
+        ]
+        ref_points, ref_ids = _raw_intersections_shapely(polygons, graph)
+        for motif_id in {m["id"] for m in motifs}:
+            mine = np.array([p for p, i in zip(points, ids) if i == motif_id]).reshape(-1, 2)
+            ref = np.array([p for p, i in zip(ref_points, ref_ids) if i == motif_id]).reshape(-1, 2)
+            assert len(mine) == len(ref)
+            if len(ref):
+                assert cKDTree(ref).query(mine)[0].max() <= atol
+                assert cKDTree(mine).query(ref)[0].max() <= atol
+
+
+def test_annulus_prefilter_and_circle_solver():
+    """Crossings, tangents and segments inside or outside the circle."""
+    starts = np.array([[-20.0, 0.0], [0.0, 0.0], [-20.0, 10.0], [20.0, 20.0], [0.0, 0.0]])
+    ends = np.array([[20.0, 0.0], [5.0, 0.0], [20.0, 10.0], [30.0, 30.0], [20.0, 0.0]])
+    circle_ids, segment_ids = annulus_candidates(starts, ends, (0.0, 0.0), np.array([10.0]))
+    # Segments 1 (inside) and 3 (outside) cannot cross the circle
+    assert sorted(segment_ids.tolist()) == [0, 2, 4]
+
+    pair_ids, points, angles = intersect_segments_circles(
+        starts[segment_ids], ends[segment_ids], np.zeros((len(segment_ids), 2)), np.full(len(segment_ids), 10.0)
+    )
+    by_segment = {}
+    for pair, point in zip(pair_ids, points.round(9).tolist()):
+        by_segment.setdefault(int(segment_ids[pair]), []).append(point)
+    assert sorted(by_segment[0]) == [[-10.0, 0.0], [10.0, 0.0]]   # crosses twice
+    assert by_segment[2] == [[0.0, 10.0], [0.0, 10.0]]   # tangent
+    assert by_segment[4] == [[10.0, 0.0]]   # crosses once
+    assert np.all((angles >= 0) & (angles < 2 * np.pi))
+
+
+def test_unknown_engine_is_rejected(pruned_graph_and_shape):
+    graph, shape = pruned_graph_and_shape
+    with pytest.raises(ValueError):
+        detect_and_cluster_intersections(_random_lines(shape, 1, 0), graph, 2.0, engine="fortran")
+
+
+def test_segment_primitives():
+    """Crossings, shared vertices and collinear overlaps on hand-made segments."""
+    starts, ends, owners = polylines_to_segments([np.array([[0, 0], [2, 0], [4, 0]]), np.array([[5, 5]])])
+    assert len(starts) == 2 and list(owners) == [0, 0]
+
+    index = SegmentIndex(starts, ends, cell_size=1.0)
+    q_ids, seg_ids = index.candidate_pairs(np.array([[2.0, -1.0]]), np.array([[2.0, 1.0]]))
+    assert set(seg_ids) == {0, 1}
+
+    a0 = np.array([[2.0, -1.0], [1.0, 0.0], [0.0, 1.0]])
+    a1 = np.array([[2.0, 1.0], [3.0, 0.0], [4.0, 1.0]])
+    b0 = np.array([[0.0, 0.0], [0.0, 0.0], [0.0, 0.0]])
+    b1 = np.array([[4.0, 0.0], [2.0, 0.0], [4.0, 0.0]])
+    pair_ids, points, _ = intersect_segment_pairs(a0, a1, b0, b1)
+
+    assert [2.0, 0.0] in points[pair_ids == 0].tolist()   # crossing
+    assert sorted(points[pair_ids == 1].tolist()) == [[1.0, 0.0], [2.0, 0.0]]   # overlap ends
+    assert not np.any(pair_ids == 2)   # parallel, disjoint
+
+
+def test_clusters_are_classified_and_report_every_motif():
+    """Two motifs crossing at a junction give one cluster listing both motifs."""
+    ends = [(50, 0), (0, 100), (100, 100)]
+    paths = [np.linspace((50, 50), pos, 51).round().astype(int) for pos in ends]
+    graph = SkeletonGraph(
+        node_pos=[(50, 50)] + ends,
+        edge_src=[0, 0, 0],
+        edge_dst=[1, 2, 3],
+        edge_length=[float(np.hypot(50 - x, 50 - y)) for x, y in ends],
+        edge_id=[0, 1, 2],
+        coords=np.concatenate(paths),
+        coord_offsets=np.cumsum([0] + [len(p) for p in paths]),
+    )
+
+    motifs = [
+        {"id": "L-0", "type": "linear", "geometry": LineString([(0, 48), (100, 48)])},
+        {"id": "L-1", "type": "linear", "geometry": LineString([(45, 40), (55, 60)])},
+        {"id": "L-2", "type": "linear", "geometry": LineString([(0, 3), (100, 3)])},
+    ]
+    intersections = detect_and_cluster_intersections(motifs, graph, epsilon_px=5.0)
+
+    by_type = {i["type"]: i for i in intersections}
+    assert set(by_type) == {"jonction", "extrémité"}
+    assert set(by_type["jonction"]["motif_ids"]) == {"L-0", "L-1"}
+    assert by_type["jonction"]["motif_id"] in {"L-0", "L-1"}
+    assert by_type["extrémité"]["motif_ids"] == ["L-2"]
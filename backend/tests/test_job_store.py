@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "results"))
+
+
+def test_job_lifecycle(store):
+    """A job moves from queued to done, recording stages and its result."""
+    store.create("job1")
+    assert store.get("job1")["status"] == "queued"
+
+    store.mark_running("job1")
+    store.record_stage("job1", "preprocess")
+    store.record_stage("job1", "skeleton")
+    job = store.get("job1")
+    assert job["status"] == "running"
+    assert store.completed_stages(job) == ["preprocess", "skeleton"]
+
+    store.complete("job1", '{"metrics": {"G": 5.0}}')
+    job = store.get("job1")
+    assert job["status"] == "done"
+    assert store.load_result(job) == {"metrics": {"G": 5.0}}
+
+
+def test_failed_job_keeps_error(store):
+    store.create("job2")
+    store.fail("job2", "boom")
+    job = store.get("job2")
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+    assert store.load_result(job) is None
+
+
+def test_state_is_shared_between_store_instances(store):
+    """Pool processes open their own store on the same database."""
+    store.create("job3")
+    other = JobStore(store.db_path, store.results_dir)
+    other.record_stage("job3", "preprocess")
+    assert store.completed_stages(store.get("job3")) == ["preprocess"]
+    assert store.get("missing") is None
+
+
+def test_expired_jobs_are_purged(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "results"), retention_s=1e-9)
+    store.create("old")
+    store.complete("old", "{}")
+    result_path = store.get("old")["result_path"]
+
+    store.purge_expired()
+    assert store.get("old") is None
+    assert not os.path.exists(result_path)
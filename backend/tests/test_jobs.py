@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+from concurrent.futures import Future, wait
+
+import pytest
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import jobs as jobs_api
+from app.utils import pools
+from app.utils.job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "results"))
+    monkeypatch.setattr(jobs_api, "job_store", store)
+    return store
+
+
+def _wait_for_status(store, job_ids, status, timeout_s=10.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if all(store.get(job_id)["status"] == status for job_id in job_ids):
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"Jobs {job_ids} did not become {status}")
+
+
+def test_crashed_job_fails_queued_jobs_without_discarding_the_fresh_pool(store):
+    """
+    A crash fails every job of the broken pool; a late report of it leaves
+    the pool that replaced it, and the jobs it runs, alone.
+    """
+    try:
+        broken = pools.get_process_pool("jobs", 1)
+        futures = {"crash": broken.submit(os._exit, 1)}
+        futures.update({f"queued{i}": broken.submit(time.sleep, 0.1) for i in range(3)})
+        for job_id, future in futures.items():
+            store.create(job_id)
+            future.add_done_callback(lambda f, job_id=job_id: jobs_api._on_job_finished(job_id, broken, f))
+        wait(futures.values())
+        _wait_for_status(store, futures, "failed")
+        assert "terminated unexpectedly" in store.get("queued0")["error"]
+
+        fresh = pools.get_process_pool("jobs", 1)
+        assert fresh is not broken
+        running = fresh.submit(time.sleep, 0.1)
+        jobs_api._on_job_finished("queued0", broken, futures["queued0"])
+        assert pools._pools["jobs"] is fresh
+        assert running.result(timeout=30) is None
+    finally:
+        pool = pools._pools.pop("jobs", None)
+        if pool is not None:
+            pool.shutdown()
+
+
+def test_cancelled_job_is_failed(store):
+    store.create("job1")
+    future = Future()
+    future.cancel()
+    jobs_api._on_job_finished("job1", None, future)
+    job = store.get("job1")
+    assert job["status"] == "failed" and "cancelled" in job["error"]
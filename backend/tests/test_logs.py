@@ -0,0 +1,131 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import logs as logs_api
+from app.api.logs import logs_bp, tail_file, read_after
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("max_lines", [0, 1, 7, 5000])
+def test_tail_matches_readlines(tmp_path, monkeypatch, trailing_newline, max_lines):
+    # Small blocks, so that lines straddle block boundaries
+    monkeypatch.setattr(logs_api, "_BLOCK_SIZE", 13)
+    path = tmp_path / "app.log"
+    text = "".join(f"line {i} " + "x" * (i % 17) + "\n" for i in range(300))
+    if not trailing_newline:
+        text += "partial"
+    path.write_text(text)
+
+    with open(path, "r") as f:
+        expected = "".join(f.readlines()[-max_lines:]) if max_lines else ""
+    content, offset, _ = tail_file(str(path), max_lines)
+    assert content == expected
+    assert offset == len(text)
+
+
+def test_tail_reads_only_the_end(tmp_path, monkeypatch):
+    path = tmp_path / "app.log"
+    with open(path, "wb") as f:
+        f.write(b"\xff" * (8 * 1024 * 1024))
+        f.write(b"\nlast line\n")
+
+    reads = []
+    real_open = open
+
+    class CountingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def seek(self, *args):
+            return self.f.seek(*args)
+
+        def fileno(self):
+            return self.f.fileno()
+
+        def read(self, size):
+            reads.append(size)
+            return self.f.read(size)
+
+    monkeypatch.setattr(logs_api, "open", lambda *args: CountingFile(real_open(*args)), raising=False)
+    content, _, _ = tail_file(str(path), 1)
+    assert content == "last line\n"
+    assert sum(reads) <= 2 * logs_api._BLOCK_SIZE
+
+
+def test_follow_returns_complete_new_lines(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("a\nb\n")
+    _, offset, file_id = tail_file(str(path), 1)
+
+    content, offset, reset, _ = read_after(str(path), offset, file_id)
+    assert (content, reset) == ("", False)
+
+    with open(path, "a") as f:
+        f.write("c\nd")
+    content, offset, _, _ = read_after(str(path), offset, file_id)
+    assert content == "c\n"
+    with open(path, "a") as f:
+        f.write("\n")
+    content, offset, _, _ = read_after(str(path), offset, file_id)
+    assert content == "d\n"
+
+    # Truncated, e.g. rotated by copytruncate: read again from the start
+    path.write_text("e\n")
+    content, offset, reset, _ = read_after(str(path), offset, file_id)
+    assert (content, offset, reset) == ("e\n", 2, True)
+
+    # Replaced, e.g. rotated by renaming, by a file already longer than the
+    # offset: read again from the start as well
+    rotated = tmp_path / "new.log"
+    rotated.write_text("f\ng\nh\n")
+    os.replace(rotated, path)
+    content, offset, reset, new_id = read_after(str(path), offset, file_id)
+    assert (content, offset, reset) == ("f\ng\nh\n", 6, True)
+    assert new_id != file_id
+    assert read_after(str(path), offset, new_id)[2] is False
+
+    # Lines longer than a response are split
+    path.write_text("x" * 10)
+    assert read_after(str(path), 0, max_bytes=4)[:3] == ("xxxx", 4, False)
+
+
+def test_log_endpoints(tmp_path, monkeypatch):
+    path = tmp_path / "backend_error.log"
+    path.write_text("".join(f"{i}\n" for i in range(10)))
+    monkeypatch.setattr(logs_api, "LOG_FILES", {"backend_error": str(path), "missing": str(tmp_path / "none.log")})
+    app = Flask(__name__)
+    app.register_blueprint(logs_bp, url_prefix='/api')
+    client = app.test_client()
+
+    data = client.get("/api/logs", query_string={"max_lines": 2}).get_json()
+    assert data["backend_error"] == "8\n9\n"
+    assert data["missing"].startswith("Log file not found")
+
+    data = client.get("/api/logs/backend_error", query_string={"max_lines": 3}).get_json()
+    assert data["content"] == "7\n8\n9\n"
+    with open(path, "a") as f:
+        f.write("10\n")
+    data = client.get(
+        "/api/logs/backend_error", query_string={"after_offset": data["offset"], "file_id": data["file_id"]}
+    ).get_json()
+    assert data["content"] == "10\n" and not data["reset"]
+    data = client.get(
+        "/api/logs/backend_error", query_string={"after_offset": 0, "file_id": "0-0"}
+    ).get_json()
+    assert data["reset"]
+
+    assert client.get("/api/logs/backend_error", query_string={"after_offset": "-1"}).status_code == 400
+    assert client.get("/api/logs/missing").status_code == 404
+    assert client.get("/api/logs/other").status_code == 404
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+from flask import Flask
+from prometheus_client import REGISTRY
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.analysis import analysis_bp
+from app.utils import monitoring
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+Y_JUNCTION_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_y_junction.png")
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_and_stages_are_measured():
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    monitoring.init_app(app)
+    client = app.test_client()
+
+    labels = {"endpoint": "/api/analyze", "method": "POST"}
+    requests_before = sample("grain_http_requests_total", status="200", **labels)
+    motifs_before = sample("grain_stage_duration_seconds_count", stage="motifs")
+    serialize_before = sample("grain_stage_duration_seconds_count", stage="serialize")
+    pixels_before = sample("grain_image_pixels_count")
+
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        data = {
+            'image': (io.BytesIO(f.read()), 'y.png'),
+            'params': json.dumps({"adaptive_block_size": 51, "area_opening_min_size_px": 10}),
+        }
+    assert client.post('/api/analyze', data=data, content_type='multipart/form-data').status_code == 200
+
+    assert sample("grain_http_requests_total", status="200", **labels) == requests_before + 1
+    assert sample("grain_stage_duration_seconds_count", stage="motifs") == motifs_before + 1
+    assert sample("grain_stage_duration_seconds_count", stage="serialize") == serialize_before + 1
+    assert sample("grain_image_pixels_count") == pixels_before + 1
+    assert sample("grain_http_request_bytes_count", endpoint="/api/analyze") > 0
+    assert sample("grain_http_requests_in_progress", endpoint="/api/analyze") == 0
+    cache_lookups = sum(
+        sample("grain_stage_cache_lookups_total", stage="preprocess", result=result)
+        for result in ("memory", "disk", "miss")
+    )
+    assert cache_lookups > 0
+
+    client.get('/api/unknown')
+    assert sample("grain_http_requests_total", endpoint="unmatched", method="GET", status="404") > 0
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'grain_stage_duration_seconds_bucket{le="0.005",stage="motifs"}' in response.data
+
+
+def test_metrics_are_aggregated_across_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    record = (
+        "from app.utils import monitoring; "
+        "monitoring.observe_analysis((100, 200), {'preprocess': 0.5}, {'preprocess': 'miss'})"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", record], cwd=BACKEND_DIR, env=env, check=True)
+
+    scrape = (
+        "from flask import Flask; from app.utils import monitoring; "
+        "app = Flask(__name__); monitoring.init_app(app); "
+        "print(app.test_client().get('/metrics').get_data(as_text=True))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", scrape], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    assert 'grain_stage_cache_lookups_total{result="miss",stage="preprocess"} 2.0' in output
+    assert 'grain_stage_duration_seconds_count{stage="preprocess"} 2.0' in output
+    assert 'grain_image_pixels_sum 40000.0' in output
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import cv2
+import pytest
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.processing.pipeline import run_analysis
+from app.schemas.models import AnalysisParameters
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+STD_VORONOI_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_voronoi_standard.png")
+LINEAR_MOTIFS = {"type": "linear", "count": 10}
+
+
+@pytest.fixture(scope="module")
+def standard_image():
+    img = cv2.imread(STD_VORONOI_IMG_PATH)
+    assert img is not None, f"Failed to load image at {STD_VORONOI_IMG_PATH}"
+    return img
+
+
+def _analyze(image, **params):
+    params = AnalysisParameters(**{"motifs": LINEAR_MOTIFS, "area_opening_min_size_px": 100, **params})
+    return run_analysis(image, "standard", params, 1.0, include=("metrics",))
+
+
+def test_each_seed_matches_a_single_analysis(standard_image):
+    """Batched motif sets give the G of separate analyses with those seeds."""
+    mc = _analyze(standard_image, monte_carlo_seeds=10, random_seed=7).monte_carlo
+    assert mc.seeds_used == 10 and len(mc.G_values) == 10 - mc.seeds_without_intersections
+    for k in (0, 4, 9):
+        assert mc.G_values[k] == _analyze(standard_image, random_seed=7 + k).metrics.G
+
+    assert mc.G.n == len(mc.G_values)
+    assert mc.G.G_ci_low < mc.G.G_mean < mc.G.G_ci_high
+    assert not mc.converged and mc.seeds_needed is None
+
+
+def test_stops_early_once_the_target_accuracy_is_reached(standard_image):
+    mc = _analyze(standard_image, monte_carlo_seeds=500, monte_carlo_target_accuracy=0.03).monte_carlo
+    assert mc.converged
+    assert mc.seeds_used < 500
+    assert mc.relative_accuracy <= 0.03
+    assert mc.seeds_needed <= mc.seeds_used + 8
+
+    # A tighter target needs more seeds than were run
+    unreached = _analyze(standard_image, monte_carlo_seeds=8, monte_carlo_target_accuracy=0.001).monte_carlo
+    assert not unreached.converged and unreached.seeds_needed > 8
+
+
+def test_circular_motifs_skip_monte_carlo(standard_image):
+    result = _analyze(standard_image, monte_carlo_seeds=10, motifs={"type": "circular", "count": 3})
+    assert result.monte_carlo is None
+    assert any("Monte Carlo" in warning for warning in result.warnings)
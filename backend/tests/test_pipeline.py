@@ -2,7 +2,6 @@ import os
 import cv2
 import numpy as np
 import pytest
-import networkx as nx
 
 # Add project root to path to allow absolute imports
 import sys
@@ -10,7 +9,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from app.processing.preprocess import preprocess_image
 from app.processing.skeleton import skeletonize_image, estimate_border_width
-from app.processing.graph import build_graph_from_skeleton
+from app.processing.graph import build_graph_from_skeleton, SkeletonGraph
 from app.processing.motifs import generate_motifs
 from app.processing.intersections import detect_and_cluster_intersections
 from app.processing.metrics import compute_final_metrics
@@ -53,7 +52,7 @@ def test_skeleton_graph_build(standard_image):
 
     graph, _ = build_graph_from_skeleton(skeleton)
 
-    assert isinstance(graph, nx.Graph)
+    assert isinstance(graph, SkeletonGraph)
     assert graph.number_of_nodes() > 0
     assert graph.number_of_edges() > 0
 
@@ -63,7 +62,7 @@ def test_skeleton_graph_detects_junctions(y_junction_image):
     skeleton = skeletonize_image(binary_img)
     graph, _ = build_graph_from_skeleton(skeleton)
 
-    degrees = [d for _, d in graph.degree()]
+    degrees = graph.degrees.tolist()
     # We expect at least one node of degree 3 (the junction)
     assert 3 in degrees, f"Failed to find a junction (degree 3 node). Degrees found: {degrees}"
 
@@ -112,3 +111,16 @@ def test_full_pipeline_and_metrics_calculation(standard_image):
     assert metrics.G != 0
     assert "No intersections found" not in " ".join(warnings)
     print(f"Test pipeline successful. Calculated G = {metrics.G:.3f}")
+
+
+def test_linear_motifs_are_clipped_to_the_image():
+    """Lines longer than the image keep the part inside it, not a sliver along the border."""
+    h, w = 300, 400
+    motifs = generate_motifs((h, w), {"type": "linear", "count": 20, "length_px": 2 * w}, seed=0)
+    assert len(motifs) == 20
+    for motif in motifs:
+        coords = np.asarray(motif["geometry"].coords)
+        assert np.all((coords >= -1e-9) & (coords <= np.array([w, h]) + 1e-9))
+        # Every line spans the image from border to border
+        on_border = np.isclose(coords, 0).any(axis=1) | np.isclose(coords, [w, h]).any(axis=1)
+        assert on_border.all()
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+import skimage.filters
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.processing.preprocess import blur, preprocess_image, threshold_surface, binarize_with_surface, to_gray
+from app.processing.tiling import preprocess_image_tiled
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+
+# Largest fraction of pixels a fast backend may classify differently from
+# the skimage reference, after the full preprocessing.
+MAX_DISAGREEMENT = {
+    "opencv_gaussian": 0.0025,
+    "opencv_mean": 0.01,
+    "integral": 0.01,
+}
+
+
+@pytest.fixture(params=[
+    "synthetic_voronoi_standard.png",
+    "synthetic_voronoi_dense.png",
+    "synthetic_voronoi_artifacts.png",
+    "synthetic_y_junction.png",
+])
+def color_image(request):
+    img = cv2.imread(os.path.join(INPUT_DIR, request.param), cv2.IMREAD_COLOR)
+    assert img is not None, f"Failed to load image {request.param}"
+    return img
+
+
+@pytest.mark.parametrize("backend", sorted(MAX_DISAGREEMENT))
+def test_fast_backends_agree_with_skimage(color_image, backend):
+    params = dict(adaptive_offset=10, area_opening_min_size_px=100)
+    reference = preprocess_image(color_image, **params)
+    binary = preprocess_image(color_image, **params, threshold_backend=backend)
+    assert np.mean(binary != reference) <= MAX_DISAGREEMENT[backend]
+
+
+@pytest.mark.parametrize("offset", [10, 0, -3])
+def test_opencv_mean_matches_adaptive_threshold(color_image, offset):
+    blurred = blur(to_gray(color_image), 1.0)
+    expected = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 101, offset)
+    binary = binarize_with_surface(blurred, threshold_surface(blurred, 101, "opencv_mean"), offset, 0)
+    assert np.array_equal(binary, expected)
+
+
+@pytest.mark.parametrize("backend", sorted(MAX_DISAGREEMENT))
+def test_fast_backends_tile_exactly(color_image, backend):
+    params = dict(adaptive_block_size=75, adaptive_offset=10, area_opening_min_size_px=100, threshold_backend=backend)
+    assert np.array_equal(
+        preprocess_image(color_image, **params),
+        preprocess_image_tiled(color_image, **params, tile_size=256)
+    )
+
+
+@pytest.mark.parametrize("block_size", [3, 11, 41])
+def test_integral_surface_is_the_mean_of_the_clipped_block(block_size):
+    image = np.random.default_rng(0).integers(0, 256, (23, 37), dtype=np.uint8)
+    half = block_size // 2
+    expected = np.array([
+        [image[max(r - half, 0):r + half + 1, max(c - half, 0):c + half + 1].mean() for c in range(image.shape[1])]
+        for r in range(image.shape[0])
+    ])
+    np.testing.assert_allclose(threshold_surface(image, block_size, "integral"), expected, rtol=1e-6)
+
+
+def test_skimage_surface_is_the_float64_reference(color_image):
+    blurred = blur(to_gray(color_image), 1.0)
+    surface = threshold_surface(blurred, 51, "skimage")
+    assert surface.dtype == np.float64
+    assert np.array_equal(surface, skimage.filters.threshold_local(blurred, 51, method='gaussian', offset=0))
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        threshold_surface(np.zeros((8, 8), dtype=np.uint8), 3, "nope")
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import preview as preview_api
+from app.api.preview import preview_bp
+from app.processing.preprocess import preprocess_image
+from app.processing.preview import SessionCaches, preview_preprocess
+from app.schemas.models import AnalysisParameters
+from app.utils.preview_sessions import PreviewSessionStore
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+VORONOI_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_voronoi_dense.png")
+
+
+@pytest.fixture
+def image():
+    img = cv2.imread(VORONOI_IMG_PATH)
+    assert img is not None
+    return img
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    caches = SessionCaches(max_bytes=256 * 1024 * 1024, max_sessions=2)
+    monkeypatch.setattr("app.processing.preview.session_caches", caches)
+    return caches
+
+
+@pytest.mark.parametrize("detect_twins", [False, True])
+def test_full_resolution_preview_matches_preprocess(image, detect_twins):
+    params = AnalysisParameters(detect_twins=detect_twins)
+    binary, _, _ = preview_preprocess("session", lambda: image, params)
+    expected = preprocess_image(
+        image, params.gaussian_sigma, params.adaptive_block_size, params.adaptive_offset,
+        params.morph_open_kernel, params.area_opening_min_size_px, params.detect_twins
+    )
+    np.testing.assert_array_equal(binary, expected)
+
+
+def test_offset_change_reuses_cached_intermediates(image):
+    _, first, _ = preview_preprocess("session", lambda: image, AnalysisParameters())
+    assert set(first.values()) == {"miss"}
+
+    _, status, _ = preview_preprocess("session", lambda: image, AnalysisParameters(adaptive_offset=5))
+    assert status == {"gray": "memory", "blur": "memory", "threshold": "memory"}
+
+    _, status, _ = preview_preprocess("session", lambda: image, AnalysisParameters(gaussian_sigma=2.0))
+    assert status == {"gray": "memory", "blur": "miss", "threshold": "miss"}
+
+
+def test_session_caches_are_bounded(image, fresh_caches):
+    _, status, _ = preview_preprocess("a", lambda: image, AnalysisParameters())
+    assert set(status.values()) == {"miss"}
+    preview_preprocess("b", lambda: image, AnalysisParameters())
+    preview_preprocess("c", lambda: image, AnalysisParameters())
+    # "a" was the least recently used of three sessions, with room for two
+    _, status, _ = preview_preprocess("a", lambda: image, AnalysisParameters())
+    assert set(status.values()) == {"miss"}
+    _, status, _ = preview_preprocess("c", lambda: image, AnalysisParameters())
+    assert set(status.values()) == {"memory"}
+
+
+
+def test_max_dim_downscales_preview(image):
+    binary, _, _ = preview_preprocess("session", lambda: image, AnalysisParameters(), max_dim=256)
+    assert max(binary.shape) == 256
+    assert binary.shape[0] / binary.shape[1] == pytest.approx(image.shape[0] / image.shape[1], rel=0.01)
+
+
+def test_session_endpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_api, "preview_sessions", PreviewSessionStore(str(tmp_path), ttl_s=3600))
+    app = Flask(__name__)
+    app.register_blueprint(preview_bp, url_prefix='/api/preview')
+    client = app.test_client()
+
+    with open(VORONOI_IMG_PATH, 'rb') as f:
+        image_bytes = f.read()
+    response = client.post('/api/preview/sessions', data={'image': (io.BytesIO(image_bytes), 'v.png')})
+    assert response.status_code == 201
+    session_id = response.get_json()["session_id"]
+
+    response = client.post(
+        f'/api/preview/sessions/{session_id}/preprocess',
+        data={'params': json.dumps({"adaptive_offset": 4}), 'max_dim': '300'}
+    )
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["preview_image_base64"].startswith("data:image/png;base64,")
+    assert max(result["width"], result["height"]) == 300
+
+    assert client.post('/api/preview/sessions/' + '0' * 64 + '/preprocess').status_code == 404
+    assert client.post('/api/preview/sessions/not-a-session/preprocess').status_code == 404
+    assert client.post(f'/api/preview/sessions/{session_id}/preprocess', data={'max_dim': '0'}).status_code == 400
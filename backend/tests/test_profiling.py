@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import pstats
+import sys
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.api.analysis import analysis_bp
+from app.api.preview import preview_bp
+from app.api.profiles import profiles_bp
+from app.utils import profiling
+from app.utils.profiling import ProfileStore
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+Y_JUNCTION_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_y_junction.png")
+PARAMS = json.dumps({"adaptive_block_size": 51, "area_opening_min_size_px": 10})
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_INTERVAL_S", 0.001)
+    monkeypatch.setattr(profiling, "profile_store", ProfileStore(str(tmp_path)))
+    monkeypatch.setattr("app.api.profiles.profile_store", profiling.profile_store)
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    app.register_blueprint(preview_bp, url_prefix='/api/preview')
+    app.register_blueprint(profiles_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def _post(client, url, **fields):
+    with open(Y_JUNCTION_IMG_PATH, 'rb') as f:
+        data = {'image': (io.BytesIO(f.read()), 'y.png'), 'params': PARAMS, **fields}
+    return client.post(url, data=data, content_type='multipart/form-data')
+
+
+def test_profiled_analysis(client):
+    response = _post(client, '/api/analyze', profile='1')
+    assert response.status_code == 200
+    profile_id = response.get_json()["profile_id"]
+
+    summary = client.get(f'/api/profiles/{profile_id}').get_json()
+    assert summary["endpoint"] == "/api/analyze"
+    stages = [stage["stage"] for stage in summary["stages"]]
+    assert stages[:4] == ["preprocess", "skeleton", "border_width", "graph"]
+    assert all(stage["peak_bytes"] > 0 for stage in summary["stages"])
+    assert summary["peak_bytes"] == max(stage["peak_bytes"] for stage in summary["stages"])
+    functions = summary["top_functions"]
+    assert 0 < len(functions) <= config.PROFILE_TOP_N
+    assert any(row["function"].startswith("run_analysis ") for row in functions)
+    assert functions == sorted(functions, key=lambda row: row["cumtime_s"], reverse=True)
+
+    stacks = client.get(f'/api/profiles/{profile_id}/stacks').get_data(as_text=True)
+    assert summary["samples"] > 0
+    for line in stacks.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+    pstats_path = profiling.profile_store.path(profile_id, "pstats")
+    assert pstats.Stats(pstats_path).total_calls > 0
+    assert client.get(f'/api/profiles/{profile_id}/other').status_code == 404
+    assert client.get('/api/profiles/..').status_code == 404
+
+
+def test_profiled_preview(client):
+    response = _post(client, '/api/preview/preprocess', profile='true')
+    assert response.status_code == 200
+    summary = client.get(f'/api/profiles/{response.get_json()["profile_id"]}').get_json()
+    assert summary["endpoint"] == "/api/preview/preprocess"
+    assert [stage["stage"] for stage in summary["stages"]] == ["request"]
+
+
+def test_profiling_is_opt_in(client, monkeypatch):
+    response = _post(client, '/api/analyze')
+    assert "profile_id" not in response.get_json()
+
+    assert _post(client, '/api/analyze', profile='yes').status_code == 400
+    monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+    response = _post(client, '/api/analyze', profile='1')
+    assert response.status_code == 400
+    assert "disabled" in response.get_json()["error"]
+
+
+def test_one_profile_at_a_time(client):
+    with profiling._active:
+        assert _post(client, '/api/analyze', profile='1').status_code == 409
+    assert _post(client, '/api/analyze', profile='1').status_code == 200
@@ -0,0 +1,237 @@
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import Future
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import reports as reports_api
+from app.api.reports import reports_bp
+from app.schemas.models import AnalysisResult
+from app.utils import report_renderer
+from app.utils.artifact_store import ArtifactStore
+from app.utils.report_store import ReportStore
+from app.utils.result_store import ResultStore
+
+RESULT = {
+    "metrics": {"L_mm": 1.0, "N_int": 10.0, "ell_mm": 0.1, "ell_um": 100.0, "G": 3.6, "N_AE": 100.0},
+    "warnings": [],
+    "timings": {"preprocess_s": 0, "border_width_s": 0, "skeleton_s": 0, "graph_s": 0, "intersections_s": 0, "total_s": 0},
+    "params_used": {},
+}
+
+
+class InlinePool:
+    """Runs submitted renders right away, in this process."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    results = ResultStore(str(tmp_path / "results.sqlite3"), str(tmp_path / "results"), flush_interval_s=0)
+    reports = ReportStore(str(tmp_path / "reports"), max_bytes=0)
+    monkeypatch.setattr(reports_api, "result_store", results)
+    monkeypatch.setattr(reports_api, "report_store", reports)
+    return results, reports
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = InlinePool()
+    monkeypatch.setattr(reports_api, "get_process_pool", lambda name, n: pool)
+    return pool
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_report_store_claims_and_trims(tmp_path):
+    store = ReportStore(str(tmp_path), max_bytes=250, render_timeout_s=60)
+    assert store.claim("a")
+    assert not store.claim("a")
+    assert store.is_pending("a")
+
+    store.fail("a", "boom")
+    store.release("a")
+    assert store.pop_error("a") == "boom"
+    assert store.pop_error("a") is None
+
+    # A retry clears the error of the previous attempt
+    store.fail("a", "boom")
+    assert store.claim("a")
+    assert store.pop_error("a") is None
+    store.release("a")
+
+    # Stale claims of renders that died are taken over
+    assert store.claim("b")
+    old = time.time() - 120
+    os.utime(os.path.join(str(tmp_path), "b.pending"), (old, old))
+    assert not store.is_pending("b")
+    assert store.claim("b")
+
+    for i, key in enumerate(["x", "y", "z"]):
+        store.put(key, b"%" * 100)
+        t = time.time() - 10 + i
+        os.utime(store._file(key, "pdf"), (t, t))
+    store.put("w", b"%" * 100)
+    assert store.path("x") is None and store.path("y") is None
+    assert store.path("z") is not None and store.path("w") is not None
+
+
+def test_report_renders_once_and_is_served_from_cache(client, stores, pool, monkeypatch):
+    results, _ = stores
+    renders = []
+    monkeypatch.setattr(reports_api, "render_report_pdf", lambda result_json: renders.append(result_json) or b"%PDF-1")
+    image_id = str(uuid.uuid4())
+
+    assert client.get(f"/api/reports/{image_id}").status_code == 404
+
+    results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id}), "digest")
+    assert client.get(f"/api/reports/{image_id}").status_code == 202
+    response = client.get(f"/api/reports/{image_id}")
+    assert response.status_code == 200
+    assert response.data == b"%PDF-1"
+    assert response.headers["Content-Type"] == "application/pdf"
+    etag = response.headers["ETag"]
+
+    response = client.get(f"/api/reports/{image_id}")
+    assert response.status_code == 200
+    assert len(renders) == 1 and pool.submitted == 1
+    assert client.get(f"/api/reports/{image_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    # A changed result is a different report
+    results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id, "warnings": ["changed"]}), "digest")
+    assert client.get(f"/api/reports/{image_id}").status_code == 202
+    assert client.get(f"/api/reports/{image_id}").headers["ETag"] != etag
+    assert len(renders) == 2
+
+
+def test_report_is_accepted_while_rendering(client, stores, monkeypatch):
+    results, _ = stores
+    pending = []
+
+    class QueueingPool:
+        def submit(self, fn, *args):
+            pending.append((fn, args))
+            return Future()
+
+    monkeypatch.setattr(reports_api, "get_process_pool", lambda name, n: QueueingPool())
+    monkeypatch.setattr(reports_api, "render_report_pdf", lambda result_json: b"%PDF-1")
+    image_id = str(uuid.uuid4())
+    results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id}), "digest")
+
+    response = client.get(f"/api/reports/{image_id}")
+    assert response.status_code == 202
+    assert response.headers["Retry-After"]
+    # Polling does not queue the report again
+    assert client.get(f"/api/reports/{image_id}").status_code == 202
+    assert len(pending) == 1
+
+    fn, args = pending.pop()
+    fn(*args)
+    assert client.get(f"/api/reports/{image_id}").status_code == 200
+
+
+def test_failed_render_is_reported_then_retried(client, stores, pool, monkeypatch):
+    results, _ = stores
+
+    def broken(result_json):
+        raise RuntimeError("no fonts")
+
+    monkeypatch.setattr(reports_api, "render_report_pdf", broken)
+    image_id = str(uuid.uuid4())
+    results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id}), "digest")
+
+    # The inline pool renders synchronously, so the request only sees it as queued
+    assert client.get(f"/api/reports/{image_id}").status_code == 202
+    response = client.get(f"/api/reports/{image_id}")
+    assert response.status_code == 500
+    assert "no fonts" in response.get_json()["error"]
+
+    monkeypatch.setattr(reports_api, "render_report_pdf", lambda result_json: b"%PDF-1")
+    client.get(f"/api/reports/{image_id}")
+    assert client.get(f"/api/reports/{image_id}").status_code == 200
+
+
+def test_report_fails_when_its_overlays_are_gone(client, stores, pool, tmp_path, monkeypatch):
+    results, reports = stores
+    artifacts = ArtifactStore(str(tmp_path / "artifacts"), "/api/artifacts")
+    monkeypatch.setattr(report_renderer, "artifact_store", artifacts)
+    name = artifacts.put(b"\x89PNG fake", "png")
+    overlays = {key: artifacts.url(name) for key in ("annotated_image_url", "skeleton_image_url", "motifs_image_url")}
+    image_id = str(uuid.uuid4())
+    results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id, "overlays": overlays}), "digest")
+    os.remove(artifacts.path(name))
+
+    assert client.get(f"/api/reports/{image_id}").status_code == 202
+    response = client.get(f"/api/reports/{image_id}")
+    # Not a report without its images, and nothing cached
+    assert response.status_code == 500
+    assert "no longer available" in response.get_json()["error"]
+    assert os.listdir(reports.root) == []
+
+
+def test_reports_only_read_artifacts(client, stores, pool, tmp_path, monkeypatch):
+    """Overlay URLs posted by a client must not reach local files or other hosts."""
+    artifacts = ArtifactStore(str(tmp_path / "artifacts"), "/api/artifacts")
+    monkeypatch.setattr(report_renderer, "artifact_store", artifacts)
+    renders = []
+    monkeypatch.setattr(reports_api, "render_report_pdf", lambda result_json: renders.append(result_json) or b"%PDF-1")
+
+    for url in ("file:///etc/passwd", "http://169.254.169.254/latest/meta-data", "/api/artifacts/../../etc/passwd"):
+        overlays = {key: url for key in ("annotated_image_url", "skeleton_image_url", "motifs_image_url")}
+        response = client.post("/api/report", json={**RESULT, "overlays": overlays})
+        assert response.status_code == 400
+        assert "Overlay URLs" in response.get_json()["error"]
+        with pytest.raises(ValueError):
+            report_renderer._local_image_src(url)
+    assert renders == []
+
+    name = artifacts.put(b"\x89PNG fake", "png")
+    with pytest.raises(ValueError):
+        report_renderer._fetch_artifact("file:///etc/passwd")
+    with pytest.raises(ValueError):
+        report_renderer._fetch_artifact(f"file://{tmp_path}/artifacts/../results.sqlite3")
+    with pytest.raises(ValueError):
+        report_renderer._fetch_artifact("http://localhost/" + name)
+
+
+def test_batch_request_and_legacy_endpoint(client, stores, pool, monkeypatch):
+    results, _ = stores
+    monkeypatch.setattr(reports_api, "render_report_pdf", lambda result_json: b"%PDF-1")
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    for image_id in ids[:2]:
+        results.put(AnalysisResult.model_validate({**RESULT, "image_id": image_id}), "digest")
+
+    assert client.post("/api/reports", json={"image_ids": "x"}).status_code == 400
+    response = client.post("/api/reports", json={"image_ids": ids})
+    reports = response.get_json()["reports"]
+    assert reports[ids[0]] == {"status": "rendering", "url": f"/api/reports/{ids[0]}"}
+    assert reports[ids[2]] == {"status": "not_found"}
+    assert pool.submitted == 2
+
+    response = client.post("/api/reports", json={"image_ids": ids[:2]})
+    assert response.status_code == 200
+    assert {r["status"] for r in response.get_json()["reports"].values()} == {"ready"}
+
+    response = client.post("/api/report", json={**RESULT, "image_id": ids[2]})
+    assert response.status_code == 200
+    assert response.data == b"%PDF-1"
+    assert client.post("/api/report", json={"metrics": {}}).status_code == 400
@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+import time
+import uuid
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import results as results_api
+from app.api.results import results_bp
+from app.schemas.models import AnalysisResult, Overlays
+from app.utils.result_store import ResultStore
+
+
+def make_result(G: float, **params) -> AnalysisResult:
+    return AnalysisResult.model_validate({
+        "metrics": {"L_mm": 1.0, "N_int": 10.0, "ell_mm": 0.1, "ell_um": 100.0, "G": G, "N_AE": 100.0},
+        "warnings": [],
+        "timings": {"preprocess_s": 0, "border_width_s": 0, "skeleton_s": 0, "graph_s": 0, "intersections_s": 0, "total_s": 1.5},
+        "params_used": params,
+    })
+
+
+def make_store(tmp_path, **kwargs) -> ResultStore:
+    return ResultStore(str(tmp_path / "results.sqlite3"), str(tmp_path / "results"), **kwargs)
+
+
+def test_index_writes_are_batched(tmp_path):
+    store = make_store(tmp_path, flush_interval_s=3600, batch_size=1000)
+    result = make_result(5.0)
+    store.put(result, "digest")
+
+    # Another worker or process serves the result right away...
+    result_json, digest = store.get(result.image_id)
+    assert json.loads(result_json)["metrics"]["G"] == 5.0
+    other = make_store(tmp_path)
+    assert other.get(result.image_id) == (result_json, digest)
+    # ...but only lists it once the index rows are flushed
+    assert other.query()[0] == []
+    store.flush()
+    assert other.query()[0][0]["metrics"]["G"] == 5.0
+
+    assert store.get("../results") is None
+    with pytest.raises(ValueError):
+        store.put(make_result(5.0).model_copy(update={"image_id": "../results"}), "digest")
+
+
+def test_full_batches_are_flushed_by_the_writer(tmp_path):
+    store = make_store(tmp_path, flush_interval_s=3600, batch_size=3)
+    results = [make_result(float(i)) for i in range(3)]
+    for result in results:
+        store.put(result, "digest")
+
+    other = make_store(tmp_path)
+    deadline = time.time() + 5
+    while other.get(results[-1].image_id) is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert all(other.get(result.image_id) is not None for result in results)
+
+
+def test_query_filters_and_paginates(tmp_path):
+    store = make_store(tmp_path, flush_interval_s=0)
+    for i in range(7):
+        store.put(make_result(float(i), gaussian_sigma=float(i)), "a" if i % 2 else "b")
+
+    page, cursor = store.query(limit=3)
+    assert [row["metrics"]["G"] for row in page] == [6.0, 5.0, 4.0]
+    assert page[0]["params_used"]["gaussian_sigma"] == 6.0
+    assert page[0]["timings"]["total_s"] == 1.5
+    seen = [row["image_id"] for row in page]
+    while cursor is not None:
+        page, cursor = store.query(limit=3, cursor=cursor)
+        seen += [row["image_id"] for row in page]
+    assert len(seen) == len(set(seen)) == 7
+
+    rows, cursor = store.query(image_digest="a")
+    assert [row["metrics"]["G"] for row in rows] == [5.0, 3.0, 1.0] and cursor is None
+
+    middle = store.query()[0][3]["created_at"]
+    rows, _ = store.query(since=middle)
+    assert [row["metrics"]["G"] for row in rows] == [6.0, 5.0, 4.0, 3.0]
+    rows, _ = store.query(until=middle)
+    assert [row["metrics"]["G"] for row in rows] == [2.0, 1.0, 0.0]
+
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
+
+
+def test_expired_results_are_purged(tmp_path):
+    store = make_store(tmp_path, retention_s=60, flush_interval_s=0)
+    result = make_result(5.0)
+    store.put(result, "digest")
+    with store._connect() as conn:
+        conn.execute("UPDATE results SET created_at = ?", (time.time() - 120,))
+    store.purge_expired()
+    assert store.get(result.image_id) is None
+    assert store.query() == ([], None)
+
+
+def test_stored_results_pin_their_artifacts(tmp_path):
+    store = make_store(tmp_path, retention_s=60, flush_interval_s=3600)
+    names = ["a" * 64 + ".png", "b" * 64 + ".webp"]
+    result = make_result(5.0).model_copy(update={"overlays": Overlays(
+        annotated_image_url=f"/api/artifacts/{names[1]}",
+        skeleton_image_url=f"/api/artifacts/{names[0]}",
+        motifs_image_url=f"/api/artifacts/{names[0]}",
+    )})
+    store.put(result, "digest")
+    store.put(make_result(6.0), "digest")
+    assert store.artifact_names() == set(names)
+    store.flush()
+    assert make_store(tmp_path).artifact_names() == set(names)
+
+    with store._connect() as conn:
+        conn.execute("UPDATE results SET created_at = ? WHERE image_id = ?", (time.time() - 120, result.image_id))
+    store.purge_expired()
+    assert store.artifact_names() == set()
+
+
+def test_results_endpoints(tmp_path, monkeypatch):
+    store = make_store(tmp_path, flush_interval_s=0)
+    monkeypatch.setattr(results_api, "result_store", store)
+    app = Flask(__name__)
+    app.register_blueprint(results_bp, url_prefix='/api')
+    client = app.test_client()
+
+    results = [make_result(float(i)) for i in range(3)]
+    for result in results:
+        store.put(result, "digest")
+
+    response = client.get(f"/api/results/{results[0].image_id}")
+    assert response.status_code == 200
+    assert response.get_json()["metrics"]["G"] == 0.0
+    assert client.get(f"/api/results/{uuid.uuid4()}").status_code == 404
+
+    response = client.get("/api/results", query_string={"image_digest": "digest", "limit": 2})
+    data = response.get_json()
+    assert [row["metrics"]["G"] for row in data["results"]] == [2.0, 1.0]
+    data = client.get("/api/results", query_string={"limit": 2, "cursor": data["next_cursor"]}).get_json()
+    assert [row["metrics"]["G"] for row in data["results"]] == [0.0] and data["next_cursor"] is None
+
+    assert len(client.get("/api/results", query_string={"since": "2000-01-01"}).get_json()["results"]) == 3
+    assert client.get("/api/results", query_string={"until": "2000-01-01T00:00:00+00:00"}).get_json()["results"] == []
+    assert client.get("/api/results", query_string={"since": "yesterday"}).status_code == 400
+    assert client.get("/api/results", query_string={"limit": 0}).status_code == 400
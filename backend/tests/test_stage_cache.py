@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.schemas.models import AnalysisParameters
+from app.utils.stage_cache import StageCache, stage_key
+
+
+def test_stage_keys_only_depend_on_stage_parameters():
+    """Downstream-only parameters must not invalidate upstream stages."""
+    base = AnalysisParameters()
+    tuned = AnalysisParameters(epsilon_factor=2.0, norm_profile="Circular", skeleton_prune_ratio=0.8)
+
+    assert stage_key("preprocess", "digest", base) == stage_key("preprocess", "digest", tuned)
+    assert stage_key("skeleton", "up", base) == stage_key("skeleton", "up", tuned)
+    assert stage_key("graph", "up", base) != stage_key("graph", "up", tuned)
+    assert stage_key("preprocess", "digest", base) != stage_key("preprocess", "other", base)
+    assert stage_key("preprocess", "digest", base) != stage_key(
+        "preprocess", "digest", AnalysisParameters(gaussian_sigma=2.0)
+    )
+
+
+def test_memory_tier_is_size_bounded_lru():
+    """Least recently used entries are evicted once the byte budget is exceeded."""
+    cache = StageCache(max_bytes=3000)
+    for key in ("a", "b", "c"):
+        cache.put(key, np.zeros(1000, dtype=np.uint8))
+
+    # Touch "a" so that "b" becomes the least recently used entry
+    assert cache.get("a")[0] == "memory"
+    cache.put("d", np.zeros(1000, dtype=np.uint8))
+
+    assert cache.get("b") == (None, None)
+    assert cache.get("a")[0] == "memory"
+    assert cache.get("d")[0] == "memory"
+
+
+def test_get_or_compute_reports_hits_and_misses():
+    cache = StageCache(max_bytes=1024 * 1024)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.ones(10)
+
+    _, status = cache.get_or_compute("key", compute)
+    assert status == "miss"
+    value, status = cache.get_or_compute("key", compute)
+    assert status == "memory"
+    assert len(calls) == 1
+    assert np.array_equal(value, np.ones(10))
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    """A second cache (another worker) pointing at the same directory reuses entries."""
+    writer = StageCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path))
+    reader = StageCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path))
+
+    writer.put("key", np.arange(5))
+    tier, value = reader.get("key")
+
+    assert tier == "disk"
+    assert np.array_equal(value, np.arange(5))
+    # Promoted into the reader's memory tier
+    assert reader.get("key")[0] == "memory"
+
+
+class Unpicklable:
+    def __reduce__(self):
+        raise TypeError("cannot pickle this stage output")
+
+
+@pytest.mark.parametrize("value", [Unpicklable(), lambda: None])
+def test_disk_write_failures_do_not_fail_the_stage(tmp_path, value):
+    """A stage output that cannot be pickled is still returned, and leaves no file behind."""
+    cache = StageCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path))
+    result, status = cache.get_or_compute("key", lambda: value)
+    assert result is value and status == "miss"
+    assert [name for _, _, names in os.walk(tmp_path) for name in names] == []
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    cache = StageCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=3000)
+    for i in range(5):
+        cache.put(f"key{i}", np.zeros(1000, dtype=np.uint8))
+
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(tmp_path) for name in names
+    )
+    assert total <= 3000
+    assert cache.get("key4")[0] == "disk"
+
+
+def test_disk_trims_are_throttled_and_reclaim_orphaned_temporary_files(tmp_path, monkeypatch):
+    cache = StageCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=100_000)
+    trims = []
+    trim_disk = cache._trim_disk
+    monkeypatch.setattr(cache, "_trim_disk", lambda: trims.append(1) or trim_disk())
+
+    # Small writes do not walk the tier...
+    for i in range(3):
+        cache.put(f"small{i}", np.zeros(100, dtype=np.uint8))
+    assert trims == []
+
+    orphan = tmp_path / "ab" / "orphan.tmp"
+    orphan.parent.mkdir(exist_ok=True)
+    orphan.write_bytes(b"partial")
+    old = time.time() - 3600
+    os.utime(orphan, (old, old))
+    in_progress = tmp_path / "ab" / "in_progress.tmp"
+    in_progress.write_bytes(b"partial")
+
+    # ...until enough has been written since the last trim
+    cache.put("large", np.zeros(10_000, dtype=np.uint8))
+    assert trims == [1]
+    assert not orphan.exists()
+    assert in_progress.exists()
@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.api.sweep import sweep_bp
+from app.processing import intersections, pipeline
+from app.processing.pipeline import run_analysis
+from app.schemas.models import AnalysisParameters
+from app.utils.image_utils import read_image_from_bytes
+from app.utils.stage_cache import StageCache, image_digest
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+STANDARD_IMG_PATH = os.path.join(INPUT_DIR, "synthetic_voronoi_standard.png")
+BASE_PARAMS = {"area_opening_min_size_px": 100}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(sweep_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.fixture
+def image_bytes():
+    with open(STANDARD_IMG_PATH, 'rb') as f:
+        return f.read()
+
+
+def _post_sweep(client, image_bytes, grid):
+    data = {
+        'image': (io.BytesIO(image_bytes), 'standard.png'),
+        'params': json.dumps(BASE_PARAMS),
+        'pixel_size_um': '1.0',
+        'grid': json.dumps(grid),
+    }
+    return client.post('/api/sweep', data=data, content_type='multipart/form-data')
+
+
+def test_sweep_shares_upstream_stages_and_matches_analyze(client, image_bytes, monkeypatch):
+    monkeypatch.setattr(pipeline, "stage_cache", StageCache(max_bytes=256 * 1024 * 1024))
+    index_builds = []
+    build_index = pipeline.SegmentIndex
+
+    def counting_index(*args):
+        index_builds.append(1)
+        return build_index(*args)
+
+    monkeypatch.setattr(pipeline, "SegmentIndex", counting_index)
+    monkeypatch.setattr(intersections, "SegmentIndex", counting_index)
+
+    grid = {"adaptive_offset": [8, 10], "skeleton_prune_ratio": [0.3, 0.8], "epsilon_factor": [0.5, 1.5]}
+    response = _post_sweep(client, image_bytes, grid)
+    assert response.status_code == 200
+    table = response.get_json()
+
+    assert table["columns"][:3] == list(grid)
+    assert len(table["rows"]) == 8 and not table["errors"]
+    # Once per distinct upstream setting, not once per grid point
+    assert table["stage_runs"] == {"preprocess": 2, "skeleton": 2, "graph": 4}
+    assert len(index_builds) == 4
+    # Cached stages are not run again
+    assert _post_sweep(client, image_bytes, grid).get_json()["stage_runs"] == {"preprocess": 0, "skeleton": 0, "graph": 0}
+
+    image = read_image_from_bytes(image_bytes)
+    G_column = table["columns"].index("G")
+    for row in table["rows"][::3]:
+        params = AnalysisParameters(**BASE_PARAMS, **dict(zip(grid, row)))
+        result = run_analysis(image, image_digest(image_bytes), params, 1.0, include=("metrics",))
+        assert row[G_column] == result.metrics.G
+
+
+def test_sweep_rejects_invalid_grids(client, image_bytes, monkeypatch):
+    assert _post_sweep(client, image_bytes, {"no_such_parameter": [1]}).status_code == 400
+    assert _post_sweep(client, image_bytes, {"epsilon_factor": []}).status_code == 400
+    assert _post_sweep(client, image_bytes, {}).status_code == 400
+
+    monkeypatch.setattr(config, "SWEEP_MAX_POINTS", 3)
+    assert _post_sweep(client, image_bytes, {"epsilon_factor": [0.5, 1.0, 1.5, 2.0]}).status_code == 400
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import config
+from app.processing.pipeline import _tiling
+from app.processing.preprocess import preprocess_image
+from app.processing.skeleton import skeletonize_image, estimate_border_width
+from app.processing.tiling import (
+    iter_tiles,
+    preprocess_image_tiled,
+    skeletonize_image_tiled,
+    estimate_border_width_tiled,
+)
+from app.schemas.models import AnalysisParameters
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), '../../examples/input')
+
+
+@pytest.fixture(params=["synthetic_voronoi_standard.png", "synthetic_voronoi_artifacts.png"])
+def color_image(request):
+    img = cv2.imread(os.path.join(INPUT_DIR, request.param), cv2.IMREAD_COLOR)
+    assert img is not None, f"Failed to load image {request.param}"
+    return img
+
+
+def test_tiles_cover_the_image_once():
+    coverage = np.zeros((500, 700), dtype=int)
+    for rows, cols in iter_tiles(coverage.shape, 256):
+        coverage[rows, cols] += 1
+    assert np.all(coverage == 1)
+
+
+@pytest.mark.parametrize("tile_size,workers", [(256, 1), (300, 4)])
+def test_tiled_stages_match_full_frame(color_image, tile_size, workers):
+    """Halo-overlapped tiles must reproduce the untiled stages exactly."""
+    params = dict(gaussian_sigma=1.5, adaptive_block_size=75, adaptive_offset=10, morph_open_kernel=3,
+                  area_opening_min_size_px=100)
+    binary = preprocess_image(color_image, **params)
+    binary_tiled = preprocess_image_tiled(color_image, **params, tile_size=tile_size, workers=workers)
+    assert np.array_equal(binary, binary_tiled)
+
+    skeleton = skeletonize_image(binary)
+    skeleton_tiled = skeletonize_image_tiled(binary, tile_size=tile_size, workers=workers)
+    assert np.array_equal(skeleton, skeleton_tiled)
+
+    assert estimate_border_width(binary, skeleton) == estimate_border_width_tiled(
+        binary, skeleton, tile_size=tile_size, workers=workers
+    )
+
+
+def test_tiling_parameters_are_bounded(monkeypatch):
+    """Tiles must be wider than their halo, and tile threads fit the CPU share."""
+    for tile_size in (-1, 1, config.TILE_MIN_SIZE - 1):
+        with pytest.raises(ValueError, match="tile_size"):
+            AnalysisParameters(tile_size=tile_size)
+    # The halo of a large threshold block exceeds the minimum tile size
+    with pytest.raises(ValueError, match="tile_size"):
+        AnalysisParameters(tile_size=config.TILE_MIN_SIZE, adaptive_block_size=801)
+    with pytest.raises(ValueError, match="tile_workers"):
+        AnalysisParameters(tile_workers=0)
+
+    monkeypatch.setattr(config, "CPU_SHARE", 2)
+    params = AnalysisParameters(tile_size=config.TILE_MIN_SIZE, tile_workers=10000)
+    assert _tiling(params, (4000, 4000)) == {"tile_size": config.TILE_MIN_SIZE, "workers": 2}
@@ -32,6 +32,7 @@ ANALYSIS_RESULT=$(curl -s -X POST \
   -F "image=@./examples/input/synthetic_voronoi_standard.png" \
   -F "pixel_size_um=1.0" \
   -F "params={}" \
+  -F "include=metrics,intersections,overlays" \
   http://localhost:8050/api/analyze)
 
 if [ -z "$ANALYSIS_RESULT" ] || [[ "$ANALYSIS_RESULT" == *"error"* ]]; then
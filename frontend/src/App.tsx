@@ -27,8 +27,8 @@ type AnalysisResult = {
   edges_stats: { edges: any[] };
   motifs: any[];
   debug_overlays?: {
-    binary_image_base64: string;
-    skeleton_image_base64: string;
+    binary_image_url: string;
+    skeleton_image_url: string;
   };
   debug_stats?: {
     nodes_before_pruning: number;
@@ -56,6 +56,8 @@ function MainApp() {
   const [analysisResult, setAnalysisResult] = useState<AnalysisResult>(null);
   const [analysisError, setAnalysisError] = useState<string | null>(null);
   const [previewImage, setPreviewImage] = useState<string | null>(null);
+  // The backend preview session of the selected image
+  const [previewSessionId, setPreviewSessionId] = useState<string | null>(null);
 
   const analysisMutation = useMutation({
     mutationFn: () => {
@@ -79,9 +81,10 @@ function MainApp() {
     mutationFn: () => {
       if (!imageFile) throw new Error("Please select an image to preview.");
       setAnalysisError(null);
-      return getPreprocessingPreview(imageFile, params);
+      return getPreprocessingPreview(imageFile, previewSessionId, params);
     },
     onSuccess: (data) => {
+      setPreviewSessionId(data.session_id);
       // The backend already returns the full data URI string
       setPreviewImage(data.preview_image_base64);
     },
@@ -93,6 +96,7 @@ function MainApp() {
 
   const handleFileSelect = (file: File | null) => {
     setImageFile(file);
+    setPreviewSessionId(null);
     setAnalysisResult(null);
     setAnalysisError(null);
     setPreviewImage(null);
@@ -101,7 +105,7 @@ function MainApp() {
   const reportMutation = useMutation({
     mutationFn: () => {
       if (!analysisResult) throw new Error("No analysis result to report.");
-      return getPdfReport(analysisResult);
+      return getPdfReport(analysisResult.image_id);
     },
     onSuccess: (data) => {
       const url = window.URL.createObjectURL(new Blob([data]));
@@ -2,10 +2,10 @@ import React from 'react';
 
 // Define the types for the debug data props
 interface DebugOverlays {
-    binary_image_base64: string;
-    skeleton_image_base64: string;
-    pruned_graph_image_base64: string;
-    motifs_image_base64: string;
+    binary_image_url: string;
+    skeleton_image_url: string;
+    pruned_graph_image_url: string;
+    motifs_image_url: string;
 }
 
 interface DebugStats {
@@ -50,7 +50,7 @@ const DebugPanel: React.FC<DebugPanelProps> = ({ debugOverlays, debugStats }) =>
                     <div>
                         <h3 className="text-md font-medium text-center mb-2">1. Preprocessing Result</h3>
                         <img
-                            src={debugOverlays.binary_image_base64}
+                            src={debugOverlays.binary_image_url}
                             alt="Preprocessing Result"
                             className="w-full h-auto border rounded-md"
                         />
@@ -58,7 +58,7 @@ const DebugPanel: React.FC<DebugPanelProps> = ({ debugOverlays, debugStats }) =>
                     <div>
                         <h3 className="text-md font-medium text-center mb-2">2. Raw Skeleton</h3>
                         <img
-                            src={debugOverlays.skeleton_image_base64}
+                            src={debugOverlays.skeleton_image_url}
                             alt="Raw Skeleton"
                             className="w-full h-auto border rounded-md"
                         />
@@ -66,7 +66,7 @@ const DebugPanel: React.FC<DebugPanelProps> = ({ debugOverlays, debugStats }) =>
                     <div>
                         <h3 className="text-md font-medium text-center mb-2">3. Final Graph</h3>
                         <img
-                            src={debugOverlays.pruned_graph_image_base64}
+                            src={debugOverlays.pruned_graph_image_url}
                             alt="Final Pruned Graph"
                             className="w-full h-auto border rounded-md"
                         />
@@ -74,7 +74,7 @@ const DebugPanel: React.FC<DebugPanelProps> = ({ debugOverlays, debugStats }) =>
                     <div>
                         <h3 className="text-md font-medium text-center mb-2">4. Generated Motifs</h3>
                         <img
-                            src={debugOverlays.motifs_image_base64}
+                            src={debugOverlays.motifs_image_url}
                             alt="Generated Motifs"
                             className="w-full h-auto border rounded-md"
                         />
@@ -1,21 +1,30 @@
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { Button } from "@/components/ui/button"; // Button exists, so I can keep it.
-import { fetchLogs } from "@/lib/api";
+import { fetchLog, fetchLogs } from "@/lib/api";
+
+// How often followed logs are polled for new lines.
+const FOLLOW_INTERVAL_MS = 2000;
+// Followed logs keep at most this many characters each.
+const MAX_LOG_CHARS = 200_000;
+
+const formatLogs = (logsData: Record<string, string>) =>
+  Object.entries(logsData)
+    .map(([fileName, content]) => `--- ${fileName} ---\n\n${content}`)
+    .join("\n\n\n");
 
 export const LogsPanel = () => {
-  const [logs, setLogs] = useState<string | null>(null);
+  const [logs, setLogs] = useState<Record<string, string> | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [isFollowing, setIsFollowing] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const offsets = useRef<Record<string, number>>({});
+  const fileIds = useRef<Record<string, string>>({});
 
   const handleFetchLogs = async () => {
     setIsLoading(true);
     setError(null);
     try {
-      const logsData = await fetchLogs();
-      const formattedLogs = Object.entries(logsData)
-        .map(([fileName, content]) => `--- ${fileName} ---\n\n${content}`)
-        .join("\n\n\n");
-      setLogs(formattedLogs);
+      setLogs(await fetchLogs());
     } catch (err) {
       setError(err instanceof Error ? err.message : "An unknown error occurred");
       setLogs(null);
@@ -24,6 +33,44 @@ export const LogsPanel = () => {
     }
   };
 
+  // While following, only the lines written since the last poll are fetched.
+  useEffect(() => {
+    if (!isFollowing || logs === null) return;
+    let cancelled = false;
+    const names = Object.keys(logs);
+
+    const poll = async () => {
+      const chunks = await Promise.all(
+        names.map((name) => fetchLog(name, offsets.current[name], fileIds.current[name]).catch(() => null))
+      );
+      if (cancelled) return;
+      setLogs((previous) => {
+        const next = { ...(previous ?? {}) };
+        chunks.forEach((chunk, i) => {
+          if (!chunk) return;
+          const name = names[i];
+          const firstPoll = offsets.current[name] === undefined;
+          offsets.current[name] = chunk.offset;
+          fileIds.current[name] = chunk.file_id;
+          const content = firstPoll || chunk.reset ? chunk.content : (next[name] ?? "") + chunk.content;
+          next[name] = content.slice(-MAX_LOG_CHARS);
+        });
+        return next;
+      });
+    };
+
+    offsets.current = {};
+    fileIds.current = {};
+    poll();
+    const timer = window.setInterval(poll, FOLLOW_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      window.clearInterval(timer);
+    };
+    // Restart only when following is toggled, not on every new line
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [isFollowing, logs === null]);
+
   return (
     <div className="p-4 border rounded-lg bg-card text-card-foreground shadow-sm">
       <div className="flex flex-col space-y-1.5 p-6">
@@ -34,11 +81,16 @@ export const LogsPanel = () => {
           <Button onClick={handleFetchLogs} disabled={isLoading}>
             {isLoading ? "Loading..." : "Fetch Logs"}
           </Button>
+          {logs !== null && (
+            <Button variant="outline" onClick={() => setIsFollowing((following) => !following)}>
+              {isFollowing ? "Stop Following" : "Follow Logs"}
+            </Button>
+          )}
           {error && <p className="text-red-500">{error}</p>}
           {logs !== null && (
             <textarea
               readOnly
-              value={logs}
+              value={formatLogs(logs)}
               className="mt-2 flex h-96 w-full rounded-md border border-input bg-background px-3 py-2 text-sm ring-offset-background placeholder:text-muted-foreground focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-ring focus-visible:ring-offset-2 disabled:cursor-not-allowed disabled:opacity-50 font-mono text-xs"
               placeholder="Logs will appear here..."
             />
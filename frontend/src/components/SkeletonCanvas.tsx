@@ -17,6 +17,8 @@ interface Motif {
     type: string;
     geometry: { coordinates: [number, number][] }; // Simplified for rendering
     length_px: number;
+    center?: [number, number]; // Circular motifs only
+    radius?: number;
 }
 
 interface SkeletonData {
@@ -148,7 +150,11 @@ const SkeletonCanvas: React.FC<SkeletonCanvasProps> = ({ sourceImage, previewIma
 
                                 <Layer visible={layerVisibility.motifs}>
                                     {analysisResult?.motifs.map((motif, i) => (
-                                        <Line key={`motif-${i}`} points={motif.geometry.coordinates.flat()} stroke="blue" strokeWidth={2 / stageScale} />
+                                        motif.center && motif.radius !== undefined ? (
+                                            <Circle key={`motif-${i}`} x={motif.center[0]} y={motif.center[1]} radius={motif.radius} stroke="blue" strokeWidth={2 / stageScale} />
+                                        ) : (
+                                            <Line key={`motif-${i}`} points={motif.geometry.coordinates.flat()} stroke="blue" strokeWidth={2 / stageScale} />
+                                        )
                                     ))}
                                 </Layer>
 
@@ -13,6 +13,11 @@ const apiClient = axios.create({
   baseURL: API_BASE_URL,
 });
 
+// The result sections the UI renders: the canvas draws the edges, motifs and
+// intersections, the debug panel shows the debug images and stats, and the
+// PDF report embeds the annotated overlay. The backend skips everything else.
+const UI_RESULT_SECTIONS = ['metrics', 'intersections', 'motifs', 'edges', 'overlays', 'debug'];
+
 /**
  * Uploads an image and parameters to the backend for analysis.
  * @param imageFile The image file to analyze.
@@ -29,6 +34,7 @@ export const analyzeImage = async (
   formData.append('image', imageFile);
   formData.append('params', JSON.stringify(params));
   formData.append('pixel_size_um', pixelSizeUm.toString());
+  formData.append('include', UI_RESULT_SECTIONS.join(','));
 
   try {
     const response = await apiClient.post('/analyze', formData, {
@@ -66,17 +72,52 @@ export const fetchLogs = async (): Promise<Record<string, string>> => {
   }
 };
 
+export interface LogChunk {
+  name: string;
+  content: string;
+  offset: number; // Pass as afterOffset to get what is written next
+  file_id: string; // Pass as fileId with it, to notice a replaced log
+  reset: boolean; // The log was truncated or replaced; content starts over
+}
+
 /**
- * Requests a PDF report for a given analysis result.
- * @param analysisResult The JSON result from a previous analysis.
+ * Fetches one log file: its last lines, or with afterOffset only the lines
+ * written since, to follow it.
+ * @param name The log name, a key of the fetchLogs result.
+ * @param afterOffset The offset returned by the previous call.
+ * @param fileId The file_id returned by the previous call.
+ */
+export const fetchLog = async (name: string, afterOffset?: number, fileId?: string): Promise<LogChunk> => {
+  try {
+    const params = afterOffset === undefined ? {} : { after_offset: afterOffset, file_id: fileId };
+    const response = await apiClient.get(`/logs/${name}`, { params });
+    return response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response) {
+      throw new Error(error.response.data.error || 'An unknown error occurred while fetching logs.');
+    }
+    throw new Error('An unexpected error occurred while fetching logs.');
+  }
+};
+
+/**
+ * Requests the PDF report of a previous analysis, stored by the backend.
+ * @param imageId The image_id of the analysis result.
  * @returns A blob containing the PDF file.
  */
-export const getPdfReport = async (analysisResult: any) => {
+export const getPdfReport = async (imageId: string) => {
     try {
-        const response = await apiClient.post('/report', analysisResult, {
-            responseType: 'blob', // Important: we expect a binary file back
-        });
-        return response.data;
+        // The report renders in the background; poll until the PDF is ready
+        for (;;) {
+            const response = await apiClient.get(`/reports/${imageId}`, {
+                responseType: 'blob', // Important: we expect a binary file back
+            });
+            if (response.status !== 202) {
+                return response.data;
+            }
+            const retryAfterS = Number(response.headers['retry-after']) || 1;
+            await new Promise((resolve) => setTimeout(resolve, retryAfterS * 1000));
+        }
     } catch (error) {
         if (axios.isAxiosError(error) && error.response) {
             // Since the response is a blob, we need to parse it to get the error message
@@ -88,31 +129,76 @@ export const getPdfReport = async (analysisResult: any) => {
     }
 }
 
+/**
+ * Uploads an image once as a preview session. Previews of the session only
+ * send parameters, and the backend reuses the intermediates of earlier ones.
+ * @param imageFile The image file to preview.
+ * @returns The id of the new session.
+ */
+export const createPreviewSession = async (imageFile: File): Promise<string> => {
+  const formData = new FormData();
+  formData.append('image', imageFile);
+
+  try {
+    const response = await apiClient.post('/preview/sessions', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data.session_id;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response) {
+      throw new Error(error.response.data.error || 'An unknown error occurred during preview.');
+    }
+    throw new Error('An unexpected error occurred.');
+  }
+};
+
 /**
  * Requests a preview of the preprocessing step from the backend.
+ * A new session is created when `sessionId` is null or has expired.
  * @param imageFile The image file to preprocess.
+ * @param sessionId The preview session of the image, if any.
  * @param params The preprocessing parameters.
- * @returns An object containing the base64-encoded preview image.
+ * @param maxDim Optional downscaling bound of the preview, in pixels.
+ * @returns An object containing the base64-encoded preview image and the session id.
  */
 export const getPreprocessingPreview = async (
   imageFile: File,
-  params: AnalysisParams
+  sessionId: string | null,
+  params: AnalysisParams,
+  maxDim?: number
 ) => {
-  const formData = new FormData();
-  formData.append('image', imageFile);
-  formData.append('params', JSON.stringify(params));
-
-  try {
-    const response = await apiClient.post('/preview/preprocess', formData, {
+  const requestPreview = (id: string) => {
+    const formData = new FormData();
+    formData.append('params', JSON.stringify(params));
+    if (maxDim) {
+      formData.append('max_dim', maxDim.toString());
+    }
+    return apiClient.post(`/preview/sessions/${id}/preprocess`, formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
     });
-    return response.data; // Should be { preview_image_base64: string }
+  };
+
+  try {
+    let id = sessionId ?? await createPreviewSession(imageFile);
+    let response;
+    try {
+      response = await requestPreview(id);
+    } catch (error) {
+      // Sessions expire on the backend; upload the image again once.
+      if (!(axios.isAxiosError(error) && error.response?.status === 404)) throw error;
+      id = await createPreviewSession(imageFile);
+      response = await requestPreview(id);
+    }
+    return response.data; // { session_id, preview_image_base64, width, height, cache, timings }
   } catch (error) {
     if (axios.isAxiosError(error) && error.response) {
       throw new Error(error.response.data.error || 'An unknown error occurred during preview.');
     }
+    if (error instanceof Error) throw error;
     throw new Error('An unexpected error occurred.');
   }
 };
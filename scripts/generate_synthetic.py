@@ -1,7 +1,26 @@
+"""
+Generates synthetic microstructure images.
+
+Without arguments, writes the fixture images of the test suite to
+examples/input/. The `corpus` command generates any number of Voronoi
+microstructures in parallel, for load tests and benchmarks, each with a
+JSON sidecar holding its parameters and ground-truth mean intercept length:
+
+    python scripts/generate_synthetic.py corpus /data/corpus --count 2000 \\
+        --sizes 2048 4096 8192 --grains 200 1000 5000 --twin-fraction 0.3 \\
+        --noise 0.05 --gradient 0.3 --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
 import numpy as np
 from scipy.spatial import Voronoi
 from PIL import Image, ImageDraw
-import os
 
 def create_voronoi_image(points, width, height, line_width=1):
     """
@@ -27,37 +46,272 @@ def create_voronoi_image(points, width, height, line_width=1):
 
     return np.array(img)
 
-def add_scratches(image_array, num_scratches=2, max_width=3):
+def add_scratches(image_array, num_scratches=2, max_width=3, rng=np.random):
     """Adds linear scratches to the image."""
     img = Image.fromarray(image_array)
     draw = ImageDraw.Draw(img)
-    height, width = img.size
+    width, height = img.size
 
     for _ in range(num_scratches):
-        x1, y1 = np.random.randint(0, width), np.random.randint(0, height)
-        x2, y2 = np.random.randint(0, width), np.random.randint(0, height)
-        line_width = np.random.randint(1, max_width + 1)
+        x1, y1 = rng.randint(0, width), rng.randint(0, height)
+        x2, y2 = rng.randint(0, width), rng.randint(0, height)
+        line_width = rng.randint(1, max_width + 1)
         draw.line([(x1, y1), (x2, y2)], fill=0, width=line_width)
 
     return np.array(img)
 
-def add_blobs(image_array, num_blobs=5, max_radius=20):
+def add_blobs(image_array, num_blobs=5, max_radius=20, rng=np.random):
     """Adds circular blobs to the image."""
     img = Image.fromarray(image_array)
     draw = ImageDraw.Draw(img)
-    height, width = img.size
+    width, height = img.size
 
     for _ in range(num_blobs):
-        cx, cy = np.random.randint(0, width), np.random.randint(0, height)
-        radius = np.random.randint(5, max_radius)
+        cx, cy = rng.randint(0, width), rng.randint(0, height)
+        radius = rng.randint(5, max_radius)
         draw.ellipse([(cx-radius, cy-radius), (cx+radius, cy+radius)], fill=0)
 
     return np.array(img)
 
 
-def main():
-    """Generates and saves a set of synthetic microstructure images."""
-    output_dir = os.path.join(os.path.dirname(__file__), '..', 'examples', 'input')
+# --- Corpus ---
+
+# Lines are drawn with this many fractional bits (cv2's `shift`).
+_SUBPIXEL_BITS = 4
+# Noise and illumination are applied this many rows at a time, to bound
+# the memory of 8k images.
+_BAND_ROWS = 1024
+
+
+def voronoi_microstructure(width, height, grains, rng):
+    """
+    Returns the Voronoi tessellation of `grains` random seeds in the image:
+    the seeds, and the grain boundaries as an (n, 2, 2) array of segments.
+
+    Each seed is mirrored across the four image edges, so that the cells
+    end exactly at the image frame: every ridge between two seeds then
+    lies inside the image, and the ridges between a seed and a mirror lie
+    on the frame, which is no grain boundary.
+    """
+    seeds = rng.random((grains, 2)) * [width, height]
+    x, y = seeds[:, 0], seeds[:, 1]
+    mirrors = [
+        np.column_stack([-x, y]),
+        np.column_stack([2 * width - x, y]),
+        np.column_stack([x, -y]),
+        np.column_stack([x, 2 * height - y]),
+    ]
+    vor = Voronoi(np.concatenate([seeds, *mirrors]))
+    ridge_points = vor.ridge_points
+    ridge_vertices = np.asarray(vor.ridge_vertices)
+    segments = vor.vertices[ridge_vertices]
+    return seeds, segments, ridge_points
+
+
+def twin_lines(seeds, segments, ridge_points, twinned, rng):
+    """
+    Returns a straight twin boundary, as an (n, 2, 2) array of segments,
+    across each grain of `twinned`: the chord of the cell through its seed
+    at a random angle.
+    """
+    angles = rng.random(len(twinned)) * np.pi
+    directions = np.column_stack([np.cos(angles), np.sin(angles)])
+    # Hits of each twin line with the ridges of its cell (frame included)
+    line_of_grain = np.full(ridge_points.max() + 1, -1)
+    line_of_grain[twinned] = np.arange(len(twinned))
+    lines, ridges = [], []
+    for side in (0, 1):
+        owner = line_of_grain[ridge_points[:, side]]
+        selected = np.flatnonzero(owner >= 0)
+        lines.append(owner[selected])
+        ridges.append(selected)
+    lines, ridges = np.concatenate(lines), np.concatenate(ridges)
+
+    origin, direction = seeds[twinned][lines], directions[lines]
+    start = segments[ridges, 0]
+    edge = segments[ridges, 1] - start
+    offset = start - origin
+    denominator = direction[:, 0] * edge[:, 1] - direction[:, 1] * edge[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (offset[:, 0] * edge[:, 1] - offset[:, 1] * edge[:, 0]) / denominator
+        u = (offset[:, 0] * direction[:, 1] - offset[:, 1] * direction[:, 0]) / denominator
+    hit = (denominator != 0) & (u >= 0) & (u <= 1)
+
+    # The seed is inside its convex cell: the nearest hit on either side
+    # ends the chord.
+    forward = np.full(len(twinned), np.inf)
+    backward = np.full(len(twinned), -np.inf)
+    np.minimum.at(forward, lines[hit & (t > 0)], t[hit & (t > 0)])
+    np.maximum.at(backward, lines[hit & (t <= 0)], t[hit & (t <= 0)])
+    origin = seeds[twinned]
+    return np.stack([
+        origin + backward[:, None] * directions,
+        origin + forward[:, None] * directions,
+    ], axis=1)
+
+
+def _draw_segments(image, segments, thickness):
+    points = np.round(segments * (1 << _SUBPIXEL_BITS)).astype(np.int32)
+    cv2.polylines(image, list(points), False, 0, thickness, cv2.LINE_8, _SUBPIXEL_BITS)
+
+
+def _apply_illumination_and_noise(image, gradient, noise, rng):
+    """
+    Darkens the image linearly by up to `gradient` (a fraction) along a
+    random direction and adds Gaussian noise of standard deviation `noise`
+    (a fraction of the full scale).
+    """
+    height, width = image.shape
+    angle = rng.random() * 2 * np.pi
+    ramp_x = np.cos(angle) * np.arange(width, dtype=np.float32)
+    # Normalized so that the illumination spans [1 - gradient, 1]
+    span = abs(np.cos(angle)) * (width - 1) + abs(np.sin(angle)) * (height - 1)
+    low = min(0.0, np.cos(angle) * (width - 1)) + min(0.0, np.sin(angle) * (height - 1))
+    for top in range(0, height, _BAND_ROWS):
+        rows = np.arange(top, min(top + _BAND_ROWS, height), dtype=np.float32)
+        band = image[top:top + len(rows)].astype(np.float32)
+        if gradient:
+            position = (ramp_x[None, :] + np.sin(angle) * rows[:, None] - low) / max(span, 1)
+            band *= 1 - gradient * position
+        if noise:
+            band += rng.normal(0, noise * 255, band.shape).astype(np.float32)
+        image[top:top + len(rows)] = np.clip(band, 0, 255).round()
+    return image
+
+
+def ground_truth(width, height, boundary_length_px, twin_length_px, pixel_size_um):
+    """
+    The exact mean intercept length of the tessellation. Random lines cross
+    boundaries of total length B in an area A `2 B / (π A)` times per unit
+    length, so the mean intercept length is `π A / (2 B)`. Twin boundaries
+    do not count towards the grain size (ASTM E112); the value with twins
+    is given as well.
+    """
+    area_px = width * height
+
+    def intercept(length):
+        return np.pi * area_px / (2 * length) if length > 0 else None
+
+    ell_px = intercept(boundary_length_px)
+    ell_px_with_twins = intercept(boundary_length_px + twin_length_px)
+    ell_um = ell_px * pixel_size_um if ell_px is not None else None
+    # The same relation as the metrics of the analysis
+    G = -3.288 - 6.643856 * np.log10(ell_um / 1000.0) if ell_um else None
+    return {
+        "area_px": area_px,
+        "boundary_length_px": boundary_length_px,
+        "twin_length_px": twin_length_px,
+        "ell_px": ell_px,
+        "ell_um": ell_um,
+        "ell_px_with_twins": ell_px_with_twins,
+        "ell_um_with_twins": ell_px_with_twins * pixel_size_um if ell_px_with_twins is not None else None,
+        "G": G,
+    }
+
+
+def generate_image(index, spec, output_dir):
+    """
+    Generates image `index` of a corpus, from `spec` (see `corpus_specs`),
+    and writes it with its JSON sidecar. The image only depends on the
+    corpus seed and its index, not on the worker that draws it.
+    """
+    rng = np.random.default_rng([spec["seed"], index])
+    width, height, grains = spec["width"], spec["height"], spec["grains"]
+
+    seeds, segments, ridge_points = voronoi_microstructure(width, height, grains, rng)
+    boundaries = segments[(ridge_points < grains).all(axis=1)]
+    twinned = np.flatnonzero(rng.random(grains) < spec["twin_fraction"])
+    twins = twin_lines(seeds, segments, ridge_points, twinned, rng) if len(twinned) else np.empty((0, 2, 2))
+
+    image = np.full((height, width), 255, dtype=np.uint8)
+    _draw_segments(image, boundaries, spec["boundary_width"])
+    if len(twins):
+        _draw_segments(image, twins, spec["twin_width"])
+    legacy_rng = np.random.RandomState(rng.integers(2**32))
+    if spec["scratches"]:
+        image = add_scratches(image, spec["scratches"], max_width=spec["boundary_width"] + 2, rng=legacy_rng)
+    if spec["blobs"]:
+        image = add_blobs(image, spec["blobs"], max_radius=30, rng=legacy_rng)
+    if spec["gradient"] or spec["noise"]:
+        image = _apply_illumination_and_noise(image, spec["gradient"], spec["noise"], rng)
+
+    name = f"synthetic_{index:06d}"
+    cv2.imwrite(os.path.join(output_dir, f"{name}.png"), image)
+    sidecar = {
+        "image": f"{name}.png",
+        "index": index,
+        **spec,
+        "twins": len(twins),
+        "ground_truth": ground_truth(
+            width, height,
+            float(np.linalg.norm(boundaries[:, 1] - boundaries[:, 0], axis=1).sum()),
+            float(np.linalg.norm(twins[:, 1] - twins[:, 0], axis=1).sum()),
+            spec["pixel_size_um"],
+        ),
+    }
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as f:
+        json.dump(sidecar, f, indent=2)
+    return name
+
+
+def corpus_specs(args):
+    """The parameters of each image: the corpus cycles through every size and grain count."""
+    combinations = [(size, grains) for size in args.sizes for grains in args.grains]
+    for index in range(args.count):
+        (width, height), grains = combinations[index % len(combinations)]
+        yield index, {
+            "seed": args.seed,
+            "width": width,
+            "height": height,
+            "grains": grains,
+            "boundary_width": args.boundary_width,
+            "twin_fraction": args.twin_fraction,
+            "twin_width": args.twin_width,
+            "noise": args.noise,
+            "gradient": args.gradient,
+            "scratches": args.scratches,
+            "blobs": args.blobs,
+            "pixel_size_um": args.pixel_size_um,
+        }
+
+
+def _init_worker():
+    # The workers already use every core; one OpenCV thread each.
+    cv2.setNumThreads(1)
+
+
+def _generate_task(task):
+    index, spec, output_dir = task
+    return generate_image(index, spec, output_dir)
+
+
+def generate_corpus(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    tasks = [(index, spec, args.output_dir) for index, spec in corpus_specs(args)]
+    start = time.perf_counter()
+    if args.workers == 1:
+        names = map(_generate_task, tasks)
+    else:
+        # "spawn", like the backend's pools
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        names = executor.map(_generate_task, tasks)
+    for done, name in enumerate(names, 1):
+        if done % 100 == 0 or done == len(tasks):
+            print(f"{done}/{len(tasks)} images ({time.perf_counter() - start:.1f}s), last: {name}")
+    if args.workers != 1:
+        executor.shutdown()
+    print(f"\nSuccessfully generated {len(tasks)} synthetic images in '{args.output_dir}'")
+
+
+# --- Fixtures ---
+
+def generate_fixtures(args):
+    """Generates and saves the synthetic microstructure images of the test suite."""
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
 
     width, height = 1024, 1024
@@ -96,5 +350,61 @@ def main():
 
     print(f"\nSuccessfully generated 4 synthetic images in '{output_dir}'")
 
+
+def _image_size(text):
+    """SIZE or WIDTHxHEIGHT, in pixels."""
+    try:
+        width, _, height = text.lower().partition("x")
+        size = (int(width), int(height or width))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid image size: {text}")
+    if min(size) < 16:
+        raise argparse.ArgumentTypeError(f"image size too small: {text}")
+    return size
+
+
+def _fraction(text):
+    value = float(text)
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1: {text}")
+    return value
+
+
+def main(argv=None):
+    default_dir = os.path.join(os.path.dirname(__file__), '..', 'examples', 'input')
+    parser = argparse.ArgumentParser(description="Generate synthetic microstructure images.")
+    parser.set_defaults(func=generate_fixtures, output_dir=default_dir)
+    commands = parser.add_subparsers(title="commands")
+
+    fixtures = commands.add_parser("fixtures", help="The test suite images (the default)")
+    fixtures.add_argument("--output-dir", default=default_dir)
+    fixtures.set_defaults(func=generate_fixtures)
+
+    corpus = commands.add_parser("corpus", help="A corpus of Voronoi microstructures with ground truth")
+    corpus.add_argument("output_dir")
+    corpus.add_argument("--count", type=int, default=100, help="Number of images")
+    corpus.add_argument("--sizes", type=_image_size, nargs="+", default=[(2048, 2048)],
+                        help="Image sizes, SIZE or WIDTHxHEIGHT; the corpus cycles through sizes and grain counts")
+    corpus.add_argument("--grains", type=int, nargs="+", default=[200], help="Grains per image")
+    corpus.add_argument("--boundary-width", type=int, default=3, help="Grain boundary width in pixels")
+    corpus.add_argument("--twin-fraction", type=_fraction, default=0.0, help="Fraction of grains crossed by a twin line")
+    corpus.add_argument("--twin-width", type=int, default=2, help="Twin line width in pixels")
+    corpus.add_argument("--noise", type=float, default=0.0, help="Gaussian noise SD, as a fraction of the full scale")
+    corpus.add_argument("--gradient", type=_fraction, default=0.0, help="Illumination drop across the image")
+    corpus.add_argument("--scratches", type=int, default=0, help="Scratches per image")
+    corpus.add_argument("--blobs", type=int, default=0, help="Dark blobs per image")
+    corpus.add_argument("--pixel-size-um", type=float, default=1.0, help="Pixel size for the ground truth in µm")
+    corpus.add_argument("--seed", type=int, default=0)
+    corpus.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    corpus.set_defaults(func=generate_corpus)
+
+    args = parser.parse_args(argv)
+    if args.func is generate_corpus:
+        if args.count < 1 or args.workers < 1 or min(args.grains) < 1:
+            parser.error("--count, --workers and --grains must be at least 1")
+        if args.boundary_width < 1 or args.twin_width < 1 or args.noise < 0:
+            parser.error("line widths must be at least 1 and --noise non-negative")
+    args.func(args)
+
 if __name__ == "__main__":
     main()